@@ -0,0 +1,28 @@
+"""added content_hash to products
+
+Revision ID: 2c8f6b1e9a54
+Revises: 9d4f1a6c2e87
+Create Date: 2026-10-18 11:02:37.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c8f6b1e9a54'
+down_revision: Union[str, Sequence[str], None] = '9d4f1a6c2e87'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('products', 'content_hash')
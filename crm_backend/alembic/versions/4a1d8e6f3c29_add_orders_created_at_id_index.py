@@ -0,0 +1,28 @@
+"""add orders (created_at, id) index
+
+Revision ID: 4a1d8e6f3c29
+Revises: 7e3a9c5d2b16
+Create Date: 2026-10-18 13:41:08.915372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a1d8e6f3c29'
+down_revision: Union[str, Sequence[str], None] = '7e3a9c5d2b16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_orders_created_at_id', 'orders', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_orders_created_at_id', table_name='orders')
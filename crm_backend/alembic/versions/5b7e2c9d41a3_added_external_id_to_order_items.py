@@ -0,0 +1,30 @@
+"""added external_id to order_items
+
+Revision ID: 5b7e2c9d41a3
+Revises: ca3e05612a84
+Create Date: 2026-10-18 09:12:04.318552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e2c9d41a3'
+down_revision: Union[str, Sequence[str], None] = 'ca3e05612a84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('order_items', sa.Column('external_id', sa.BigInteger(), nullable=True))
+    op.create_index(op.f('ix_order_items_external_id'), 'order_items', ['external_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_order_items_external_id'), table_name='order_items')
+    op.drop_column('order_items', 'external_id')
@@ -0,0 +1,40 @@
+"""add daily_sales rollup
+
+Revision ID: 7e3a9c5d2b16
+Revises: 2c8f6b1e9a54
+Create Date: 2026-10-18 12:26:51.209734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e3a9c5d2b16'
+down_revision: Union[str, Sequence[str], None] = '2c8f6b1e9a54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('daily_sales',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status')
+    )
+    op.execute("""
+        INSERT INTO daily_sales (day, status, order_count, revenue)
+        SELECT DATE(created_at), status, COUNT(id), COALESCE(SUM(total_amount), 0)
+        FROM orders
+        GROUP BY DATE(created_at), status
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_sales')
@@ -0,0 +1,61 @@
+"""add campaigns tables
+
+Revision ID: 8f2d6c4a1e73
+Revises: e5c3a7b9f214
+Create Date: 2026-10-18 18:05:41.203118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f2d6c4a1e73'
+down_revision: Union[str, Sequence[str], None] = 'e5c3a7b9f214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('campaigns',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('total_recipients', sa.Integer(), nullable=False),
+    sa.Column('skipped', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_campaigns_id'), 'campaigns', ['id'], unique=False)
+    op.create_table('campaign_recipients',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('campaign_id', sa.Integer(), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=True),
+    sa.Column('phone', sa.String(), nullable=False),
+    sa.Column('template_name', sa.String(), nullable=False),
+    sa.Column('language', sa.String(length=10), nullable=True),
+    sa.Column('variables', sa.Text(), nullable=False),
+    sa.Column('state', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('whatsapp_message_id', sa.String(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['campaign_id'], ['campaigns.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_campaign_recipients_id'), 'campaign_recipients', ['id'], unique=False)
+    op.create_index('ix_campaign_recipients_campaign_id_state', 'campaign_recipients', ['campaign_id', 'state'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_campaign_recipients_campaign_id_state', table_name='campaign_recipients')
+    op.drop_index(op.f('ix_campaign_recipients_id'), table_name='campaign_recipients')
+    op.drop_table('campaign_recipients')
+    op.drop_index(op.f('ix_campaigns_id'), table_name='campaigns')
+    op.drop_table('campaigns')
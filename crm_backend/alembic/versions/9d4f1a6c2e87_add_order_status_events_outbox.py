@@ -0,0 +1,51 @@
+"""add order_status_events outbox
+
+Revision ID: 9d4f1a6c2e87
+Revises: 5b7e2c9d41a3
+Create Date: 2026-10-18 10:41:27.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4f1a6c2e87'
+down_revision: Union[str, Sequence[str], None] = '5b7e2c9d41a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('order_status_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('external_order_id', sa.BigInteger(), nullable=True),
+    sa.Column('customer_id', sa.Integer(), nullable=True),
+    sa.Column('customer_name', sa.String(), nullable=True),
+    sa.Column('phone', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('state', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_order_status_events_id'), 'order_status_events', ['id'], unique=False)
+    op.create_index(op.f('ix_order_status_events_phone'), 'order_status_events', ['phone'], unique=False)
+    op.create_index('ix_order_status_events_state_next_attempt_at', 'order_status_events', ['state', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_order_status_events_state_next_attempt_at', table_name='order_status_events')
+    op.drop_index(op.f('ix_order_status_events_phone'), table_name='order_status_events')
+    op.drop_index(op.f('ix_order_status_events_id'), table_name='order_status_events')
+    op.drop_table('order_status_events')
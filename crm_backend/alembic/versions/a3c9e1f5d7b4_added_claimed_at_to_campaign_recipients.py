@@ -0,0 +1,28 @@
+"""added claimed_at to campaign_recipients
+
+Revision ID: a3c9e1f5d7b4
+Revises: f4b8d2e6a190
+Create Date: 2026-10-18 21:14:52.337190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9e1f5d7b4'
+down_revision: Union[str, Sequence[str], None] = 'f4b8d2e6a190'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('campaign_recipients', sa.Column('claimed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('campaign_recipients', 'claimed_at')
@@ -0,0 +1,48 @@
+"""add customer_metrics table
+
+Revision ID: b6e2f0a4d871
+Revises: 4a1d8e6f3c29
+Create Date: 2026-10-18 15:07:44.128093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e2f0a4d871'
+down_revision: Union[str, Sequence[str], None] = '4a1d8e6f3c29'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    The table is filled by scripts/rebuild_customer_metrics.py (and nightly
+    by rebuild_customer_metrics_task), classification happens in Python.
+    """
+    op.create_table('customer_metrics',
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('total_spent', sa.Float(), nullable=False),
+    sa.Column('last_order_date', sa.DateTime(), nullable=True),
+    sa.Column('classification', sa.String(), nullable=False),
+    sa.Column('churn_risk', sa.String(), nullable=False),
+    sa.Column('spending_classification', sa.String(), nullable=False),
+    sa.Column('segment', sa.String(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('customer_id')
+    )
+    op.create_index(op.f('ix_customer_metrics_churn_risk'), 'customer_metrics', ['churn_risk'], unique=False)
+    op.create_index('ix_customer_metrics_classification', 'customer_metrics', ['classification'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_customer_metrics_classification', table_name='customer_metrics')
+    op.drop_index(op.f('ix_customer_metrics_churn_risk'), table_name='customer_metrics')
+    op.drop_table('customer_metrics')
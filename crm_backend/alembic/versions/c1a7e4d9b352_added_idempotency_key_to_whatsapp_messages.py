@@ -0,0 +1,30 @@
+"""added idempotency_key to whatsapp_messages
+
+Revision ID: c1a7e4d9b352
+Revises: 8f2d6c4a1e73
+Create Date: 2026-10-18 19:12:08.640271
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1a7e4d9b352'
+down_revision: Union[str, Sequence[str], None] = '8f2d6c4a1e73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('whatsapp_messages', sa.Column('idempotency_key', sa.String(), nullable=True))
+    op.create_unique_constraint('whatsapp_messages_idempotency_key_key', 'whatsapp_messages', ['idempotency_key'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('whatsapp_messages_idempotency_key_key', 'whatsapp_messages', type_='unique')
+    op.drop_column('whatsapp_messages', 'idempotency_key')
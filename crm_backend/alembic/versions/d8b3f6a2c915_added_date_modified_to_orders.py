@@ -0,0 +1,28 @@
+"""added date_modified to orders
+
+Revision ID: d8b3f6a2c915
+Revises: a3c9e1f5d7b4
+Create Date: 2026-10-19 10:42:17.518403
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b3f6a2c915'
+down_revision: Union[str, Sequence[str], None] = 'a3c9e1f5d7b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('orders', sa.Column('date_modified', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('orders', 'date_modified')
@@ -0,0 +1,36 @@
+"""added phone_last8 to customers
+
+Revision ID: e5c3a7b9f214
+Revises: b6e2f0a4d871
+Create Date: 2026-10-18 16:22:19.480517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c3a7b9f214'
+down_revision: Union[str, Sequence[str], None] = 'b6e2f0a4d871'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('customers', sa.Column('phone_last8', sa.String(length=8), nullable=True))
+    # Same rule as customers.phone_lookup.phone_last8: digits only, last 8
+    op.execute("""
+        UPDATE customers
+        SET phone_last8 = NULLIF(RIGHT(regexp_replace(phone, '\\D', '', 'g'), 8), '')
+        WHERE phone IS NOT NULL
+    """)
+    op.create_index(op.f('ix_customers_phone_last8'), 'customers', ['phone_last8'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_customers_phone_last8'), table_name='customers')
+    op.drop_column('customers', 'phone_last8')
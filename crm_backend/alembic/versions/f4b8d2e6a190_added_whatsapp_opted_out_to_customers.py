@@ -0,0 +1,28 @@
+"""added whatsapp_opted_out to customers
+
+Revision ID: f4b8d2e6a190
+Revises: c1a7e4d9b352
+Create Date: 2026-10-18 20:03:27.915402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b8d2e6a190'
+down_revision: Union[str, Sequence[str], None] = 'c1a7e4d9b352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('customers', sa.Column('whatsapp_opted_out', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('customers', 'whatsapp_opted_out')
@@ -0,0 +1,87 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, insert
+from typing import List
+from crm_backend.models import *
+
+def get_campaign_audience_data(db: Session, customer_ids: List[int]) -> List[dict]:
+    """Selected customers with the fields of their latest order, in one query."""
+    latest_order = (
+        select(Order.customer_id, Order.external_id, Order.status, Order.total_amount)
+        .where(Order.customer_id.in_(customer_ids))
+        .distinct(Order.customer_id)
+        .order_by(Order.customer_id, Order.created_at.desc())
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            Customer.id,
+            Customer.first_name,
+            Customer.last_name,
+            Customer.email,
+            Customer.phone,
+            latest_order.c.external_id,
+            latest_order.c.status,
+            latest_order.c.total_amount,
+        )
+        .outerjoin(latest_order, latest_order.c.customer_id == Customer.id)
+        .where(Customer.id.in_(customer_ids))
+        .order_by(Customer.id)
+    ).all()
+
+    audience = []
+    for row in rows:
+        data = {
+            "id": row.id,
+            "first_name": row.first_name,
+            "last_name": row.last_name,
+            "full_name": f"{row.first_name} {row.last_name}",
+            "email": row.email,
+            "phone": row.phone,
+        }
+        if row.external_id is not None or row.status is not None:
+            data.update({
+                "external_id": row.external_id,
+                "order_status": row.status,
+                "order_total": row.total_amount,
+            })
+        audience.append(data)
+    return audience
+
+def get_templates_by_name(db: Session, template_names: List[str]) -> List[WhatsAppTemplate]:
+    return db.query(WhatsAppTemplate).filter(WhatsAppTemplate.template_name.in_(template_names)).all()
+
+def insert_campaign_recipients(db: Session, rows: List[dict]) -> List[int]:
+    """Bulk insert recipient rows, returning their ids in insertion order."""
+    if not rows:
+        return []
+    return list(db.execute(insert(CampaignRecipient).returning(CampaignRecipient.id, sort_by_parameter_order=True), rows).scalars())
+
+def get_campaign_state_counts(db: Session, campaign_id: int) -> dict:
+    rows = (
+        db.query(CampaignRecipient.state, func.count(CampaignRecipient.id))
+        .filter(CampaignRecipient.campaign_id == campaign_id)
+        .group_by(CampaignRecipient.state)
+        .all()
+    )
+    return dict(rows)
+
+def get_campaign_recipients_data(db: Session, campaign_id: int, state: str | None, limit: int, offset: int) -> List[dict]:
+    query = db.query(CampaignRecipient).filter(CampaignRecipient.campaign_id == campaign_id)
+    if state:
+        query = query.filter(CampaignRecipient.state == state)
+    recipients = query.order_by(CampaignRecipient.id).offset(offset).limit(limit).all()
+
+    return [
+        {
+            "id": r.id,
+            "customer_id": r.customer_id,
+            "phone": r.phone,
+            "template_name": r.template_name,
+            "state": r.state,
+            "attempts": r.attempts,
+            "whatsapp_message_id": r.whatsapp_message_id,
+            "last_error": r.last_error,
+            "sent_at": r.sent_at,
+        }
+        for r in recipients
+    ]
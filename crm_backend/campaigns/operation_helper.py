@@ -0,0 +1,105 @@
+import json
+from crm_backend.campaigns.db_helper import *
+from crm_backend.tasks.campaign_sender import CAMPAIGN_CHUNK_SIZE
+from crm_backend.tasks.reorder_messaging import format_kuwait_number
+
+TEMPLATE_VARIABLE_MAPPING = {
+    "order_delivered": ["full_name", "external_id"],
+    "delivery_confirmation_2": ["full_name", "external_id"],
+    "dead_customers_message": ["full_name"],
+    "dead_customer_message_ar": ["full_name"],
+    "example_for_quick_reply": ["full_name"],
+    "order_onhold": ["full_name", "external_id"],
+    "order_management_1": ["full_name"]
+}
+
+def template_values(cust_dict: dict, template: WhatsAppTemplate) -> list[str]:
+    """
+    One value per placeholder detected in the template body, taken from the
+    customer fields named in TEMPLATE_VARIABLE_MAPPING ("" when unmapped).
+    """
+    field_names = TEMPLATE_VARIABLE_MAPPING.get(template.template_name, [])
+    values = []
+    for i in range(len(template.variables)):
+        if i < len(field_names):
+            values.append(str(cust_dict.get(field_names[i], "")))
+        else:
+            # fallback if mapping missing
+            values.append("")
+    return values
+
+def function_create_campaign(db: Session, customer_ids: List[int], template_names: List[str]) -> dict:
+    """
+    Store a campaign with one recipient row per (customer, template) pair and
+    return its id with the recipient ids split into send chunks.
+
+    Raises ValueError when none of the customers or templates exist.
+    """
+    audience = get_campaign_audience_data(db, customer_ids)
+    if not audience:
+        raise ValueError("No valid customers found")
+    templates = get_templates_by_name(db, template_names)
+    if not templates:
+        raise ValueError("No valid templates found")
+
+    campaign = Campaign(status="queued")
+    db.add(campaign)
+    db.flush()
+
+    rows = []
+    skipped = 0
+    for cust_dict in audience:
+        phone = format_kuwait_number(cust_dict["phone"])
+        for tpl in templates:
+            values = template_values(cust_dict, tpl)
+            # ✅ validation (skip if all values are empty)
+            if not phone or not any(v.strip() for v in values):
+                print(f"⚠️ Skipping {tpl.template_name} for {cust_dict['id']} - no phone or valid variables")
+                skipped += 1
+                continue
+            rows.append({
+                "campaign_id": campaign.id,
+                "customer_id": cust_dict["id"],
+                "phone": phone,
+                "template_name": tpl.template_name,
+                "language": tpl.language,
+                "variables": json.dumps(values, ensure_ascii=False),
+                "state": "pending",
+                "attempts": 0,
+            })
+
+    recipient_ids = insert_campaign_recipients(db, rows)
+    campaign.total_recipients = len(recipient_ids)
+    campaign.skipped = skipped
+    if not recipient_ids:
+        campaign.status = "completed"
+        campaign.finished_at = campaign.created_at
+    db.commit()
+
+    chunks = [recipient_ids[i:i + CAMPAIGN_CHUNK_SIZE] for i in range(0, len(recipient_ids), CAMPAIGN_CHUNK_SIZE)]
+    return {"campaign_id": campaign.id, "total_recipients": len(recipient_ids), "skipped": skipped, "chunks": chunks}
+
+def function_get_campaign_progress(db: Session, campaign_id: int) -> dict | None:
+    campaign = db.get(Campaign, campaign_id)
+    if campaign is None:
+        return None
+
+    counts = get_campaign_state_counts(db, campaign_id)
+    done = counts.get("sent", 0) + counts.get("failed", 0)
+    return {
+        "id": campaign.id,
+        "status": campaign.status,
+        "total_recipients": campaign.total_recipients,
+        "skipped": campaign.skipped,
+        "sent": counts.get("sent", 0),
+        "failed": counts.get("failed", 0),
+        "pending": counts.get("pending", 0),
+        "sending": counts.get("sending", 0),
+        "progress": round(done / campaign.total_recipients, 4) if campaign.total_recipients else 1.0,
+        "created_at": campaign.created_at,
+        "started_at": campaign.started_at,
+        "finished_at": campaign.finished_at,
+    }
+
+def function_get_campaign_recipients(db: Session, campaign_id: int, state: str | None = None, limit: int = 100, offset: int = 0) -> List[dict]:
+    return get_campaign_recipients_data(db, campaign_id, state, limit, offset)
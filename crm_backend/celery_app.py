@@ -25,17 +25,43 @@ celery.conf.update(
 
 celery.conf.beat_schedule = {
     # 🔁 Fetch WooCommerce orders every 15 minutes
-    "fetch-orders-every-1-mins": {
+    # Orders arrive in real time through /woocommerce/webhook, this is only a
+    # reconciliation sweep for missed or failed webhook deliveries
+    "fetch-orders-every-15-mins": {
         "task": "fetch_orders_task",
+        "schedule": crontab(minute="*/15"),
+    },
+
+    # 📲 Send queued order status notifications every minute
+    "send-order-status-notifications-every-1-min": {
+        "task": "send_order_status_notifications_task",
         "schedule": crontab(minute="*"),
     },
 
+    # 📣 Recover campaign chunks lost to crashed workers every 5 minutes
+    "sweep-stale-campaigns-every-5-mins": {
+        "task": "sweep_stale_campaigns_task",
+        "schedule": crontab(minute="*/5"),
+    },
+
     # 🛒 Fetch WooCommerce products every 2 hours
     "fetch-products-every-2-hours": {
         "task": "fetch_products_task",
         "schedule": crontab(minute=0, hour="*/2"),
     },
 
+    # 👥 Recompute customer metrics and refit segments nightly
+    "rebuild-customer-metrics-nightly": {
+        "task": "rebuild_customer_metrics_task",
+        "schedule": crontab(minute=30, hour=0),
+    },
+
+    # 🧮 Refit the product segmentation model nightly
+    "refit-product-segments-nightly": {
+        "task": "refit_product_segments_task",
+        "schedule": crontab(minute=45, hour=0),
+    },
+
     # 📲 Send WhatsApp messages daily at 10 AM (if re-enabled)
     # "send-whatsapp-daily": {
     #     "task": "send_whatsapp_broadcast",
@@ -177,7 +177,7 @@ def get_spending_customer_classification_data(db: Session):
     )
     return data
 
-def get_full_customer_classification_data(db: Session):
+def get_full_customer_classification_data(db: Session, customer_ids=None):
     """
     Fetches customer classification data including:
     - customer_id
@@ -187,9 +187,10 @@ def get_full_customer_classification_data(db: Session):
     - total_spent
     - last_order_date
 
-    Filters only 'completed' and 'processing' orders.
+    Filters only 'completed' and 'processing' orders. ``customer_ids``
+    restricts the aggregation to those customers.
     """
-    data = (
+    query = (
         db.query(
             Customer.id.label("customer_id"),
             func.concat(Customer.first_name, ' ', Customer.last_name).label("customer_name"),
@@ -200,7 +201,38 @@ def get_full_customer_classification_data(db: Session):
         )
         .outerjoin(Order, (Customer.id == Order.customer_id) & Order.status.in_(["completed", "processing"]))
         .group_by(Customer.id, Customer.first_name, Customer.last_name, Customer.phone)
-        .all()
     )
+    if customer_ids is not None:
+        query = query.filter(Customer.id.in_(customer_ids))
+
+    return query.all()
+
+def get_customer_metrics_data(db: Session, churn_risk: str = None, classification: str = None) -> List[dict]:
+    """Rows of the customer_metrics table joined with the customer's name and phone."""
+    query = (
+        db.query(
+            CustomerMetrics.customer_id,
+            func.concat(Customer.first_name, ' ', Customer.last_name).label("customer_name"),
+            Customer.phone,
+            CustomerMetrics.order_count,
+            CustomerMetrics.total_spent,
+            CustomerMetrics.last_order_date,
+            CustomerMetrics.classification,
+            CustomerMetrics.churn_risk,
+            func.coalesce(CustomerMetrics.segment, "Unsegmented").label("segment"),
+            CustomerMetrics.spending_classification,
+        )
+        .join(Customer, Customer.id == CustomerMetrics.customer_id)
+    )
+    if churn_risk:
+        query = query.filter(CustomerMetrics.churn_risk == churn_risk)
+    if classification:
+        query = query.filter(CustomerMetrics.classification == classification)
 
-    return data
\ No newline at end of file
+    return [
+        {
+            **row._mapping,
+            "last_order_date": row.last_order_date.isoformat() if row.last_order_date else None,
+        }
+        for row in query.order_by(CustomerMetrics.customer_id)
+    ]
\ No newline at end of file
@@ -0,0 +1,88 @@
+from datetime import datetime
+import pandas as pd
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from crm_backend.models import CustomerMetrics
+from crm_backend.customers.db_helper import get_full_customer_classification_data
+from crm_backend.customers.operation_helper import (
+    CUSTOMER_SEGMENT_MODEL, classify_customers, dataframe_to_records, segment_customers_kmeans,
+)
+from crm_backend.utils.model_registry import load_segmentation_model
+
+UPSERT_CHUNK_SIZE = 5000
+MIN_CUSTOMERS_TO_SEGMENT = 4  # KMeans uses 4 clusters
+
+def _classified_frame(rows, today: datetime) -> pd.DataFrame:
+    df = pd.DataFrame([dict(row._mapping) for row in rows])
+
+    df["order_count"] = df["order_count"].fillna(0).astype(int)
+    df["total_spent"] = df["total_spent"].fillna(0).astype(float)
+    df["last_order_date"] = pd.to_datetime(df["last_order_date"], errors='coerce')
+
+    return classify_customers(df, today)
+
+def _upsert(db: Session, df: pd.DataFrame, with_segment: bool) -> None:
+    columns = ["customer_id", "order_count", "total_spent", "last_order_date",
+               "classification", "churn_risk", "spending_classification"]
+    if with_segment:
+        columns.append("segment")
+
+    updated_at = datetime.utcnow()
+    records = [
+        {**record, "updated_at": updated_at}
+        for record in dataframe_to_records(df, columns)
+    ]
+
+    for start in range(0, len(records), UPSERT_CHUNK_SIZE):
+        stmt = pg_insert(CustomerMetrics).values(records[start:start + UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["customer_id"],
+            set_={column: stmt.excluded[column] for column in records[0] if column != "customer_id"},
+        )
+        db.execute(stmt)
+
+def refresh_customer_metrics(db: Session, customer_ids) -> None:
+    """
+    Recompute the metrics of the given customers inside the caller's
+    transaction (called by order ingestion for the customers it touched).
+    Segments are predicted with the stored model; until the first nightly
+    fit they are left as they are.
+    """
+    customer_ids = {customer_id for customer_id in customer_ids if customer_id}
+    if not customer_ids:
+        return
+
+    rows = get_full_customer_classification_data(db, customer_ids=customer_ids)
+    if not rows:
+        return
+
+    today = datetime.now()
+    df = _classified_frame(rows, today)
+
+    # Predict-only: new customers get a segment from the last nightly model
+    with_segment = load_segmentation_model(CUSTOMER_SEGMENT_MODEL) is not None
+    if with_segment:
+        df = segment_customers_kmeans(df, today)
+
+    _upsert(db, df, with_segment=with_segment)
+
+def rebuild_customer_metrics(db: Session) -> int:
+    """
+    Recompute every customer's metrics and refit the KMeans segments.
+    Run nightly so time-based fields (churn risk) stay current. The caller commits.
+    """
+    rows = get_full_customer_classification_data(db)
+    if not rows:
+        return 0
+
+    today = datetime.now()
+    df = _classified_frame(rows, today)
+
+    if (df["order_count"] > 0).sum() >= MIN_CUSTOMERS_TO_SEGMENT:
+        df = segment_customers_kmeans(df, today, refit=True)
+        print(df.groupby("segment")[["order_count", "recency_days", "total_spent"]].mean())
+    else:
+        df["segment"] = "Unsegmented"
+
+    _upsert(db, df, with_segment=True)
+    return len(df)
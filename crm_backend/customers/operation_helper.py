@@ -1,8 +1,7 @@
 from crm_backend.customers.db_helper import *
 import pandas as pd
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
 import numpy as np
+from crm_backend.utils.model_registry import fit_segmentation_model, load_segmentation_model, rank_labels
 
 def function_get_customers_table(db):
     customers_data = customers_table_data(db)
@@ -147,97 +146,120 @@ def classify_spending(total_spent):
     else:
         return "VIP"
 
-def segment_customers_kmeans(df, today):
-    
+CUSTOMER_SEGMENT_MODEL = "customer_segments"
+CUSTOMER_SEGMENT_FEATURES = ["order_count", "recency_days"]
+
+def label_customer_clusters(centroids):
+    """Stable names for the customer clusters, derived from their centroids."""
+    return rank_labels(centroids, [
+        ("Loyal At-Risk", "order_count", True),
+        ("Lost One-Timers", "recency_days", True),
+        ("Dormant Customers", "recency_days", True),
+        ("Cold Leads", "recency_days", False),
+    ])
+
+def segment_customers_kmeans(df, today, refit=False):
     """
-    Apply KMeans clustering based on order count and recency.
+    Assign KMeans segments based on order count and recency.
+
+    The scaler/KMeans pair comes from the model registry; it is only fitted
+    (and stored) when ``refit`` is set, i.e. by the nightly rebuild, or when
+    no model exists yet. Customers without orders are 'Unsegmented'.
 
     Args:
         df (DataFrame): DataFrame with 'order_count' and 'last_order_date'.
         today (datetime): Reference date to calculate recency.
+        refit (bool): Fit a new model on ``df`` before predicting.
 
     Returns:
         DataFrame: Modified DataFrame with a 'segment' column.
     """
 
-    df["recency_days"] = df["last_order_date"].apply(
-        lambda d: (today - d).days if pd.notnull(d) else 999
-    )
-    clustering_df = df[df["order_count"] > 0][["order_count", "recency_days"]]
+    df["recency_days"] = (today - df["last_order_date"]).dt.days.fillna(999).astype(int)
+    has_orders = df["order_count"] > 0
 
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(clustering_df)
+    model = None if refit else load_segmentation_model(CUSTOMER_SEGMENT_MODEL)
+    if model is None:
+        model = fit_segmentation_model(
+            CUSTOMER_SEGMENT_MODEL, df[has_orders], CUSTOMER_SEGMENT_FEATURES, label_customer_clusters
+        )
 
-    kmeans = KMeans(n_clusters=4, random_state=42, n_init="auto")
-    df.loc[df["order_count"] > 0, "segment"] = kmeans.fit_predict(X_scaled).astype(int)
-
-    segment_map = {
-        0: "Loyal At-Risk",
-        1: "Dormant Customers",
-        2: "Cold Leads",
-        3: "Lost One-Timers"
-    }
-    df["segment"] = df["segment"].apply(lambda x: segment_map.get(x, "Unsegmented"))
+    df["segment"] = "Unsegmented"
+    df.loc[has_orders, "segment"] = model.predict(df[has_orders])
     return df
 
 # --------------------------
-# Main Function
+# Vectorized kernels
 # --------------------------
-
-def function_get_full_customer_classification(db):
-    # Fetch data
-    customer_data = get_full_customer_classification_data(db)
-    
-    # SAFELY convert query result to DataFrame using column labels
-    df = pd.DataFrame([dict(row._mapping) for row in customer_data])
-    
-    # Clean data
-    df["order_count"] = df["order_count"].fillna(0).astype(int)
-    df["total_spent"] = df["total_spent"].fillna(0).astype(float)
-    df["last_order_date"] = pd.to_datetime(df["last_order_date"], errors='coerce')
-
-    today = datetime.now()
-
-    # Apply classifications
-    df["classification"] = df.apply(
-        lambda row: classify_behavior(row["order_count"], row["last_order_date"]), axis=1
+# Column-at-a-time equivalents of the scalar classifiers above, with
+# identical outputs (see tests/classification_benchmark.py).
+
+def classify_behavior_vectorized(order_count, last_order_date, cutoff_date=datetime(2025, 1, 1)):
+    """classify_behavior over whole Series; returns an ndarray of labels."""
+    order_count = np.asarray(order_count)
+    last_order_date = pd.to_datetime(pd.Series(last_order_date))
+    is_old = (last_order_date.notna() & (last_order_date < cutoff_date)).to_numpy()
+
+    return np.select(
+        [
+            (order_count == 1) & is_old,
+            order_count == 1,
+            (order_count >= 2) & (order_count <= 5),
+            (order_count >= 6) & (order_count <= 15),
+            order_count >= 16,
+        ],
+        ["Dead", "New", "Occasional", "Frequent", "Loyal"],
+        default="No Orders",
     )
-    df["churn_risk"] = df["last_order_date"].apply(lambda x: calculate_churn_risk(x, today))
-    df["spending_classification"] = df["total_spent"].apply(classify_spending)
 
-    # Apply segmentation
-    df = segment_customers_kmeans(df, today)
+def calculate_churn_risk_vectorized(last_order_date, today=None):
+    """calculate_churn_risk over whole Series; returns an ndarray of labels."""
+    today = today or datetime.now()
+    days_since = (today - pd.to_datetime(pd.Series(last_order_date))).dt.days.to_numpy()
+
+    # NaN days (no orders) fail both comparisons and fall through to High
+    return np.select([days_since < 30, days_since < 90], ["Low", "Medium"], default="High")
+
+def classify_spending_vectorized(total_spent):
+    """classify_spending over whole Series; returns an ndarray of labels."""
+    total_spent = np.asarray(total_spent, dtype=float)
 
-    # Format date
-    df["last_order_date"] = df["last_order_date"].apply(
-        lambda x: x.isoformat() if pd.notnull(x) else None
+    return np.select(
+        [total_spent < 50, total_spent < 200, total_spent < 1000],
+        ["Low Spender", "Medium Spender", "High Spender"],
+        default="VIP",
     )
 
-    # Optional inspection
-    print(df.groupby("segment")[["order_count", "recency_days", "total_spent"]].mean())
-
-    # Final return structure
-    return [
-        {
-            "customer_id": int(row["customer_id"]),
-            "customer_name": str(row["customer_name"]),
-            "phone": row["phone"],
-            "order_count": int(row["order_count"]),
-            "total_spent": float(row["total_spent"]),
-            "last_order_date": row["last_order_date"],
-            "classification": row["classification"],
-            "churn_risk": row["churn_risk"],
-            "segment": row["segment"],
-            "spending_classification": row["spending_classification"]
-        }
-        for _, row in df.iterrows()
-    ]
+def classify_customers(df, today=None):
+    """Add classification, churn_risk and spending_classification columns to ``df`` in place."""
+    df["classification"] = classify_behavior_vectorized(df["order_count"], df["last_order_date"])
+    df["churn_risk"] = calculate_churn_risk_vectorized(df["last_order_date"], today)
+    df["spending_classification"] = classify_spending_vectorized(df["total_spent"])
+    return df
+
+def dataframe_to_records(df, columns):
+    """
+    JSON/DB friendly list of dicts from ``df[columns]`` without iterrows:
+    NaN/NaT become None and numpy scalars become Python objects.
+    """
+    out = df[columns].astype(object)
+    return out.where(out.notna(), None).to_dict(orient="records")
+
+# --------------------------
+# Main Function
+# --------------------------
+
+def function_get_full_customer_classification(db):
+    """
+    Classification of every customer, read from the customer_metrics table
+    (kept current by order ingestion and rebuilt nightly, see customers/metrics.py).
+    """
+    return get_customer_metrics_data(db)
 
 def function_get_customers_with_low_churnRisk(db):
 
-    all_customers = function_get_full_customer_classification(db)
-    low_churn_customers = [c for c in all_customers if c["churn_risk"] == "Low"]
-    
+    low_churn_customers = get_customer_metrics_data(db, churn_risk="Low")
+
     return low_churn_customers
 
 def function_get_dead_customers(db):
@@ -250,7 +272,6 @@ def function_get_dead_customers(db):
     Returns:
         list: Customers with classification = 'Dead'.
     """
-    all_customers = function_get_full_customer_classification(db)
-    dead_customers = [c for c in all_customers if c["classification"] == "Dead"]
-    
-    return dead_customers
\ No newline at end of file
+    dead_customers = get_customer_metrics_data(db, classification="Dead")
+
+    return dead_customers
@@ -0,0 +1,41 @@
+import re
+from cachetools import TTLCache
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from crm_backend.models import Customer
+
+PHONE_SUFFIX_LENGTH = 8  # Kuwaiti local numbers; also how WhatsApp senders were matched before
+
+# Recent sender number -> customer id. Only hits are cached; the TTL bounds
+# how long a deleted or re-numbered customer can still be matched.
+_recent_matches = TTLCache(maxsize=10000, ttl=3600)
+
+def phone_last8(phone: str | None) -> str | None:
+    """Last 8 digits of a phone number, ignoring '+', spaces and other separators."""
+    if not phone:
+        return None
+    digits = re.sub(r"\D", "", phone)
+    return digits[-PHONE_SUFFIX_LENGTH:] or None
+
+def find_customer_id_by_phone(db: Session, phone: str | None) -> int | None:
+    """
+    Customer whose phone ends with the same 8 digits, via the indexed
+    customers.phone_last8 column. The oldest customer wins on duplicates.
+    """
+    suffix = phone_last8(phone)
+    if not suffix:
+        return None
+
+    customer_id = _recent_matches.get(suffix)
+    if customer_id is not None:
+        return customer_id
+
+    customer_id = db.scalar(
+        select(Customer.id)
+        .where(Customer.phone_last8 == suffix)
+        .order_by(Customer.id)
+        .limit(1)
+    )
+    if customer_id is not None:
+        _recent_matches[suffix] = customer_id
+    return customer_id
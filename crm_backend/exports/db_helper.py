@@ -0,0 +1,92 @@
+from sqlalchemy import Float, Numeric, case, func, select
+from crm_backend.models import *
+from crm_backend.orders.db_helper import apply_order_filters
+
+customer_name = func.nullif(func.concat_ws(" ", Customer.first_name, Customer.last_name), "")
+
+def orders_export_query(**filters):
+    query = (
+        select(
+            Order.id,
+            Order.external_id,
+            Order.order_key,
+            Order.customer_id,
+            customer_name.label("customer_name"),
+            Order.created_at,
+            Order.status,
+            Order.total_amount,
+            Order.payment_method,
+            Order.attribution_referrer,
+            Order.device_type,
+        )
+        .outerjoin(Customer, Customer.id == Order.customer_id)
+        .order_by(Order.created_at, Order.id)
+    )
+    return apply_order_filters(query, **filters)
+
+def order_items_export_query(**filters):
+    """Line items of the orders matching the order listing filters."""
+    query = (
+        select(
+            OrderItem.id,
+            OrderItem.external_id,
+            OrderItem.order_id,
+            Order.external_id.label("external_order_id"),
+            Order.created_at.label("order_created_at"),
+            Order.status.label("order_status"),
+            Order.customer_id,
+            OrderItem.product_id,
+            OrderItem.product_name,
+            OrderItem.quantity,
+            OrderItem.price,
+        )
+        .join(Order, Order.id == OrderItem.order_id)
+        .order_by(Order.created_at, OrderItem.id)
+    )
+    return apply_order_filters(query, **filters)
+
+def customers_export_query(customer_id: int | None = None, **order_filters):
+    """Customers with their order totals; order filters restrict which orders are counted."""
+    orders = apply_order_filters(
+        select(
+            Order.customer_id,
+            func.count(Order.id).label("total_orders"),
+            func.sum(case((Order.status == "completed", Order.total_amount), else_=0)).label("total_spending"),
+            func.max(Order.created_at).label("last_order_at"),
+        ),
+        **order_filters,
+    ).group_by(Order.customer_id).subquery()
+
+    # A new row is stored whenever the billing address changes, export the latest one
+    latest_address = (
+        select(Address.customer_id, Address.city)
+        .distinct(Address.customer_id)
+        .order_by(Address.customer_id, Address.id.desc())
+        .subquery()
+    )
+
+    query = (
+        select(
+            Customer.id,
+            Customer.first_name,
+            Customer.last_name,
+            Customer.email,
+            Customer.phone,
+            latest_address.c.city,
+            func.coalesce(orders.c.total_orders, 0).label("total_orders"),
+            func.round(func.coalesce(orders.c.total_spending, 0).cast(Numeric), 2).cast(Float).label("total_spending"),
+            orders.c.last_order_at,
+        )
+        .outerjoin(latest_address, latest_address.c.customer_id == Customer.id)
+        .outerjoin(orders, orders.c.customer_id == Customer.id)
+        .order_by(Customer.id)
+    )
+    if customer_id:
+        query = query.where(Customer.id == customer_id)
+    return query
+
+EXPORT_QUERIES = {
+    "orders": orders_export_query,
+    "order_items": order_items_export_query,
+    "customers": customers_export_query,
+}
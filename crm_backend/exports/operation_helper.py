@@ -0,0 +1,117 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Iterator
+from crm_backend.database import SessionLocal
+from crm_backend.exports.db_helper import EXPORT_QUERIES
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # parquet export is optional
+    pa = None
+
+EXPORT_BATCH_SIZE = 2000
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def _iter_batches(entity: str, filters: dict) -> Iterator[tuple[list[str], list[tuple]]]:
+    """
+    Yield (columns, rows) batches from a server-side cursor.
+
+    The generator owns its session: it runs while the response is being
+    streamed, after the request's own session has been closed.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(EXPORT_QUERIES[entity](**filters).execution_options(yield_per=EXPORT_BATCH_SIZE))
+        columns = list(result.keys())
+        for partition in result.partitions():
+            yield columns, partition
+    finally:
+        db.close()
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+def stream_csv(entity: str, filters: dict) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header_written = False
+    for columns, rows in _iter_batches(entity, filters):
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if not header_written:
+        # No rows: still send the header so the file is usable
+        yield ",".join(EXPORT_QUERIES[entity](**filters).selected_columns.keys()) + "\n"
+
+def stream_ndjson(entity: str, filters: dict) -> Iterator[str]:
+    for columns, rows in _iter_batches(entity, filters):
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+def _arrow_schema(entity: str, filters: dict):
+    to_arrow = {int: pa.int64(), float: pa.float64(), str: pa.string(), datetime: pa.timestamp("us"), date: pa.date32()}
+    fields = []
+    for column in EXPORT_QUERIES[entity](**filters).selected_columns:
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            python_type = str
+        fields.append(pa.field(column.key, to_arrow.get(python_type, pa.string())))
+    return pa.schema(fields)
+
+def stream_parquet(entity: str, filters: dict) -> Iterator[bytes]:
+    """One parquet row group per fetched batch, flushed to the client as it is written."""
+    schema = _arrow_schema(entity, filters)
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for _, rows in _iter_batches(entity, filters):
+            writer.write_table(pa.Table.from_pylist([dict(zip(schema.names, row)) for row in rows], schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+def function_stream_export(entity: str, export_format: str, filters: dict) -> Iterator:
+    """Raises ValueError for unknown entities/formats or when parquet support is missing."""
+    if entity not in EXPORT_QUERIES:
+        raise ValueError(f"Unknown export entity: {entity}")
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    if export_format == "parquet":
+        if pa is None:
+            raise ValueError("Parquet export needs pyarrow installed")
+        return stream_parquet(entity, filters)
+    if export_format == "ndjson":
+        return stream_ndjson(entity, filters)
+    return stream_csv(entity, filters)
@@ -1,7 +1,7 @@
 # main.py
 import os
 from fastapi import FastAPI
-from crm_backend.routers import sync, auth, orders, products, customers, ai_chat, whatsapp_messaging, forecast_api, csv_analysis
+from crm_backend.routers import sync, auth, orders, products, customers, ai_chat, whatsapp_messaging, forecast_api, csv_analysis, export
 import redis
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
@@ -47,6 +47,7 @@ app.include_router(ai_chat.router)
 app.include_router(whatsapp_messaging.router)
 app.include_router(forecast_api.router)
 app.include_router(csv_analysis.router)
+app.include_router(export.router)
 
 @app.get("/")
 def read_root():
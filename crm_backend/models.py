@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Column, Integer, BigInteger, String, Float, ForeignKey, DateTime, Index, Text
+    Column, Integer, BigInteger, String, Float, ForeignKey, DateTime, Index, Text, Date, Boolean, false
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -24,6 +24,8 @@ class Customer(Base):
     last_name = Column(String, nullable=False)
     email = Column(String, index=True, nullable=True)
     phone = Column(String, unique=True, index=True)
+    phone_last8 = Column(String(8), index=True, nullable=True)  # see customers/phone_lookup.py
+    whatsapp_opted_out = Column(Boolean, nullable=False, default=False, server_default=false())  # no marketing messages
 
     orders = relationship("Order", back_populates="customer", cascade="all, delete-orphan")
     address = relationship("Address", back_populates="customer", uselist=False, cascade="all, delete-orphan")
@@ -55,6 +57,7 @@ class Order(Base):
     status = Column(String, nullable=False)
     total_amount = Column(Float, nullable=False)
     created_at = Column(DateTime, index=True, nullable=False)
+    date_modified = Column(DateTime, nullable=True)  # WooCommerce date_modified_gmt of the payload last applied
     payment_method = Column(String, nullable=True)
 
     attribution_referrer = Column(String, nullable=True)
@@ -65,6 +68,38 @@ class Order(Base):
     customer = relationship("Customer", back_populates="orders", passive_deletes=True)
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Keyset pagination of the orders listing (see orders/db_helper.get_orders_page_data)
+        Index("ix_orders_created_at_id", "created_at", "id"),
+    )
+
+class CustomerMetrics(Base):
+    """Precomputed per-customer classification, kept current by ingestion (see customers/metrics.py)."""
+    __tablename__ = "customer_metrics"
+
+    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)  # completed + processing orders
+    total_spent = Column(Float, nullable=False, default=0.0)
+    last_order_date = Column(DateTime, nullable=True)
+    classification = Column(String, nullable=False)
+    churn_risk = Column(String, nullable=False, index=True)
+    spending_classification = Column(String, nullable=False)
+    segment = Column(String, nullable=True)  # refit nightly, NULL until the customer is first segmented
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_customer_metrics_classification", "classification"),
+    )
+
+class DailySales(Base):
+    """Per-day, per-status order rollup kept current by order ingestion (see orders/daily_sales.py)."""
+    __tablename__ = "daily_sales"
+
+    day = Column(Date, primary_key=True)  # date of Order.created_at
+    status = Column(String, primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
 class Product(Base):
     __tablename__ = "products"
 
@@ -82,6 +117,8 @@ class Product(Base):
     date_created = Column(DateTime, nullable=True)
     date_modified = Column(DateTime, nullable=True)
 
+    content_hash = Column(String(64), nullable=True)  # sha256 of the synced columns, see fetch_products
+
     # ✅ Relationship back to OrderItem
     order_items = relationship("OrderItem", back_populates="product")
 
@@ -90,6 +127,7 @@ class OrderItem(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"))
+    external_id = Column(BigInteger, unique=True, index=True, nullable=True)  # WooCommerce line item ID
     product_id = Column(Integer, ForeignKey("products.external_id", ondelete="SET NULL"))  # ✅ This is essential
     product_name = Column(String, nullable=False)
     quantity = Column(Integer, nullable=False)
@@ -100,6 +138,29 @@ class OrderItem(Base):
     # ✅ Relationship to Product
     product = relationship("Product", back_populates="order_items")
 
+class OrderStatusEvent(Base):
+    """Outbox of order status changes waiting for a WhatsApp notification."""
+    __tablename__ = "order_status_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
+    external_order_id = Column(BigInteger, nullable=True)
+    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="SET NULL"), nullable=True)
+    customer_name = Column(String, nullable=True)
+    phone = Column(String, index=True, nullable=True)
+    status = Column(String, nullable=False)  # order status that triggered the event
+
+    state = Column(String, nullable=False, default="pending")  # pending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_order_status_events_state_next_attempt_at", "state", "next_attempt_at"),
+    )
+
 class SyncState(Base):
     __tablename__ = "sync_state"
     key = Column(String, primary_key=True)
@@ -115,10 +176,50 @@ class WhatsAppMessage(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     status = Column(String, nullable=True)  # ✅ NEW: sent, delivered, read
     whatsapp_message_id = Column(String, nullable=True, unique=True)
+    idempotency_key = Column(String, nullable=True, unique=True)  # scheduled sends, see tasks/message_ledger.py
 
     # 🔙 Relationship back to customer
     customer = relationship("Customer", back_populates="whatsapp_messages")
 
+class Campaign(Base):
+    """Bulk template send started from /send-message-to-each-customer, sent by Celery in chunks."""
+    __tablename__ = "campaigns"
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, nullable=False, default="queued")  # queued, running, completed
+    total_recipients = Column(Integer, nullable=False, default=0)
+    skipped = Column(Integer, nullable=False, default=0)  # customer x template pairs without variables
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    recipients = relationship("CampaignRecipient", back_populates="campaign", cascade="all, delete-orphan")
+
+class CampaignRecipient(Base):
+    """One (customer, template) message of a campaign and its send result."""
+    __tablename__ = "campaign_recipients"
+
+    id = Column(Integer, primary_key=True, index=True)
+    campaign_id = Column(Integer, ForeignKey("campaigns.id", ondelete="CASCADE"), nullable=False)
+    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="SET NULL"), nullable=True)
+    phone = Column(String, nullable=False)  # formatted for the WhatsApp API
+    template_name = Column(String, nullable=False)
+    language = Column(String(10), nullable=True)
+    variables = Column(Text, nullable=False, default="[]")  # JSON list of {{n}} values
+
+    state = Column(String, nullable=False, default="pending")  # pending, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    claimed_at = Column(DateTime, nullable=True)  # set when a chunk task moves the row to "sending"
+    whatsapp_message_id = Column(String, nullable=True)
+    last_error = Column(Text, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+
+    campaign = relationship("Campaign", back_populates="recipients")
+
+    __table_args__ = (
+        Index("ix_campaign_recipients_campaign_id_state", "campaign_id", "state"),
+    )
+
 class WhatsAppTemplate(Base):
     __tablename__ = "whatsapp_templates"
 
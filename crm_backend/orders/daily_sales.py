@@ -0,0 +1,63 @@
+from collections import defaultdict
+from datetime import date
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from crm_backend.models import DailySales, Order
+
+class DailySalesDeltas:
+    """
+    Accumulates (day, status) -> (order_count, revenue) changes for one
+    ingestion transaction, so they can be applied in a single statement.
+    """
+
+    def __init__(self):
+        self._deltas = defaultdict(lambda: [0, 0.0])
+
+    def add(self, day: date, status: str, amount: float) -> None:
+        delta = self._deltas[(day, status)]
+        delta[0] += 1
+        delta[1] += amount
+
+    def remove(self, day: date, status: str, amount: float) -> None:
+        delta = self._deltas[(day, status)]
+        delta[0] -= 1
+        delta[1] -= amount
+
+    def move(self, day: date, old_status: str, new_status: str, amount: float) -> None:
+        self.remove(day, old_status, amount)
+        self.add(day, new_status, amount)
+
+    def apply(self, db: Session) -> None:
+        """Add the accumulated deltas to daily_sales inside the caller's transaction."""
+        # Sorted keys keep row lock order stable between concurrent ingestions
+        rows = [
+            {"day": day, "status": status, "order_count": count, "revenue": revenue}
+            for (day, status), (count, revenue) in sorted(self._deltas.items())
+            if count or revenue
+        ]
+        if not rows:
+            return
+
+        stmt = pg_insert(DailySales).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["day", "status"],
+            set_={
+                "order_count": DailySales.order_count + stmt.excluded.order_count,
+                "revenue": DailySales.revenue + stmt.excluded.revenue,
+            },
+        )
+        db.execute(stmt)
+        self._deltas.clear()
+
+def rebuild_daily_sales(db: Session) -> None:
+    """Recompute the whole rollup from the orders table. The caller commits."""
+    day = func.date(Order.created_at)
+    db.execute(delete(DailySales))
+    db.execute(
+        insert(DailySales).from_select(
+            ["day", "status", "order_count", "revenue"],
+            select(day, Order.status, func.count(Order.id), func.coalesce(func.sum(Order.total_amount), 0.0))
+            .group_by(day, Order.status),
+        )
+    )
@@ -1,13 +1,14 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from crm_backend.models import *
 from typing import List, Dict
-from sqlalchemy import func, extract, cast, Date, desc, text, distinct
+from sqlalchemy import func, extract, cast, Date, desc, text, distinct, tuple_
 from datetime import date, timedelta, datetime
 from collections import Counter
 
 def get_latest_orders_data(db: Session) -> List[dict]:
     orders = (
         db.query(Order)
+        .options(joinedload(Order.customer))
         .order_by(Order.created_at.desc())
         .limit(5)
         .all()
@@ -37,8 +38,8 @@ def get_total_orders_count_data(db:Session) -> List[dict]:
 
 def get_total_sales_data(db: Session) -> List[dict]:
     total_sales = (
-        db.query(func.coalesce(func.sum(Order.total_amount), 0.0))
-        .filter(Order.status.in_(["completed"]))  # Include both statuses
+        db.query(func.coalesce(func.sum(DailySales.revenue), 0.0))
+        .filter(DailySales.status == "completed")
         .scalar()
     )
 
@@ -50,13 +51,10 @@ def get_total_sales_data(db: Session) -> List[dict]:
     ]
 
 def get_average_order_value_data(db: Session) -> List[dict]:
-    total_sales = db.query(func.coalesce(func.sum(Order.total_amount), 0.0))\
-                    .filter(Order.status.in_(["completed"]))\
-                    .scalar()
-
-    completed_order_count = db.query(func.count(Order.id))\
-                              .filter(Order.status == "completed")\
-                              .scalar()
+    total_sales, completed_order_count = db.query(
+        func.coalesce(func.sum(DailySales.revenue), 0.0),
+        func.coalesce(func.sum(DailySales.order_count), 0),
+    ).filter(DailySales.status == "completed").one()
 
     # Avoid division by zero
     aov = total_sales / completed_order_count if completed_order_count > 0 else 0.0
@@ -103,86 +101,97 @@ def get_top_customers_data(db: Session, limit: int = 5) -> List[dict]:
         for row in results
     ]
 
+def get_dashboard_kpis_data(db: Session, top_limit: int = 5) -> dict:
+    """
+    Headline dashboard metrics in one round trip: order/sales totals come
+    from one pass over the daily_sales rollup with FILTER aggregates, the
+    customer count and the top customers are scalar subqueries of the
+    same statement.
+    """
+    row = db.execute(text("""
+        SELECT
+            COALESCE(SUM(order_count), 0) AS total_orders,
+            COALESCE(SUM(revenue) FILTER (WHERE status = 'completed'), 0) AS total_sales,
+            COALESCE(SUM(order_count) FILTER (WHERE status = 'completed'), 0) AS completed_orders,
+            (SELECT COUNT(*) FROM customers) AS total_customers,
+            (
+                SELECT COALESCE(json_agg(top ORDER BY top.total_spending DESC), '[]'::json)
+                FROM (
+                    SELECT
+                        CONCAT(c.first_name, ' ', c.last_name) AS "user",
+                        COUNT(o.id) AS total_orders,
+                        ROUND(SUM(o.total_amount)::numeric, 2) AS total_spending
+                    FROM orders o
+                    JOIN customers c ON c.id = o.customer_id
+                    WHERE o.status = 'completed'
+                    GROUP BY c.id
+                    ORDER BY total_spending DESC
+                    LIMIT :top_limit
+                ) AS top
+            ) AS top_customers
+        FROM daily_sales
+    """), {"top_limit": top_limit}).one()
+
+    aov = row.total_sales / row.completed_orders if row.completed_orders > 0 else 0.0
+
+    return {
+        "total_orders": int(row.total_orders),
+        "total_sales": round(float(row.total_sales), 2),
+        "aov": round(float(aov), 2),
+        "total_customers": row.total_customers,
+        "top_customers": row.top_customers,
+    }
+
 def get_sales_comparison_data(db: Session) -> dict:
     today = date.today()
-    current_month = today.month
-    current_year = today.year
 
     # Previous month calculation
-    first_day_current = date(current_year, current_month, 1)
-    last_day_prev = first_day_current - timedelta(days=1)
-    prev_month = last_day_prev.month
-    prev_year = last_day_prev.year
-
-    # Sales this month up to today, excluding failed and cancelled
-    current_month_query = text("""
-        SELECT EXTRACT(DAY FROM created_at) AS day, SUM(total_amount) AS total
-        FROM orders
-        WHERE 
-            EXTRACT(MONTH FROM created_at) = :month AND
-            EXTRACT(YEAR FROM created_at) = :year AND
-            created_at <= :today AND
-            status NOT IN ('failed', 'cancelled')
-        GROUP BY day
-        ORDER BY day
-    """)
-    current_sales = db.execute(current_month_query, {
-        "month": current_month,
-        "year": current_year,
-        "today": today
-    }).fetchall()
-
-    # Full previous month, excluding failed and cancelled
-    prev_month_query = text("""
-        SELECT EXTRACT(DAY FROM created_at) AS day, SUM(total_amount) AS total
-        FROM orders
-        WHERE 
-            EXTRACT(MONTH FROM created_at) = :month AND
-            EXTRACT(YEAR FROM created_at) = :year AND
-            status NOT IN ('failed', 'cancelled')
-        GROUP BY day
-        ORDER BY day
-    """)
-    prev_sales = db.execute(prev_month_query, {
-        "month": prev_month,
-        "year": prev_year
-    }).fetchall()
+    first_day_current = today.replace(day=1)
+    first_day_prev = (first_day_current - timedelta(days=1)).replace(day=1)
+
+    # Daily sales from the start of last month up to today, excluding failed and cancelled
+    rows = (
+        db.query(DailySales.day, func.sum(DailySales.revenue).label("total"))
+        .filter(
+            DailySales.day >= first_day_prev,
+            DailySales.day <= today,
+            DailySales.status.notin_(["failed", "cancelled"]),
+        )
+        .group_by(DailySales.day)
+        .order_by(DailySales.day)
+        .all()
+    )
 
     return {
-        "currentMonth": [{"day": int(row.day), "total": float(row.total)} for row in current_sales],
-        "previousMonth": [{"day": int(row.day), "total": float(row.total)} for row in prev_sales]
+        "currentMonth": [{"day": row.day.day, "total": float(row.total)} for row in rows if row.day >= first_day_current],
+        "previousMonth": [{"day": row.day.day, "total": float(row.total)} for row in rows if row.day < first_day_current]
     }
 
 def get_orders_in_range_data(db: Session, start_date: str, end_date: str, granularity: str = "daily"):
     """
-    Get total order amount grouped by date/month/year depending on granularity.
+    Get total order amount grouped by date/month depending on granularity,
+    from the daily_sales rollup. Both ends of the range are inclusive days.
     """
-    base_query = db.query(Order).filter(
-        Order.created_at >= start_date,
-        Order.created_at <= end_date,
-        Order.status.in_(['completed'])
+    base_query = db.query(DailySales).filter(
+        DailySales.day >= datetime.fromisoformat(start_date).date(),
+        DailySales.day <= datetime.fromisoformat(end_date).date(),
+        DailySales.status.in_(['completed'])
     )
 
-    if granularity == "daily":
+    if granularity in ("daily", "monthly"):
         query = base_query.with_entities(
-            func.date(Order.created_at).label('date'),
-            func.sum(Order.total_amount).label('total_amount'),
-            func.count(Order.id).label('order_count')
-        ).group_by(func.date(Order.created_at)).order_by(func.date(Order.created_at))
-
-    elif granularity == "monthly":
-        query = base_query.with_entities(
-            func.date(Order.created_at).label('date'),
-            func.sum(Order.total_amount).label('total_amount'),
-            func.count(Order.id).label('order_count')
-        ).group_by(func.date(Order.created_at)).order_by(func.date(Order.created_at))
+            DailySales.day.label('date'),
+            func.sum(DailySales.revenue).label('total_amount'),
+            func.sum(DailySales.order_count).label('order_count')
+        ).group_by(DailySales.day).order_by(DailySales.day)
 
     elif granularity == "yearly":
+        month = func.to_char(DailySales.day, 'YYYY-MM')
         query = base_query.with_entities(
-            func.to_char(Order.created_at, 'YYYY-MM').label('date'),
-            func.sum(Order.total_amount).label('total_amount'),
-            func.count(Order.id).label('order_count')
-        ).group_by(func.to_char(Order.created_at, 'YYYY-MM')).order_by(func.to_char(Order.created_at, 'YYYY-MM'))
+            month.label('date'),
+            func.sum(DailySales.revenue).label('total_amount'),
+            func.sum(DailySales.order_count).label('order_count')
+        ).group_by(month).order_by(month)
 
     else:
         raise ValueError("Invalid granularity")
@@ -193,7 +202,7 @@ def get_orders_in_range_data(db: Session, start_date: str, end_date: str, granul
         {
             "date": str(row.date),
             "total_amount": round(float(row.total_amount), 3),
-            "order_count": row.order_count
+            "order_count": int(row.order_count)
         }
         for row in results
     ]
@@ -201,6 +210,7 @@ def get_orders_in_range_data(db: Session, start_date: str, end_date: str, granul
 def get_orders_data(db: Session) -> List[dict]:
     orders = (
         db.query(Order)
+        .options(joinedload(Order.customer))
         .order_by(Order.created_at.desc())
         .all()
     )
@@ -220,6 +230,66 @@ def get_orders_data(db: Session) -> List[dict]:
         for order in orders
     ]
 
+def apply_order_filters(
+    query,
+    statuses: list[str] | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    referrer: str | None = None,
+    customer_id: int | None = None,
+):
+    """Listing filters on Order, shared by /orders and /export. Works on Query and Select."""
+    if statuses:
+        query = query.where(Order.status.in_(statuses))
+    if start_date:
+        query = query.where(Order.created_at >= start_date)
+    if end_date:
+        query = query.where(Order.created_at < end_date + timedelta(days=1))
+    if referrer:
+        query = query.where(Order.attribution_referrer.ilike(f"%{referrer}%"))
+    if customer_id:
+        query = query.where(Order.customer_id == customer_id)
+    return query
+
+def get_orders_page_data(
+    db: Session,
+    limit: int,
+    after: tuple[datetime, int] | None = None,
+    statuses: list[str] | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    referrer: str | None = None,
+    customer_id: int | None = None,
+) -> List[dict]:
+    """
+    One page of orders, newest first, using a keyset on (created_at, id).
+
+    ``after`` is the (created_at, id) of the last row of the previous page;
+    the composite index ix_orders_created_at_id serves both the filter and
+    the ordering, so every page costs the same regardless of its depth.
+    """
+    query = (
+        db.query(
+            Order.id,
+            Order.external_id,
+            Order.customer_id,
+            func.nullif(func.concat_ws(" ", Customer.first_name, Customer.last_name), "").label("customer_name"),
+            Order.created_at,
+            Order.status,
+            Order.total_amount,
+            Order.payment_method,
+            Order.attribution_referrer,
+        )
+        .outerjoin(Customer, Customer.id == Order.customer_id)
+    )
+
+    if after:
+        query = query.filter(tuple_(Order.created_at, Order.id) < tuple_(*after))
+    query = apply_order_filters(query, statuses, start_date, end_date, referrer, customer_id)
+
+    rows = query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit).all()
+    return [dict(row._mapping) for row in rows]
+
 def get_attribution_summary(db: Session) -> List[dict]:
     results = (
         db.query(Order.attribution_referrer, func.count(Order.id))
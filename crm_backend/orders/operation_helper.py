@@ -1,5 +1,7 @@
 from crm_backend.orders.db_helper import *
+import base64
 import pandas as pd
+from datetime import datetime
 from urllib.parse import urlparse
 
 def get_latest_orders_dashboard(db):
@@ -34,6 +36,11 @@ def function_get_top_customers(db):
     top_customers_data = get_top_customers_data(db)
     return top_customers_data
 
+def function_get_dashboard_kpis(db):
+
+    kpis_data = get_dashboard_kpis_data(db)
+    return kpis_data
+
 def function_get_sales_comparison(db):
 
     sales_comparison_data = get_sales_comparison_data(db)
@@ -48,6 +55,45 @@ def function_get_orders_data(db):
     orders_data = get_orders_data(db)
     return orders_data
 
+def encode_orders_cursor(created_at: datetime, order_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{order_id}".encode()).decode()
+
+def decode_orders_cursor(cursor: str) -> tuple[datetime, int]:
+    """Raises ValueError for cursors not produced by encode_orders_cursor."""
+    try:
+        created_at, order_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(order_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def function_get_orders_page(db, limit=50, cursor=None, status=None, start_date=None, end_date=None, referrer=None, customer_id=None):
+    """
+    Keyset-paginated orders listing. ``status`` may be a comma separated list.
+    Returns {"items": [...], "next_cursor": str | None}.
+    """
+    after = decode_orders_cursor(cursor) if cursor else None
+    statuses = [s.strip() for s in status.split(",") if s.strip()] if status else None
+
+    # One extra row tells us whether there is a next page
+    rows = get_orders_page_data(
+        db,
+        limit=limit + 1,
+        after=after,
+        statuses=statuses,
+        start_date=start_date,
+        end_date=end_date,
+        referrer=referrer,
+        customer_id=customer_id,
+    )
+
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_orders_cursor(last["created_at"], last["id"])
+
+    return {"items": items, "next_cursor": next_cursor}
+
 # Mapping of domains to labels
 REFERRER_MAPPINGS = {
     'google.com': 'google',
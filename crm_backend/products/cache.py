@@ -0,0 +1,68 @@
+import os
+import threading
+import uuid
+from cachetools import LRUCache
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from crm_backend.models import Product, SyncState
+
+PRODUCT_CATALOG_VERSION_KEY = "product_catalog_version"
+PRODUCT_ID_CACHE_SIZE = int(os.getenv("PRODUCT_ID_CACHE_SIZE", 50000))
+
+def get_product_catalog_version(db: Session) -> str | None:
+    return db.scalar(select(SyncState.value).where(SyncState.key == PRODUCT_CATALOG_VERSION_KEY))
+
+def bump_product_catalog_version(db: Session) -> None:
+    """Invalidate every process' product cache once the caller commits."""
+    state = db.get(SyncState, PRODUCT_CATALOG_VERSION_KEY)
+    if state:
+        state.value = uuid.uuid4().hex
+    else:
+        db.add(SyncState(key=PRODUCT_CATALOG_VERSION_KEY, value=uuid.uuid4().hex))
+
+class ProductIdCache:
+    """
+    In-process cache answering "does a product with this WooCommerce id exist?".
+
+    Entries (positive and negative) are kept in a bounded LRU and are only
+    valid for the catalog version stored in SyncState; the product sync bumps
+    that version whenever a page inserts products, which clears the cache on the next
+    lookup in every worker. Misses are resolved with one bulk IN query.
+    """
+
+    def __init__(self, maxsize: int = PRODUCT_ID_CACHE_SIZE):
+        self._exists = LRUCache(maxsize=maxsize)
+        self._version = None
+        self._lock = threading.Lock()
+
+    def resolve(self, db: Session, external_ids) -> set[int]:
+        """Return the subset of ``external_ids`` present in the products table."""
+        external_ids = set(external_ids)
+        if not external_ids:
+            return set()
+
+        version = get_product_catalog_version(db)
+
+        with self._lock:
+            if version != self._version:
+                self._exists.clear()
+                self._version = version
+            cached = {pid: self._exists[pid] for pid in external_ids if pid in self._exists}
+
+        missing = external_ids - cached.keys()
+        if missing:
+            found = set(db.scalars(select(Product.external_id).where(Product.external_id.in_(missing))))
+            with self._lock:
+                if version == self._version:
+                    for pid in missing:
+                        self._exists[pid] = pid in found
+            cached.update({pid: pid in found for pid in missing})
+
+        return {pid for pid, exists in cached.items() if exists}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._exists.clear()
+            self._version = None
+
+product_id_cache = ProductIdCache()
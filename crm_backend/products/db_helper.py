@@ -155,4 +155,41 @@ def get_sales_over_time_data(db: Session, start_date: str, end_date: str, produc
             "total_sales": row.total_sales
         }
         for row in results
-    ]
\ No newline at end of file
+    ]
+
+def get_product_segmentation_data(db: Session) -> List[tuple]:
+    """
+    Per-product sales metrics for segmentation in one grouped query:
+    (product_id, product_name, regular_price, sales_price, stock_status,
+    total_units_sold, total_revenue, last_sold_date). Only completed orders
+    count; products that never sold are included with zeros.
+    """
+    sales = (
+        db.query(
+            OrderItem.product_id.label("product_id"),
+            func.sum(OrderItem.quantity).label("total_units_sold"),
+            func.sum(OrderItem.quantity * OrderItem.price).label("total_revenue"),
+            func.max(Order.created_at).label("last_sold_date"),
+        )
+        .join(Order, Order.id == OrderItem.order_id)
+        .filter(Order.status == "completed")
+        .filter(OrderItem.product_id.isnot(None))
+        .group_by(OrderItem.product_id)
+        .subquery()
+    )
+
+    return (
+        db.query(
+            Product.external_id,
+            Product.name,
+            Product.regular_price,
+            Product.sales_price,
+            Product.stock_status,
+            func.coalesce(sales.c.total_units_sold, 0),
+            func.coalesce(sales.c.total_revenue, 0.0),
+            sales.c.last_sold_date,
+        )
+        .outerjoin(sales, sales.c.product_id == Product.external_id)
+        .order_by(Product.external_id)
+        .all()
+    )
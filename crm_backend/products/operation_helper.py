@@ -1,4 +1,8 @@
 from crm_backend.products.db_helper import *
+from crm_backend.utils.model_registry import fit_segmentation_model, load_segmentation_model, rank_labels
+import pandas as pd
+from datetime import datetime
+from sqlalchemy.orm import Session
 
 def function_get_top_selling_products(db):
 
@@ -37,9 +41,23 @@ def function_get_sales_over_time(db, start_date, end_date, product_id):
 
 #helper function
 
-def segment_products(data):
+PRODUCT_SEGMENT_MODEL = "product_segments"
+PRODUCT_SEGMENT_FEATURES = ["total_units_sold", "total_revenue", "avg_price", "recency_days"]
+MIN_PRODUCTS_TO_SEGMENT = 4  # KMeans uses 4 clusters
+
+def label_product_clusters(centroids):
+    """Stable names for the product clusters, derived from their centroids."""
+    return rank_labels(centroids, [
+        ("Best Seller", "total_revenue", True),
+        ("Recent Spike", "recency_days", False),
+        ("Hidden Gem", "avg_price", True),
+        ("Low Performer", "total_units_sold", False),
+    ])
+
+def segment_products(data, refit=False):
     """
-    Apply KMeans clustering to segment products based on key metrics.
+    Segment products with the stored KMeans model based on key metrics.
+    The model is only fitted when ``refit`` is set (nightly) or none exists yet.
     """
     df = pd.DataFrame(data, columns=[
         "product_id", "product_name", "regular_price", "sales_price", "stock_status",
@@ -50,28 +68,18 @@ def segment_products(data):
     df["regular_price"] = df["regular_price"].fillna(0)
     df["sales_price"] = df["sales_price"].fillna(df["regular_price"])
     df["last_sold_date"] = pd.to_datetime(df["last_sold_date"], errors='coerce')
+    df["total_units_sold"] = df["total_units_sold"].fillna(0).astype(int)
+    df["total_revenue"] = df["total_revenue"].fillna(0).astype(float)
 
     today = datetime.now()
-    df["recency_days"] = df["last_sold_date"].apply(lambda d: (today - d).days if pd.notnull(d) else 999)
+    df["recency_days"] = (today - df["last_sold_date"]).dt.days.fillna(999).astype(int)
     df["avg_price"] = df["total_revenue"] / df["total_units_sold"].replace(0, 1)
 
-    # Features to cluster on
-    features = df[["total_units_sold", "total_revenue", "avg_price", "recency_days"]]
-
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(features)
+    model = None if refit else load_segmentation_model(PRODUCT_SEGMENT_MODEL)
+    if model is None and len(df) >= MIN_PRODUCTS_TO_SEGMENT:
+        model = fit_segmentation_model(PRODUCT_SEGMENT_MODEL, df, PRODUCT_SEGMENT_FEATURES, label_product_clusters)
 
-    kmeans = KMeans(n_clusters=4, random_state=42, n_init="auto")
-    df["segment"] = kmeans.fit_predict(X_scaled)
-
-    # Map segments (example, based on patterns you observe)
-    segment_map = {
-        0: "Low Performer",
-        1: "Best Seller",
-        2: "Hidden Gem",
-        3: "Recent Spike"
-    }
-    df["segment"] = df["segment"].apply(lambda x: segment_map.get(x, f"Segment {x}"))
+    df["segment"] = model.predict(df) if model is not None else "Unsegmented"
 
     return df[[
         "product_id", "product_name", "total_units_sold", "total_revenue",
@@ -84,3 +92,8 @@ def function_get_segmented_product_data(db: Session):
     df = segment_products(raw_data)
     return df.to_dict(orient="records")
 
+def refit_product_segment_model(db: Session) -> int:
+    """Nightly refit of the product segmentation model. Returns the number of products used."""
+    raw_data = get_product_segmentation_data(db)
+    segment_products(raw_data, refit=True)
+    return len(raw_data)
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 from crm_backend.database import get_db
+from crm_backend.utils.cache import cached
 from crm_backend.models import *  # Assuming Customer model is imported
 from crm_backend.customers.operation_helper import *
 from crm_backend.schemas.customer import *
@@ -9,24 +10,28 @@ from crm_backend.schemas.customer import *
 router = APIRouter()
 
 @router.get("/customers-table", response_model=List[dict])
+@cached("orders", "customers")
 def get_customers_table(db: Session = Depends(get_db)):
 
     response_data = function_get_customers_table(db=db)
     return response_data
 
 @router.get("/customer-details/{id}", response_model=CustomerDetailsResponse)
+@cached("orders", "customers")
 def get_customers_details(id: int, db: Session = Depends(get_db)):
 
     response_data = function_get_customers_details(db=db, id = id)
     return response_data
 
 @router.get("/customer-order-items-summary/{id}", response_model=List[dict])
+@cached("orders", "customers", "products")
 def get_customer_order_items_summary(id: int, db: Session = Depends(get_db)):
 
     response_data = function_get_customer_order_items_summary(db=db, id = id)
     return response_data
 
 @router.get("/customer-product-orders", response_model=List[ProductOrderData])
+@cached("orders", "customers", "products")
 def get_customer_product_orders(customer_id: int, product_external_id: int, db: Session = Depends(get_db)):
 
     response_data = function_get_customer_product_orders(db=db, customer_id=customer_id, product_external_id=product_external_id)
@@ -47,6 +52,7 @@ def get_customer_product_orders(customer_id: int, product_external_id: int, db:
 #     return response_data
     
 @router.get("/full-customer-classification", response_model=List[CustomerClassificationResponse])
+@cached("orders", "customers")
 def get_full_customer_classification(db: Session = Depends(get_db)):
 
     response_data = function_get_full_customer_classification(db=db)
@@ -54,6 +60,7 @@ def get_full_customer_classification(db: Session = Depends(get_db)):
     return response_data
 
 @router.get("/customers_with_low_churnRisk", response_model=List[CustomerClassificationResponse])
+@cached("orders", "customers")
 def get_customers_with_low_churnRisk(db: Session = Depends(get_db)):
 
     response_data = function_get_customers_with_low_churnRisk(db)
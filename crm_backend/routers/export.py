@@ -0,0 +1,42 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Literal, Optional
+from datetime import date, datetime
+from crm_backend.exports.operation_helper import EXPORT_FORMATS, function_stream_export
+
+router = APIRouter()
+
+@router.get("/export/{entity}")
+def export_entity(
+    entity: Literal["orders", "order_items", "customers"],
+    format: Literal["csv", "ndjson", "parquet"] = "csv",
+    status: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    referrer: Optional[str] = None,
+    customer_id: Optional[int] = None,
+):
+    """
+    Stream a full export with the /orders listing filters (for customers they
+    restrict which orders are counted). Rows are read with a server-side
+    cursor and sent in chunks; the sync generator runs in the threadpool so
+    long exports don't block the event loop.
+    """
+    filters = {
+        "statuses": [s.strip() for s in status.split(",") if s.strip()] if status else None,
+        "start_date": start_date,
+        "end_date": end_date,
+        "referrer": referrer,
+        "customer_id": customer_id,
+    }
+    try:
+        content = function_stream_export(entity, format, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filename = f"{entity}-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,56 +1,75 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List
 from typing import Optional
+from datetime import date
 from crm_backend.database import get_db
+from crm_backend.utils.cache import cached
 from crm_backend.models import Order, Customer  # Assuming Customer model is imported
 from crm_backend.orders.operation_helper import *
+from crm_backend.schemas.order import OrdersPage
 
 router = APIRouter()
 
 @router.get("/latest-orders", response_model=List[dict])
+@cached("orders", "customers")
 def get_latest_orders(db: Session = Depends(get_db)):
 
     response_data = get_latest_orders_dashboard(db=db)
     return response_data
 
 @router.get("/total-orders-count", response_model = List[dict])
+@cached("orders")
 def get_total_orders_count(db: Session = Depends(get_db)):
 
     response_data = function_get_total_orders_count(db=db)
     return response_data
 
 @router.get("/total-sales", response_model = List[dict])
+@cached("orders")
 def get_total_sales(db: Session = Depends(get_db)):
 
     response_data = function_get_total_sales(db=db)
     return response_data
 
 @router.get("/aov", response_model = List[dict])
+@cached("orders")
 def get_average_order_value(db: Session = Depends(get_db)):
 
     response_data = function_get_average_order_value(db=db)
     return response_data
 
 @router.get("/total-customers", response_model = List[dict])
+@cached("customers")
 def get_total_customers_count(db: Session = Depends(get_db)):
 
     response_data = function_get_total_customers_count(db=db)
     return response_data
 
 @router.get("/top-customers", response_model = List[dict])
+@cached("orders", "customers")
 def get_top_customers(db: Session = Depends(get_db)):
 
     response_data = function_get_top_customers(db)
     return response_data
 
+@router.get("/dashboard/kpis")
+@cached("orders", "customers")
+def get_dashboard_kpis(db: Session = Depends(get_db)):
+    """Total orders, total sales, AOV, total customers and top customers in one response."""
+
+    response_data = function_get_dashboard_kpis(db)
+    return response_data
+
 @router.get("/sales-comparison")
+@cached("orders")
 def get_sales_comparison(db: Session = Depends(get_db)):
 
     response_data = function_get_sales_comparison(db)
     return response_data
 
 @router.get("/orders-in-range", response_model = List[dict])
+@cached("orders")
 def get_orders_in_range(start_date: str, end_date: str, granularity: Optional[str] = "daily", db: Session = Depends(get_db)):
 
     response_data = function_get_orders_in_range(db=db, start_date=start_date, end_date=end_date, granularity=granularity)
@@ -58,19 +77,45 @@ def get_orders_in_range(start_date: str, end_date: str, granularity: Optional[st
     return response_data
 
 @router.get("/orders-data", response_model = List[dict])
+@cached("orders", "customers")
 def get_orders_data(db: Session = Depends(get_db)):
 
     response_data = function_get_orders_data(db=db)
 
     return response_data
 
+@router.get("/orders", response_model=OrdersPage)
+@cached("orders", "customers")
+def get_orders_page(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    referrer: Optional[str] = None,
+    customer_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """Orders newest first, ``limit`` per page; follow ``next_cursor`` for the next page."""
+    try:
+        response_data = function_get_orders_page(
+            db=db, limit=limit, cursor=cursor, status=status, start_date=start_date,
+            end_date=end_date, referrer=referrer, customer_id=customer_id,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return response_data
+
 @router.get("/attribution-summary", response_model = List[dict])
+@cached("orders")
 def get_attribution_summary_data(db: Session = Depends(get_db)):
 
     response_data = function_get_attribution_summary(db=db)
     return response_data
 
 @router.get("/orders-by-location", response_model = List[dict])
+@cached("orders", "customers")
 def get_orders_by_location(db: Session = Depends(get_db)):
 
     response_data = function_get_orders_by_location(db=db)
@@ -78,6 +123,7 @@ def get_orders_by_location(db: Session = Depends(get_db)):
     return response_data
 
 @router.get("/orders-by-city", response_model = List[dict])
+@cached("orders", "customers")
 def get_orders_by_city(db: Session = Depends(get_db)):
 
     response_data = function_get_orders_orderid_city(db=db)
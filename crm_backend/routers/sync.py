@@ -1,24 +1,33 @@
 # crm_backend/routers/sync.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from crm_backend.database import SessionLocal
-# from utils.fetch_orders import fetch_and_save_orders
-from crm_backend.tasks.fetch_orders import fetch_and_save_orders
-from crm_backend.tasks.fetch_products import fetch_and_save_products
 from dotenv import load_dotenv
 from crm_backend.models import WhatsAppTemplate
 import os
-import requests
-from datetime import datetime
 from typing import List
 from crm_backend.schemas.templates import WhatsAppTemplateBase
+from crm_backend.tasks import (
+    apply_woocommerce_order_task, fetch_orders_task, fetch_products_task,
+    SYNC_LOCKS, TEMPLATES_SYNC_LOCK, TEMPLATES_SYNC_LOCK_TTL,
+)
+from crm_backend.tasks.sync_templates import sync_whatsapp_templates
+from crm_backend.utils.cache import get_cache_stats
+from crm_backend.utils.locks import single_flight, get_lock_metrics
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
 
 router = APIRouter()
 
 load_dotenv()
 
-ACCESS_TOKEN = os.getenv("WHATSAPP_ACCESS_TOKEN")
-WABA_ID = os.getenv("WABA_ID")
+WC_WEBHOOK_SECRET = os.getenv("WC_WEBHOOK_SECRET")
+
+# Deleted orders only carry an id, they are left to the reconciliation sweep
+WC_ORDER_TOPICS = {"order.created", "order.updated", "order.restored"}
 
 # Dependency to get DB session
 def get_db():
@@ -30,50 +39,59 @@ def get_db():
 
 @router.post("/sync-orders/")
 def trigger_sync_all():
-    fetch_and_save_orders()
+    fetch_orders_task.delay()
     return {"message": "Order sync task dispatched"}
 
 @router.post("/sync-products/")
-def trigger_sync_all():
-    fetch_and_save_products()
+def trigger_sync_products():
+    fetch_products_task.delay()
     return {"message": "Product sync task dispatched"}
 
+@router.get("/sync/locks")
+def get_sync_lock_metrics():
+    return get_lock_metrics(SYNC_LOCKS)
+
+@router.get("/cache/stats")
+def get_response_cache_stats():
+    return get_cache_stats()
+
+def verify_woocommerce_signature(body: bytes, signature: str | None) -> bool:
+    """WooCommerce signs the raw body with base64(HMAC-SHA256(secret, body))."""
+    if not WC_WEBHOOK_SECRET or not signature:
+        return False
+    digest = hmac.new(WC_WEBHOOK_SECRET.encode(), body, hashlib.sha256).digest()
+    return hmac.compare_digest(base64.b64encode(digest).decode(), signature)
+
+@router.post("/woocommerce/webhook")
+async def woocommerce_webhook(request: Request):
+    body = await request.body()
+
+    # WooCommerce pings a newly saved webhook with a form body, just acknowledge it
+    if body.startswith(b"webhook_id="):
+        return {"status": "pong"}
+
+    if not verify_woocommerce_signature(body, request.headers.get("X-WC-Webhook-Signature")):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    topic = request.headers.get("X-WC-Webhook-Topic", "")
+    if topic not in WC_ORDER_TOPICS:
+        return {"status": "ignored", "topic": topic}
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+
+    # delay() is a blocking broker publish, keep it off the event loop
+    await asyncio.to_thread(apply_woocommerce_order_task.delay, payload)
+    return {"status": "queued", "topic": topic}
+
 @router.post("/sync-templates")
 def sync_templates(db: Session = Depends(get_db)):
-    url = f"https://graph.facebook.com/v20.0/{WABA_ID}/message_templates"
-    headers = {"Authorization": f"Bearer {ACCESS_TOKEN}"}
-    response = requests.get(url, headers=headers)
-
-    if response.status_code != 200:
-        return {"error": response.json()}
-
-    templates = response.json().get("data", [])
-
-    for t in templates:
-        body_component = next((c for c in t.get("components", []) if c["type"] == "BODY"), {})
-        
-        # UPSERT logic using SQLAlchemy ORM
-        existing = db.query(WhatsAppTemplate).filter_by(template_name=t["name"]).first()
-        if existing:
-            existing.category = t["category"]
-            existing.language = t["language"]
-            existing.status = t["status"]
-            existing.body = body_component.get("text")
-            existing.updated_at = datetime.utcnow()
-        else:
-            new_template = WhatsAppTemplate(
-                template_name=t["name"],
-                category=t["category"],
-                language=t["language"],
-                status=t["status"],
-                body=body_component.get("text"),
-                updated_at=datetime.utcnow()
-            )
-            db.add(new_template)
-
-    db.commit()
-
-    return {"message": f"✅ Synced {len(templates)} templates"}
+    with single_flight(TEMPLATES_SYNC_LOCK, ttl=TEMPLATES_SYNC_LOCK_TTL) as acquired:
+        if not acquired:
+            return {"message": "Template sync already running, skipped"}
+        return sync_whatsapp_templates(db)
 
 @router.get("/templates/", response_model=List[WhatsAppTemplateBase])
 def get_templates(db: Session = Depends(get_db)):
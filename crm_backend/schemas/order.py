@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class OrderListItem(BaseModel):
+    id: int
+    external_id: Optional[int]
+    customer_id: Optional[int]
+    customer_name: Optional[str]
+    created_at: datetime
+    status: str
+    total_amount: float
+    payment_method: Optional[str]
+    attribution_referrer: Optional[str]
+
+class OrdersPage(BaseModel):
+    items: List[OrderListItem]
+    next_cursor: Optional[str]  # pass back as ?cursor= to get the next page, null on the last page
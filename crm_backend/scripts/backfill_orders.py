@@ -1,13 +1,19 @@
 # crm_backend/scripts/backfill_orders.py
 
 from crm_backend.database import SessionLocal
-from crm_backend.tasks.fetch_orders import backfill_existing_orders
+from crm_backend.tasks import ORDERS_SYNC_LOCK, ORDERS_SYNC_LOCK_TTL
+from crm_backend.tasks.fetch_orders import fetch_all_orders_once
+from crm_backend.utils.locks import single_flight
 
 if __name__ == "__main__":
     print("🚀 Starting backfill...")
-    db = SessionLocal()
-    try:
-        backfill_existing_orders(db)
-    finally:
-        db.close()
+    # Holding the orders lease makes the periodic sync skip while we backfill
+    with single_flight(ORDERS_SYNC_LOCK, ttl=ORDERS_SYNC_LOCK_TTL) as acquired:
+        if not acquired:
+            raise SystemExit("❌ An order sync is already running, try again later.")
+        db = SessionLocal()
+        try:
+            fetch_all_orders_once(db)
+        finally:
+            db.close()
     print("✅ Backfill completed.")
@@ -0,0 +1,19 @@
+# crm_backend/scripts/rebuild_customer_metrics.py
+#
+# Fill / recompute the customer_metrics table (also done nightly by
+# rebuild_customer_metrics_task). Run once after the customer_metrics migration.
+
+from crm_backend.customers.metrics import rebuild_customer_metrics
+from crm_backend.database import SessionLocal
+from crm_backend.utils.cache import bump_cache_domains
+
+if __name__ == "__main__":
+    print("🚀 Rebuilding customer_metrics...")
+    db = SessionLocal()
+    try:
+        count = rebuild_customer_metrics(db)
+        db.commit()
+        bump_cache_domains("customers")
+    finally:
+        db.close()
+    print(f"✅ customer_metrics rebuilt for {count} customers.")
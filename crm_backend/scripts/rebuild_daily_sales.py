@@ -0,0 +1,19 @@
+# crm_backend/scripts/rebuild_daily_sales.py
+#
+# Recompute the daily_sales rollup from the orders table, e.g. after orders
+# were edited by hand. Run it while order syncs are paused.
+
+from crm_backend.database import SessionLocal
+from crm_backend.orders.daily_sales import rebuild_daily_sales
+from crm_backend.utils.cache import bump_cache_domains
+
+if __name__ == "__main__":
+    print("🚀 Rebuilding daily_sales...")
+    db = SessionLocal()
+    try:
+        rebuild_daily_sales(db)
+        db.commit()
+        bump_cache_domains("orders")
+    finally:
+        db.close()
+    print("✅ daily_sales rebuilt.")
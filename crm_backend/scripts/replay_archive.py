@@ -0,0 +1,60 @@
+# crm_backend/scripts/replay_archive.py
+#
+# Re-ingest archived WooCommerce payloads (see utils/payload_archive.py)
+# through the same bulk paths the syncs use, without calling WooCommerce.
+#
+#   python -m crm_backend.scripts.replay_archive                # products, then orders
+#   python -m crm_backend.scripts.replay_archive orders --since 2025-06-01
+#   python -m crm_backend.scripts.replay_archive orders --id 12345
+
+import argparse
+import json
+from crm_backend.database import SessionLocal
+from crm_backend.products.cache import bump_product_catalog_version
+from crm_backend.tasks.fetch_orders import process_orders_page
+from crm_backend.tasks.fetch_products import save_products_page
+from crm_backend.utils.cache import bump_cache_domains
+from crm_backend.utils.payload_archive import KINDS, iter_pages, load_latest
+
+def replay(db, kind: str, since: str | None = None) -> int:
+    replayed = 0
+    for records in iter_pages(kind, modified_since=since):
+        if not records:
+            continue
+        try:
+            if kind == "products":
+                if save_products_page(db, records)["inserted"]:
+                    bump_product_catalog_version(db)
+            else:
+                # Archived status changes were already notified when first synced
+                process_orders_page(db, records, notify=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        replayed += len(records)
+        print(f"✅ Replayed {replayed} {kind}")
+    return replayed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay archived WooCommerce payloads into the database.")
+    parser.add_argument("kind", nargs="?", choices=KINDS, help="Only replay this kind (default: products, then orders)")
+    parser.add_argument("--since", help="Only records modified at/after this ISO date (GMT)")
+    parser.add_argument("--id", type=int, help="Print the latest archived payload for this external id instead of replaying")
+    args = parser.parse_args()
+
+    if args.id is not None:
+        record = load_latest(args.kind or "orders", args.id)
+        print(json.dumps(record, indent=2, ensure_ascii=False) if record else "❌ Not found in archive")
+        raise SystemExit(0)
+
+    db = SessionLocal()
+    try:
+        # Products first so order line items resolve to known products
+        for kind in ([args.kind] if args.kind else ["products", "orders"]):
+            print(f"🚀 Replaying {kind}...")
+            replay(db, kind, args.since)
+    finally:
+        db.close()
+        bump_cache_domains("orders", "customers", "products")
+    print("✅ Replay completed.")
@@ -1,30 +1,149 @@
 from crm_backend.celery_app import celery
 from celery import shared_task
-from crm_backend.tasks.fetch_orders import fetch_and_save_orders
+from crm_backend.tasks.fetch_orders import fetch_and_save_orders, process_orders_page
 from crm_backend.tasks.fetch_products import fetch_and_save_products
+from crm_backend.tasks.order_notifications import send_pending_order_notifications
 from crm_backend.database import SessionLocal
+from crm_backend.tasks.sync_templates import sync_whatsapp_templates
+from crm_backend.utils.cache import bump_cache_domains
+from crm_backend.utils.locks import single_flight
 from crm_backend.tasks.reorder_messaging import predict_customers_to_remind, send_reorder_reminders_to_customers
 from crm_backend.tasks.whatsapp_msg_after_one_month import send_whatsapp_message_after_one_month
-from crm_backend.tasks.sending_to_low_churn_customers import helper_function_to_sending_message_to_low_churn_risk_customers, send_whatsapp_forecast_message
+from crm_backend.tasks.sending_to_low_churn_customers import helper_function_to_sending_message_to_low_churn_risk_customers, send_whatsapp_forecast_message, FORECAST_TEMPLATES, LOW_CHURN_CAMPAIGN
 from crm_backend.customers.operation_helper import function_get_dead_customers
-from crm_backend.tasks.sending_to_dead_customers import send_whatsapp_dead_customer_message
+from crm_backend.customers.metrics import rebuild_customer_metrics
+from crm_backend.products.operation_helper import refit_product_segment_model
+from crm_backend.tasks.sending_to_dead_customers import send_whatsapp_dead_customer_message, DEAD_CUSTOMER_TEMPLATES, DEAD_CUSTOMERS_CAMPAIGN
+from crm_backend.tasks.message_ledger import send_once
+from crm_backend.tasks.campaign_sender import CAMPAIGN_CHUNK_SIZE, CAMPAIGN_MAX_ATTEMPTS, send_campaign_chunk, sweep_stale_campaigns
+
+# Single-flight leases (seconds) around the sync jobs; renewed while the job runs
+ORDERS_SYNC_LOCK, ORDERS_SYNC_LOCK_TTL = "sync:orders", 120
+PRODUCTS_SYNC_LOCK, PRODUCTS_SYNC_LOCK_TTL = "sync:products", 300
+TEMPLATES_SYNC_LOCK, TEMPLATES_SYNC_LOCK_TTL = "sync:templates", 60
+SYNC_LOCKS = [ORDERS_SYNC_LOCK, PRODUCTS_SYNC_LOCK, TEMPLATES_SYNC_LOCK]
 
 @celery.task(name="fetch_orders_task")
 def fetch_orders_task(*args, **kwargs):
+    with single_flight(ORDERS_SYNC_LOCK, ttl=ORDERS_SYNC_LOCK_TTL) as acquired:
+        if not acquired:
+            return
+        db = SessionLocal()
+        try:
+            if fetch_and_save_orders(db):
+                bump_cache_domains("orders", "customers", "products")
+        finally:
+            db.close()
+
+@celery.task(name="apply_woocommerce_order_task", bind=True, max_retries=5, default_retry_delay=30)
+def apply_woocommerce_order_task(self, payload: dict):
+    """Apply an order pushed by the WooCommerce webhook through the bulk ingestion path."""
     db = SessionLocal()
     try:
-        fetch_and_save_orders(db)
+        result = process_orders_page(db, [payload])
+        db.commit()
+        if result["inserted"] or result["updated"]:
+            bump_cache_domains("orders", "customers", "products")
+        print(f"✅ Applied webhook order #{payload.get('id')}: {result}")
+        return result
+    except Exception as exc:
+        db.rollback()
+        print(f"❌ Failed to apply webhook order #{payload.get('id')}: {exc}")
+        raise self.retry(exc=exc)
     finally:
         db.close()
 
 @celery.task(name="fetch_products_task")
 def fetch_products_task(*args, **kwargs):
+    with single_flight(PRODUCTS_SYNC_LOCK, ttl=PRODUCTS_SYNC_LOCK_TTL) as acquired:
+        if not acquired:
+            return
+        db = SessionLocal()
+        try:
+            totals = fetch_and_save_products(db)
+            if totals["inserted"] or totals["updated"]:
+                bump_cache_domains("products")
+        finally:
+            db.close()
+
+@celery.task(name="sync_templates_task")
+def sync_templates_task(*args, **kwargs):
+    with single_flight(TEMPLATES_SYNC_LOCK, ttl=TEMPLATES_SYNC_LOCK_TTL) as acquired:
+        if not acquired:
+            return
+        db = SessionLocal()
+        try:
+            return sync_whatsapp_templates(db)
+        finally:
+            db.close()
+
+@celery.task(name="send_order_status_notifications_task")
+def send_order_status_notifications_task(*args, **kwargs):
+    """Drain the order status outbox filled by order ingestion."""
+    db = SessionLocal()
+    try:
+        return send_pending_order_notifications(db)
+    finally:
+        db.close()
+
+@celery.task(name="rebuild_customer_metrics_task")
+def rebuild_customer_metrics_task(*args, **kwargs):
+    """Nightly full recompute of customer_metrics, refitting the customer segmentation model."""
+    db = SessionLocal()
+    try:
+        count = rebuild_customer_metrics(db)
+        db.commit()
+        bump_cache_domains("customers")
+        print(f"✅ Rebuilt metrics for {count} customers")
+        return count
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+@celery.task(name="refit_product_segments_task")
+def refit_product_segments_task(*args, **kwargs):
+    """Nightly refit of the product segmentation model served by /segment-products."""
+    db = SessionLocal()
+    try:
+        count = refit_product_segment_model(db)
+        bump_cache_domains("products")
+        return count
+    finally:
+        db.close()
+
+@celery.task(name="send_campaign_chunk_task", bind=True, max_retries=CAMPAIGN_MAX_ATTEMPTS)
+def send_campaign_chunk_task(self, campaign_id: int, recipient_ids: list[int]):
+    """Send one chunk of a campaign, retrying with backoff while transient failures are pending."""
+    db = SessionLocal()
+    try:
+        stats = send_campaign_chunk(db, campaign_id, recipient_ids)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    if stats["pending"]:
+        raise self.retry(countdown=30 * 2 ** self.request.retries)
+    return stats
+
+@celery.task(name="sweep_stale_campaigns_task")
+def sweep_stale_campaigns_task(*args, **kwargs):
+    """Requeue campaign recipients left behind by crashed chunk tasks and complete finished campaigns."""
     db = SessionLocal()
     try:
-        fetch_and_save_products(db)
+        requeue = sweep_stale_campaigns(db)
     finally:
         db.close()
 
+    for campaign_id, recipient_ids in requeue.items():
+        for i in range(0, len(recipient_ids), CAMPAIGN_CHUNK_SIZE):
+            send_campaign_chunk_task.delay(campaign_id, recipient_ids[i:i + CAMPAIGN_CHUNK_SIZE])
+        print(f"♻️ Requeued {len(recipient_ids)} recipients of campaign #{campaign_id}")
+    return {campaign_id: len(ids) for campaign_id, ids in requeue.items()}
+
 # @celery.task(name="predict_customers_task")
 # def predict_customers_task():
 #     customer_ids = predict_customers_to_remind()
@@ -57,17 +176,29 @@ def send_forecast_messages_to_low_churn_task():
             print("📭 No forecasted purchases today.")
             return
 
+        # English + Arabic message per customer, skipping the ones already sent today
+        planned = []
         for _, row in todays_forecasts.iterrows():
-            phone_number = row["phone"]
-            customer_name = row["customer_name"]
-
-            # English message
-            status_en, result_en = send_whatsapp_forecast_message(phone_number, customer_name, "en")
-            print(f"[EN] Sent to {customer_name} ({phone_number}): {status_en} - {result_en}")
+            for lang in ["en", "ar"]:
+                template_name = FORECAST_TEMPLATES[lang]["template_name"]
+                planned.append({
+                    "customer_id": int(row["customer_id"]),
+                    "template_name": template_name,
+                    "message": f"[{template_name}] {row['customer_name']}",
+                    "customer_name": row["customer_name"],
+                    "phone_number": row["phone"],
+                    "language": lang,
+                })
 
-            # Arabic message
-            status_ar, result_ar = send_whatsapp_forecast_message(phone_number, customer_name, "ar")
-            print(f"[AR] Sent to {customer_name} ({phone_number}): {status_ar} - {result_ar}")
+        results = send_once(
+            db, LOW_CHURN_CAMPAIGN, planned,
+            lambda m: send_whatsapp_forecast_message(m["phone_number"], m["customer_name"], m["language"]),
+        )
+        for r in results:
+            if r["result"] == "duplicate":
+                print(f"[{r['language'].upper()}] Already sent to {r['customer_name']} ({r['phone_number']}) today, skipping")
+            else:
+                print(f"[{r['language'].upper()}] Sent to {r['customer_name']} ({r['phone_number']}): {r['status_code']} - {r['response']}")
     except Exception as e:
         print(f"[ERROR] Failed to send forecast messages: {e}")
     finally:
@@ -85,6 +216,8 @@ def send_dead_customers_messages():
     try:
         dead_customers = function_get_dead_customers(db)
 
+        planned = []
+        customer_results = {}
         for customer in dead_customers:
             phone = customer.get("phone")
             if not phone:
@@ -94,23 +227,36 @@ def send_dead_customers_messages():
                 })
                 continue
 
-            customer_results = {"customer_id": customer["customer_id"], "statuses": {}}
+            customer_results[customer["customer_id"]] = {"customer_id": customer["customer_id"], "statuses": {}}
 
             # Send English + Arabic
             for lang in ["en", "ar"]:
-                try:
-                    status_code, resp = send_whatsapp_dead_customer_message(
-                        phone_number=phone,
-                        customer_name=customer["customer_name"],
-                        language=lang,
-                    )
-                    customer_results["statuses"][lang] = (
-                        "Success" if status_code == 200 else f"Failed - {resp}"
-                    )
-                except Exception as e:
-                    customer_results["statuses"][lang] = f"Failed - {str(e)}"
-
-            results.append(customer_results)
+                template_name = DEAD_CUSTOMER_TEMPLATES[lang]["template_name"]
+                planned.append({
+                    "customer_id": customer["customer_id"],
+                    "template_name": template_name,
+                    "message": f"[{template_name}] {customer['customer_name']}",
+                    "customer_name": customer["customer_name"],
+                    "phone_number": phone,
+                    "language": lang,
+                })
+
+        # Already messaged today (retry or re-run) → not sent again
+        for r in send_once(
+            db, DEAD_CUSTOMERS_CAMPAIGN, planned,
+            lambda m: send_whatsapp_dead_customer_message(
+                phone_number=m["phone_number"], customer_name=m["customer_name"], language=m["language"]
+            ),
+        ):
+            if r["result"] == "sent":
+                status = "Success"
+            elif r["result"] == "duplicate":
+                status = "Skipped - Already sent today"
+            else:
+                status = f"Failed - {r['response']}"
+            customer_results[r["customer_id"]]["statuses"][r["language"]] = status
+
+        results.extend(customer_results.values())
 
     finally:
         db.close()
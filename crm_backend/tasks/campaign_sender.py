@@ -0,0 +1,201 @@
+"""
+Sends the recipients of a campaign (see campaigns/operation_helper.py).
+
+Each Celery chunk task claims its pending recipients by moving them to
+"sending" (committed before any request goes out), sends them concurrently
+over one AsyncWhatsAppClient and writes the results back. A Redis token
+bucket shared by all workers keeps the total send rate under the phone
+number's Meta throughput tier, however many chunks run at once.
+
+A worker that dies mid-chunk leaves its rows in "sending";
+sweep_stale_campaigns (run by beat) releases claims older than
+CAMPAIGN_CLAIM_TIMEOUT, queues the recipients again and completes
+campaigns that have nothing left to send.
+"""
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+import httpx
+import redis.asyncio
+from sqlalchemy import exists, func, select, update
+from sqlalchemy.orm import Session
+from crm_backend.celery_app import REDIS_BROKER_URL
+from crm_backend.models import Campaign, CampaignRecipient
+from crm_backend.utils.rate_limit import AsyncTokenBucket
+from crm_backend.utils.whatsapp_client import (
+    RETRYABLE_ERRORS, SEND_RETRYABLE_STATUS_CODES, WHATSAPP_PHONE_NUMBER_ID, AsyncWhatsAppClient,
+)
+
+CAMPAIGN_CHUNK_SIZE = int(os.getenv("CAMPAIGN_CHUNK_SIZE", 200))
+CAMPAIGN_CONCURRENCY = int(os.getenv("CAMPAIGN_CONCURRENCY", 20))  # in-flight requests per chunk
+# Meta's default business phone number throughput is 80 messages/second,
+# raise this when the number is moved to a higher tier
+WHATSAPP_MESSAGES_PER_SECOND = float(os.getenv("WHATSAPP_MESSAGES_PER_SECOND", 80))
+CAMPAIGN_MAX_ATTEMPTS = 3
+# Longer than a chunk can take, backoff retries of the WhatsApp client included
+CAMPAIGN_CLAIM_TIMEOUT = timedelta(minutes=int(os.getenv("CAMPAIGN_CLAIM_TIMEOUT_MINUTES", 15)))
+
+async def _send_one(client: AsyncWhatsAppClient, bucket: AsyncTokenBucket, semaphore: asyncio.Semaphore, recipient: dict) -> dict:
+    async with semaphore:
+        await bucket.acquire()
+        try:
+            status_code, body = await client.send_template(
+                recipient["phone"], recipient["template_name"], recipient["variables"], recipient["language"] or "en_US"
+            )
+        except httpx.HTTPError as e:
+            # Only connection errors prove the request never reached Meta
+            return {
+                "id": recipient["id"], "status_code": None, "error": f"{type(e).__name__}: {e}",
+                "transient": isinstance(e, RETRYABLE_ERRORS),
+            }
+
+    if status_code in (200, 201):
+        message_id = (body.get("messages") or [{}])[0].get("id") if isinstance(body, dict) else None
+        return {"id": recipient["id"], "status_code": status_code, "message_id": message_id}
+    # Other server errors may come after the message went out, so only these are worth another attempt
+    return {
+        "id": recipient["id"], "status_code": status_code, "error": f"{status_code}: {body}",
+        "transient": status_code in SEND_RETRYABLE_STATUS_CODES,
+    }
+
+async def send_recipients(recipients: list[dict]) -> list[dict]:
+    """Send template messages to ``recipients`` concurrently within the shared rate limit."""
+    redis_client = redis.asyncio.Redis.from_url(REDIS_BROKER_URL, decode_responses=True)
+    bucket = AsyncTokenBucket(
+        f"whatsapp:{WHATSAPP_PHONE_NUMBER_ID}", WHATSAPP_MESSAGES_PER_SECOND, redis=redis_client
+    )
+    semaphore = asyncio.Semaphore(CAMPAIGN_CONCURRENCY)
+    try:
+        async with AsyncWhatsAppClient(pool_size=CAMPAIGN_CONCURRENCY) as client:
+            return await asyncio.gather(*(_send_one(client, bucket, semaphore, r) for r in recipients))
+    finally:
+        await redis_client.aclose()
+
+def finish_campaign_if_done(db: Session, campaign_id: int) -> bool:
+    """Mark the campaign completed once no recipient is pending or being sent."""
+    pending = exists().where(
+        CampaignRecipient.campaign_id == campaign_id, CampaignRecipient.state.in_(["pending", "sending"])
+    )
+    result = db.execute(
+        update(Campaign)
+        .where(Campaign.id == campaign_id, Campaign.status != "completed", ~pending)
+        .values(status="completed", finished_at=datetime.utcnow())
+    )
+    db.commit()
+    return bool(result.rowcount)
+
+def send_campaign_chunk(db: Session, campaign_id: int, recipient_ids: list[int]) -> dict:
+    """
+    Send the still pending recipients among ``recipient_ids``.
+
+    Recipients that failed transiently stay pending until CAMPAIGN_MAX_ATTEMPTS;
+    the returned ``pending`` count tells the task to retry the chunk.
+    """
+    stats = {"sent": 0, "failed": 0, "pending": 0}
+
+    # Claim and commit before sending, so no transaction stays open during the requests
+    claimable = (
+        select(CampaignRecipient.id)
+        .where(CampaignRecipient.id.in_(recipient_ids), CampaignRecipient.state == "pending")
+        .with_for_update(skip_locked=True)
+    )
+    claimed_ids = db.execute(
+        update(CampaignRecipient)
+        .where(CampaignRecipient.id.in_(claimable.scalar_subquery()))
+        .values(state="sending", claimed_at=datetime.utcnow())
+        .returning(CampaignRecipient.id)
+    ).scalars().all()
+    if not claimed_ids:
+        db.rollback()
+        finish_campaign_if_done(db, campaign_id)
+        return stats
+
+    db.execute(
+        update(Campaign)
+        .where(Campaign.id == campaign_id, Campaign.status == "queued")
+        .values(status="running", started_at=datetime.utcnow())
+    )
+    db.commit()
+
+    recipients = db.execute(
+        select(CampaignRecipient).where(CampaignRecipient.id.in_(claimed_ids)).order_by(CampaignRecipient.id)
+    ).scalars().all()
+
+    results = asyncio.run(send_recipients([
+        {
+            "id": r.id,
+            "phone": r.phone,
+            "template_name": r.template_name,
+            "language": r.language,
+            "variables": json.loads(r.variables),
+        }
+        for r in recipients
+    ]))
+
+    by_id = {r.id: r for r in recipients}
+    now = datetime.utcnow()
+    for result in results:
+        recipient = by_id[result["id"]]
+        recipient.attempts += 1
+        if "error" not in result:
+            recipient.state = "sent"
+            recipient.whatsapp_message_id = result["message_id"]
+            recipient.sent_at = now
+            recipient.last_error = None
+            stats["sent"] += 1
+            continue
+
+        recipient.last_error = result["error"]
+        if result["transient"] and recipient.attempts < CAMPAIGN_MAX_ATTEMPTS:
+            recipient.state = "pending"
+            stats["pending"] += 1
+        else:
+            recipient.state = "failed"
+            stats["failed"] += 1
+
+    db.commit()
+    finish_campaign_if_done(db, campaign_id)
+    print(f"📣 Campaign #{campaign_id} chunk: {stats}")
+    return stats
+
+def sweep_stale_campaigns(db: Session) -> dict:
+    """
+    Recover campaigns whose chunk tasks died: release "sending" claims older
+    than CAMPAIGN_CLAIM_TIMEOUT, return the campaigns whose pending recipients
+    have seen no claim for that long as ``{campaign_id: [recipient ids]}`` to be
+    queued again, and complete campaigns with nothing left. Commits.
+    """
+    cutoff = datetime.utcnow() - CAMPAIGN_CLAIM_TIMEOUT
+
+    released = db.execute(
+        update(CampaignRecipient)
+        .where(CampaignRecipient.state == "sending", CampaignRecipient.claimed_at < cutoff)
+        .values(state="pending")
+        .returning(CampaignRecipient.campaign_id)
+    ).scalars().all()
+    if released:
+        print(f"♻️ Released {len(released)} stale campaign claims")
+
+    active = db.execute(
+        select(Campaign.id).where(Campaign.status.in_(["queued", "running"]), Campaign.created_at < cutoff)
+    ).scalars().all()
+    db.commit()
+
+    requeue = {}
+    for campaign_id in active:
+        last_claim = db.execute(
+            select(func.max(CampaignRecipient.claimed_at)).where(CampaignRecipient.campaign_id == campaign_id)
+        ).scalar()
+        if last_claim is not None and last_claim >= cutoff:
+            continue  # still being worked on
+        pending_ids = db.execute(
+            select(CampaignRecipient.id)
+            .where(CampaignRecipient.campaign_id == campaign_id, CampaignRecipient.state == "pending")
+            .order_by(CampaignRecipient.id)
+        ).scalars().all()
+        if pending_ids:
+            requeue[campaign_id] = pending_ids
+        else:
+            finish_campaign_if_done(db, campaign_id)
+    return requeue
@@ -1,8 +1,15 @@
 import httpx
+from sqlalchemy import and_, func, insert, or_, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
-from crm_backend.models import Customer, Address, Order, OrderItem, Product, SyncState
-from crm_backend.tasks.send_whatsapp import send_whatsapp_template
-from datetime import datetime, timedelta
+from crm_backend.models import Customer, Address, Order, OrderItem, OrderStatusEvent, SyncState
+from crm_backend.customers.metrics import refresh_customer_metrics
+from crm_backend.customers.phone_lookup import phone_last8
+from crm_backend.orders.daily_sales import DailySalesDeltas
+from crm_backend.products.cache import product_id_cache
+from crm_backend.tasks.woocommerce_fetcher import fetch_all_pages
+from crm_backend.utils.payload_archive import safe_append_page
+from datetime import datetime, timedelta, timezone
 import os
 from dotenv import load_dotenv
 from dateutil.parser import isoparse
@@ -13,6 +20,18 @@ WC_BASE_URL = "https://souqalsultan.com/wp-json/wc/v3/orders"
 WC_CONSUMER_KEY = os.getenv("WC_CONSUMER_KEY")
 WC_CONSUMER_SECRET = os.getenv("WC_CONSUMER_SECRET")
 
+LAST_ORDER_SYNC_KEY = "last_order_sync"
+DEFAULT_LAST_SYNCED_TIME = "2000-01-01T00:00:00Z"
+
+# First cursor sync (no cursor stored yet) looks this far back
+INITIAL_SYNC_WINDOW = timedelta(days=4)
+# Re-read a small window before the cursor so orders committed on the store
+# with a slightly older modified date are not missed; upserts make it harmless
+CURSOR_OVERLAP = timedelta(minutes=2)
+# The next page is requested from the last page's newest modified date minus
+# this, so orders sharing that (whole second) date are not skipped
+KEYSET_OVERLAP = timedelta(seconds=1)
+
 WHATSAPP_TEMPLATES = {
     "processing": "order_processing",
     "completed": "order_completed",
@@ -55,234 +74,494 @@ def normalize_existing_phones(db: Session) -> None:
 
             print(f"Updating Customer ID {customer.id}: {original_phone} -> {normalized_phone}")
             customer.phone = normalized_phone
+            customer.phone_last8 = phone_last8(normalized_phone)
             updated = True
 
     if updated:
         db.commit()
 
 def get_last_synced_time(db: Session) -> str:
-    state = db.query(SyncState).filter_by(key="last_order_sync").first()
-    return state.value if state else "2000-01-01T00:00:00Z"
+    state = db.query(SyncState).filter_by(key=LAST_ORDER_SYNC_KEY).first()
+    return state.value if state else DEFAULT_LAST_SYNCED_TIME
 
-def set_last_synced_time(db: Session, timestamp: str) -> None:
-    state = db.query(SyncState).filter_by(key="last_order_sync").first()
+def set_last_synced_time(db: Session, timestamp: str, commit: bool = True) -> None:
+    state = db.query(SyncState).filter_by(key=LAST_ORDER_SYNC_KEY).first()
     if state:
         state.value = timestamp
     else:
-        db.add(SyncState(key="last_order_sync", value=timestamp))
-    db.commit()
+        db.add(SyncState(key=LAST_ORDER_SYNC_KEY, value=timestamp))
+    if commit:
+        db.commit()
 
-def process_order_data(db: Session, data: dict) -> None:
-    email = data["billing"].get("email") or None
-    raw_phone = data["billing"].get("phone") or None
-    phone = normalize_phone(raw_phone)
+def _parse_sync_time(value: str) -> datetime:
+    """Parse a stored cursor / WooCommerce GMT date into a naive UTC datetime."""
+    parsed = isoparse(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def _format_sync_time(value: datetime) -> str:
+    return value.isoformat() + "Z"
+
+def _order_modified(data: dict) -> datetime | None:
+    """``date_modified_gmt`` of an order payload (its creation date when never modified)."""
+    value = data.get("date_modified_gmt") or data.get("date_created_gmt")
+    return _parse_sync_time(value) if value else None
+
+def _page_modified_cursor(orders: list[dict]) -> datetime | None:
+    """Latest ``date_modified_gmt`` in a page of orders."""
+    modified = [m for m in map(_order_modified, orders) if m]
+    return max(modified) if modified else None
+
+def _billing_address_key(customer_id: int, billing: dict) -> tuple:
+    return (
+        customer_id,
+        billing.get("address_1") or "",
+        billing.get("city") or "",
+        billing.get("postcode") or "",
+    )
 
-    customer = None
-    if phone:
-        customer = db.query(Customer).filter_by(phone=phone).first()
-    if not customer and email:
-        customer = db.query(Customer).filter_by(email=email).first()
-
-    if not customer:
-        customer = Customer(
-            first_name=data["billing"].get("first_name", ""),
-            last_name=data["billing"].get("last_name", ""),
-            email=email,
-            phone=phone,
+def _resolve_customers(db: Session, orders: list[dict]) -> list[int]:
+    """
+    Return the customer id for every order in the page.
+
+    Existing customers are matched by phone first and then by email with a
+    single IN query; customers that are still missing are created in bulk.
+    """
+    keys = []
+    for data in orders:
+        billing = data["billing"]
+        keys.append((normalize_phone(billing.get("phone") or None), billing.get("email") or None))
+
+    phones = {phone for phone, _ in keys if phone}
+    emails = {email for _, email in keys if email}
+
+    by_phone, by_email = {}, {}
+    if phones or emails:
+        conditions = []
+        if phones:
+            conditions.append(Customer.phone.in_(phones))
+        if emails:
+            conditions.append(Customer.email.in_(emails))
+
+        rows = db.execute(
+            select(Customer.id, Customer.phone, Customer.email)
+            .where(or_(*conditions))
+            .order_by(Customer.id)
+        ).all()
+        for row in rows:
+            if row.phone:
+                by_phone.setdefault(row.phone, row.id)
+            if row.email:
+                by_email.setdefault(row.email, row.id)
+
+    # Orders in the same page may belong to the same new customer, so new
+    # customers are keyed by phone/email exactly like existing ones.
+    customer_ids = [None] * len(orders)
+    pending = [None] * len(orders)
+    new_customers = []
+    pending_by_phone, pending_by_email = {}, {}
+
+    for i, (phone, email) in enumerate(keys):
+        if phone and phone in by_phone:
+            customer_ids[i] = by_phone[phone]
+        elif phone and phone in pending_by_phone:
+            pending[i] = pending_by_phone[phone]
+        elif email and email in by_email:
+            customer_ids[i] = by_email[email]
+        elif email and email in pending_by_email:
+            pending[i] = pending_by_email[email]
+        else:
+            billing = orders[i]["billing"]
+            pending[i] = len(new_customers)
+            new_customers.append({
+                "first_name": billing.get("first_name") or "",
+                "last_name": billing.get("last_name") or "",
+                "email": email,
+                "phone": phone,
+                "phone_last8": phone_last8(phone),
+            })
+            if phone:
+                pending_by_phone[phone] = pending[i]
+            if email:
+                pending_by_email[email] = pending[i]
+
+    if not new_customers:
+        return customer_ids
+
+    new_ids = [None] * len(new_customers)
+
+    with_phone = [i for i, c in enumerate(new_customers) if c["phone"]]
+    if with_phone:
+        stmt = (
+            pg_insert(Customer)
+            .values([new_customers[i] for i in with_phone])
+            .on_conflict_do_nothing(index_elements=["phone"])
+            .returning(Customer.id, Customer.phone)
         )
-        db.add(customer)
-        db.flush()
-
-    existing_address = db.query(Address).filter_by(
-        customer_id=customer.id,
-        address_1=data["billing"].get("address_1", ""),
-        city=data["billing"].get("city", ""),
-        postcode=data["billing"].get("postcode", "")
-    ).first()
-
-    if not existing_address:
-        address = Address(
-            customer_id=customer.id,
-            company=data["billing"].get("company"),
-            address_1=data["billing"].get("address_1"),
-            address_2=data["billing"].get("address_2"),
-            city=data["billing"].get("city"),
-            state=data["billing"].get("state"),
-            postcode=data["billing"].get("postcode"),
-            country=data["billing"].get("country")
-        )
-        db.add(address)
+        inserted = {row.phone: row.id for row in db.execute(stmt)}
 
-    order_in_db = db.query(Order).filter_by(order_key=data["order_key"]).first()
+        # Another writer may have created the same phone in the meantime
+        missing = {new_customers[i]["phone"] for i in with_phone} - inserted.keys()
+        if missing:
+            inserted.update(
+                db.execute(select(Customer.phone, Customer.id).where(Customer.phone.in_(missing))).all()
+            )
 
+        for i in with_phone:
+            new_ids[i] = inserted[new_customers[i]["phone"]]
+
+    without_phone = [i for i, c in enumerate(new_customers) if not c["phone"]]
+    if without_phone:
+        ids = db.scalars(
+            insert(Customer).returning(Customer.id, sort_by_parameter_order=True),
+            [new_customers[i] for i in without_phone],
+        ).all()
+        for i, customer_id in zip(without_phone, ids):
+            new_ids[i] = customer_id
+
+    return [
+        customer_id if customer_id is not None else new_ids[pending[i]]
+        for i, customer_id in enumerate(customer_ids)
+    ]
+
+def _ensure_addresses(db: Session, orders: list[dict], customer_ids: list[int]) -> None:
+    """Insert billing addresses that are not stored yet for the page's customers."""
+    existing = {
+        (row.customer_id, row.address_1 or "", row.city or "", row.postcode or "")
+        for row in db.execute(
+            select(Address.customer_id, Address.address_1, Address.city, Address.postcode)
+            .where(Address.customer_id.in_(set(customer_ids)))
+        )
+    }
+
+    new_addresses = []
+    for data, customer_id in zip(orders, customer_ids):
+        billing = data["billing"]
+        key = _billing_address_key(customer_id, billing)
+        if key in existing:
+            continue
+        existing.add(key)
+        new_addresses.append({
+            "customer_id": customer_id,
+            "company": billing.get("company"),
+            "address_1": billing.get("address_1"),
+            "address_2": billing.get("address_2"),
+            "city": billing.get("city"),
+            "state": billing.get("state"),
+            "postcode": billing.get("postcode"),
+            "country": billing.get("country"),
+        })
+
+    if new_addresses:
+        db.execute(insert(Address), new_addresses)
+
+def _order_row(data: dict, customer_id: int) -> dict:
     meta = data.get("meta_data", [])
     meta_dict = {entry.get("key"): entry.get("value") for entry in meta}
 
-    if order_in_db:
-        new_status = data["status"]
-        updated = False
-
-        if order_in_db.status != new_status:
-            order_in_db.status = new_status
-            updated = True
-
-        new_payment_method = data.get("payment_method_title")
-        if order_in_db.payment_method != new_payment_method:
-            order_in_db.payment_method = new_payment_method
-            updated = True
-
-        if updated:
-            db.add(order_in_db)
-            db.flush()
-            print(f"🔄 Updated order #{order_in_db.external_id} to status: {new_status}")
-
-            if customer.phone:
-                try:
-                    full_name = f"{customer.first_name} {customer.last_name}".strip()
-                    template_name = WHATSAPP_TEMPLATES.get(new_status)
-
-                    if template_name:
-                        send_whatsapp_template(
-                            phone_number=customer.phone,
-                            customer_name=full_name,
-                            order_number=str(order_in_db.external_id),
-                            template_name=template_name
-                        )
-                    else:
-                        print(f"⚠️ No template configured for status: {new_status}")
-                except Exception as e:
-                    print(f"❌ WhatsApp send failed: {e}")
-
+    return {
+        "order_key": data["order_key"],
+        "customer_id": customer_id,
+        "external_id": data["id"],
+        "status": data["status"],
+        "total_amount": float(data["total"]),
+        "created_at": isoparse(data["date_created"]),
+        "date_modified": _order_modified(data),
+        "payment_method": data.get("payment_method_title"),
+        "attribution_referrer": meta_dict.get("_wc_order_attribution_referrer"),
+        "session_pages": int(meta_dict.get("_wc_order_attribution_session_pages") or 0),
+        "session_count": int(meta_dict.get("_wc_order_attribution_session_count") or 0),
+        "device_type": meta_dict.get("_wc_order_attribution_device_type"),
+    }
+
+def _insert_order_items(db: Session, new_orders: list[tuple[int, dict]]) -> None:
+    """Bulk insert line items for freshly created orders."""
+    line_items = [(order_id, item) for order_id, data in new_orders for item in data.get("line_items", [])]
+    if not line_items:
         return
 
-    order = Order(
-        order_key=data["order_key"],
-        customer_id=customer.id,
-        external_id=data["id"],
-        status=data["status"],
-        total_amount=float(data["total"]),
-        created_at=isoparse(data["date_created"]),
-        payment_method=data.get("payment_method_title"),
-        attribution_referrer=meta_dict.get("_wc_order_attribution_referrer"),
-        session_pages=int(meta_dict.get("_wc_order_attribution_session_pages", 0)),
-        session_count=int(meta_dict.get("_wc_order_attribution_session_count", 0)),
-        device_type=meta_dict.get("_wc_order_attribution_device_type")
+    known_products = product_id_cache.resolve(
+        db, {item["product_id"] for _, item in line_items if item.get("product_id")}
     )
-    db.add(order)
-    db.flush()
-
-    for item in data.get("line_items", []):
-        product = db.query(Product).filter_by(external_id=item["product_id"]).first()
-        product_id = product.external_id if product else None
-
-        order_item = OrderItem(
-            order_id=order.id,
-            product_name=item["name"],
-            product_id=product_id,
-            quantity=item["quantity"],
-            price=float(item["price"])
-        )
-        db.add(order_item)
 
-    if customer.phone:
-        try:
-            full_name = f"{customer.first_name} {customer.last_name}".strip()
-            template_name = WHATSAPP_TEMPLATES.get(order.status)
-
-            if template_name:
-                send_whatsapp_template(
-                    phone_number=customer.phone,
-                    customer_name=full_name,
-                    order_number=str(order.external_id),
-                    template_name=template_name
-                )
-            else:
-                print(f"⚠️ No template configured for order status: {order.status}")
-        except Exception as e:
-            print(f"❌ WhatsApp send failed: {e}")
-
-def fetch_and_save_orders(db: Session) -> None:
-    print(f"[DB INFO] Connected to: {db.bind.url}")
-
-    auth = (WC_CONSUMER_KEY, WC_CONSUMER_SECRET)
-    per_page = 100
-    page = 1
-
-    four_days_ago = datetime.utcnow() - timedelta(days=4)
-    after_date = four_days_ago.isoformat() + "Z"
-    print(f"Fetching orders created after {after_date}")
-
-    while True:
-        url = f"{WC_BASE_URL}?per_page={per_page}&page={page}&after={after_date}"
-        try:
-            with httpx.Client() as client:
-                response = client.get(url, auth=auth)
-        except Exception as e:
-            print(f"Exception while fetching orders: {e}")
-            break
+    rows = [
+        {
+            "order_id": order_id,
+            "external_id": item.get("id"),
+            "product_name": item["name"],
+            "product_id": item["product_id"] if item.get("product_id") in known_products else None,
+            "quantity": item["quantity"],
+            "price": float(item["price"]),
+        }
+        for order_id, item in line_items
+    ]
+    db.execute(pg_insert(OrderItem).values(rows).on_conflict_do_nothing(index_elements=["external_id"]))
+
+def _record_status_events(db: Session, events: list[tuple[int, int, int, str]]) -> None:
+    """
+    Queue a WhatsApp notification for every (order_id, customer_id, external
+    order id, status) event in the outbox table, inside the page transaction.
+    The notifications are sent later by send_order_status_notifications_task.
+    """
+    events = [event for event in events if event[3] in WHATSAPP_TEMPLATES]
+    if not events:
+        return
 
-        if response.status_code != 200:
-            print(f"Error fetching orders: {response.text}")
-            break
+    customers = {
+        row.id: row
+        for row in db.execute(
+            select(Customer.id, Customer.first_name, Customer.last_name, Customer.phone)
+            .where(Customer.id.in_({customer_id for _, customer_id, _, _ in events}))
+        )
+    }
+
+    rows = []
+    for order_id, customer_id, external_id, status in events:
+        customer = customers.get(customer_id)
+        if not customer or not customer.phone:
+            continue
+        rows.append({
+            "order_id": order_id,
+            "external_order_id": external_id,
+            "customer_id": customer_id,
+            "customer_name": f"{customer.first_name} {customer.last_name}".strip(),
+            "phone": customer.phone,
+            "status": status,
+        })
+
+    if rows:
+        db.execute(insert(OrderStatusEvent), rows)
+
+def _lock_order_keys(db: Session, order_keys: list[str]) -> None:
+    """
+    Serialize ingestions of the same orders until the caller's transaction
+    ends. Row locks cannot do this for orders that are not stored yet
+    (WooCommerce fires order.created and order.updated almost together), so
+    take a transaction-level advisory lock per order_key instead, in sorted
+    order so two pages sharing orders cannot deadlock.
+    """
+    db.execute(
+        text("SELECT pg_advisory_xact_lock(hashtext(k)) FROM unnest(CAST(:keys AS text[])) AS k"),
+        {"keys": sorted(order_keys)},
+    )
 
-        orders = response.json()
-        if not orders:
-            break
+def process_orders_page(db: Session, orders: list[dict], notify: bool = True) -> dict:
+    """
+    Ingest a page of WooCommerce orders with a handful of set-based statements.
+
+    Customers, addresses, orders and products are resolved with IN queries,
+    customers/orders/order items are written with INSERT ... ON CONFLICT.
+    Existing orders only get their status and payment method refreshed, and
+    only from payloads at least as recent as the stored one, so retried or
+    redelivered webhooks cannot move an order back to an older status. Line
+    items are only written for orders created by this call. The
+    daily_sales rollup is adjusted for new orders and status changes and
+    the customer_metrics of the affected customers are recomputed. New orders
+    and status changes are queued in the order_status_events outbox instead
+    of being sent to WhatsApp inline, unless ``notify`` is False (archive
+    replays).
+
+    The caller owns the transaction (commit/rollback).
+    """
+    if not orders:
+        return {"inserted": 0, "updated": 0}
+
+    customer_ids = _resolve_customers(db, orders)
+    _ensure_addresses(db, orders, customer_ids)
+
+    # A page can contain the same order twice, keep the latest payload
+    by_key = {}
+    for data, customer_id in zip(orders, customer_ids):
+        by_key[data["order_key"]] = (data, customer_id)
+
+    # Once the keys are locked, the previous status read here stays accurate for
+    # the daily_sales deltas even when a webhook and a sync ingest the same
+    # order concurrently: the second one waits and then sees the first's row
+    _lock_order_keys(db, list(by_key))
+    existing = {
+        row.order_key: row
+        for row in db.execute(
+            select(Order.order_key, Order.status, Order.created_at, Order.total_amount)
+            .where(Order.order_key.in_(by_key.keys()))
+        )
+    }
+
+    order_rows = {
+        order_key: _order_row(data, customer_id)
+        for order_key, (data, customer_id) in by_key.items()
+    }
+
+    stmt = pg_insert(Order).values(list(order_rows.values()))
+    # WooCommerce occasionally omits dates, keep what we have then
+    modified = func.coalesce(stmt.excluded.date_modified, Order.date_modified)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["order_key"],
+        set_={
+            "status": stmt.excluded.status,
+            "payment_method": stmt.excluded.payment_method,
+            "date_modified": modified,
+        },
+        where=and_(
+            # Rows stored before date_modified existed accept any payload once
+            or_(
+                Order.date_modified.is_(None),
+                stmt.excluded.date_modified.is_(None),
+                stmt.excluded.date_modified >= Order.date_modified,
+            ),
+            or_(
+                Order.status.is_distinct_from(stmt.excluded.status),
+                Order.payment_method.is_distinct_from(stmt.excluded.payment_method),
+                Order.date_modified.is_distinct_from(modified),
+            ),
+        ),
+    ).returning(Order.id, Order.order_key)
+    written = {row.order_key: row.id for row in db.execute(stmt)}
+
+    new_orders = []
+    events = []
+    sales = DailySalesDeltas()
+    updated = 0
+    for order_key, order_id in written.items():
+        data, customer_id = by_key[order_key]
+        previous = existing.get(order_key)
+
+        if previous is None:
+            row = order_rows[order_key]
+            new_orders.append((order_id, data))
+            events.append((order_id, customer_id, data["id"], data["status"]))
+            sales.add(row["created_at"].date(), row["status"], row["total_amount"])
+            continue
+
+        updated += 1
+        if previous.status != data["status"]:
+            print(f"🔄 Updated order #{data['id']} to status: {data['status']}")
+            events.append((order_id, customer_id, data["id"], data["status"]))
+            sales.move(previous.created_at.date(), previous.status, data["status"], previous.total_amount)
+
+    _insert_order_items(db, new_orders)
+    sales.apply(db)
+    refresh_customer_metrics(db, {by_key[order_key][1] for order_key in written})
+    if notify:
+        _record_status_events(db, events)
+
+    return {"inserted": len(new_orders), "updated": updated}
 
-        print(f"Processing page {page}, {len(orders)} new orders")
+def process_order_data(db: Session, data: dict) -> None:
+    """Ingest a single WooCommerce order through the bulk page path."""
+    process_orders_page(db, [data])
 
-        try:
-            for data in orders:
-                process_order_data(db, data)
+def fetch_and_save_orders(db: Session) -> int:
+    """
+    Incrementally sync orders modified since the cursor stored in SyncState.
 
-            db.commit()
-            print(f"✅ Committed page {page}")
-        except Exception as e:
-            db.rollback()
-            print(f"❌ Error processing page {page}: {e}")
+    WooCommerce is asked only for orders with ``modified_after=<cursor>``
+    (oldest first), so status changes on old orders are picked up as well.
+    The cursor is moved forward in the same transaction as each committed
+    page; a failing page stops the run so the next tick retries from it.
 
-        page += 1
+    Pages are read by keyset: after each page, page 1 is requested again
+    from the advanced cursor. With page numbers, an order modified during
+    the run moves to the end of the results and shifts the rows after it
+    back by one, so the next page would skip a row.
 
-def fetch_all_orders_once(db: Session) -> None:
-    print(f"[DB INFO] Starting full order fetch...")
+    Returns the number of orders processed.
+    """
+    print(f"[DB INFO] Connected to: {db.bind.url}")
 
     auth = (WC_CONSUMER_KEY, WC_CONSUMER_SECRET)
     per_page = 100
     page = 1
+    processed = 0
 
-    while True:
-        url = f"{WC_BASE_URL}?per_page={per_page}&page={page}"
-        try:
-            with httpx.Client() as client:
-                response = client.get(url, auth=auth)
-        except Exception as e:
-            print(f"Exception while fetching orders: {e}")
-            break
+    last_synced = get_last_synced_time(db)
+    if last_synced == DEFAULT_LAST_SYNCED_TIME:
+        cursor = datetime.utcnow() - INITIAL_SYNC_WINDOW
+        modified_after = cursor
+    else:
+        cursor = _parse_sync_time(last_synced)
+        modified_after = cursor - CURSOR_OVERLAP
+
+    print(f"Fetching orders modified after {_format_sync_time(modified_after)}")
+
+    with httpx.Client(auth=auth, timeout=30) as client:
+        while True:
+            params = {
+                "per_page": per_page,
+                "page": page,
+                "modified_after": modified_after.isoformat(),
+                "dates_are_gmt": "true",
+                "orderby": "modified",
+                "order": "asc",
+            }
+            try:
+                response = client.get(WC_BASE_URL, params=params)
+            except Exception as e:
+                print(f"Exception while fetching orders: {e}")
+                break
+
+            if response.status_code != 200:
+                print(f"Error fetching orders: {response.text}")
+                break
+
+            orders = response.json()
+            if not orders:
+                break
+
+            print(f"Processing page {page}, {len(orders)} modified orders")
+            safe_append_page("orders", orders)
+
+            try:
+                process_orders_page(db, orders)
+
+                page_cursor = _page_modified_cursor(orders)
+                if page_cursor and page_cursor > cursor:
+                    cursor = page_cursor
+                    set_last_synced_time(db, _format_sync_time(cursor), commit=False)
+
+                db.commit()
+                processed += len(orders)
+                print(f"✅ Committed page {page}, cursor at {_format_sync_time(cursor)}")
+            except Exception as e:
+                db.rollback()
+                print(f"❌ Error processing page {page}: {e}")
+                break
+
+            if page >= int(response.headers.get("X-WP-TotalPages", page)):
+                break
+
+            page_cursor = _page_modified_cursor(orders)
+            if page_cursor and page_cursor - KEYSET_OVERLAP > modified_after:
+                modified_after, page = page_cursor - KEYSET_OVERLAP, 1
+            else:
+                # A whole page shares one modified date, only a page number can move past it
+                page += 1
 
-        if response.status_code != 200:
-            print(f"Error fetching orders: {response.text}")
-            break
+    return processed
 
-        orders = response.json()
-        if not orders:
-            print("No more orders to fetch.")
-            break
+def fetch_all_orders_once(db: Session) -> None:
+    """Backfill every WooCommerce order using the concurrent page fetcher."""
+    print(f"[DB INFO] Starting full order fetch...")
 
-        print(f"Processing page {page}, {len(orders)} orders")
+    # Orders modified while the backfill runs are picked up by the next cursor sync
+    started_at = datetime.utcnow()
 
+    def write_page(page: int, orders: list[dict]) -> None:
+        safe_append_page("orders", orders)
         try:
-            for data in orders:
-                process_order_data(db, data)
-
+            process_orders_page(db, orders)
             db.commit()
-            print(f"✅ Committed page {page}")
-        except Exception as e:
+            print(f"✅ Committed page {page}, {len(orders)} orders")
+        except Exception:
             db.rollback()
-            print(f"❌ Error processing page {page}: {e}")
-            break
+            raise
 
-        page += 1
+    # Ascending ids keep page boundaries stable while new orders come in
+    result = fetch_all_pages(WC_BASE_URL, write_page, params={"orderby": "id", "order": "asc"})
 
-    latest_time = datetime.utcnow().isoformat() + "Z"
-    set_last_synced_time(db, latest_time)
+    if result["failed"]:
+        print(f"❌ Backfill incomplete, failed pages: {result['failed']}. Sync cursor left unchanged.")
+        return
 
+    set_last_synced_time(db, _format_sync_time(started_at))
+    print(f"✅ Backfill finished: {result['written']} pages")
@@ -1,7 +1,13 @@
-import httpx
+from sqlalchemy import func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from crm_backend.models import Product
+from crm_backend.products.cache import bump_product_catalog_version
+from crm_backend.tasks.woocommerce_fetcher import fetch_all_pages
+from crm_backend.utils.payload_archive import safe_append_page
 from datetime import datetime, timezone
+import hashlib
+import json
 import os
 from dotenv import load_dotenv
 # from dateutil.parser import isoparse
@@ -12,78 +18,102 @@ WC_BASE_URL = "https://souqalsultan.com/wp-json/wc/v3/products"
 WC_CONSUMER_KEY = os.getenv("WC_CONSUMER_KEY")
 WC_CONSUMER_SECRET = os.getenv("WC_CONSUMER_SECRET")
 
-def fetch_and_save_products(db: Session) -> None:
-    """Fetch products from WooCommerce and save to the database."""
-    auth = (WC_CONSUMER_KEY, WC_CONSUMER_SECRET)
-    per_page = 100
-    page = 1
+def _product_row(data: dict) -> dict:
+    date_created = data.get("date_created")
+    date_modified = data.get("date_modified")
 
-    print(f"[DB INFO] Connected to: {db.bind.url}")
+    if date_created:
+        date_created = datetime.fromisoformat(date_created.replace("Z", "+00:00"))
+    if date_modified:
+        date_modified = datetime.fromisoformat(date_modified.replace("Z", "+00:00"))
 
-    while True:
-        url = f"{WC_BASE_URL}/?per_page={per_page}&page={page}"
-        print(f"Fetching page {page} of products...")
+    row = {
+        "external_id": data["id"],
+        "name": data["name"],
+        "short_description": data.get("short_description"),
+        "regular_price": float(data.get("regular_price") or 0),
+        "sales_price": float(data.get("sale_price") or 0),
+        "total_sales": data.get("total_sales") or 0,
+        "categories": ", ".join([cat["name"] for cat in data.get("categories", [])]),
+        "stock_status": data.get("stock_status"),
+        "weight": float(data.get("weight") or 0),
+        "date_created": date_created,
+        "date_modified": date_modified,
+    }
+    row["content_hash"] = hashlib.sha256(
+        json.dumps(row, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    return row
 
-        try:
-            with httpx.Client() as client:
-                response = client.get(url, auth=auth)
-        except Exception as e:
-            print(f"❌ HTTP exception while fetching products: {e}")
-            break
+def save_products_page(db: Session, products: list[dict]) -> dict:
+    """
+    Upsert a page of WooCommerce products in one statement. The caller commits.
+
+    Each row carries a hash of its mapped columns; existing products are only
+    rewritten when the hash differs, so unchanged catalog rows cost no
+    dead tuples or WAL.
+
+    Returns {"inserted", "updated", "unchanged"} counts.
+    """
+    # A page can contain the same product twice, keep the latest payload
+    rows = list({data["id"]: _product_row(data) for data in products}.values())
+    if not rows:
+        return {"inserted": 0, "updated": 0, "unchanged": 0}
+
+    stmt = pg_insert(Product).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["external_id"],
+        set_={
+            column: stmt.excluded[column]
+            for column in rows[0]
+            if column not in ("external_id", "date_created", "date_modified")
+        } | {
+            # WooCommerce occasionally omits dates, keep what we have then
+            "date_created": func.coalesce(stmt.excluded.date_created, Product.date_created),
+            "date_modified": func.coalesce(stmt.excluded.date_modified, Product.date_modified),
+        },
+        where=Product.content_hash.is_distinct_from(stmt.excluded.content_hash),
+    ).returning(literal_column("xmax = 0").label("inserted"))
 
-        if response.status_code != 200:
-            print(f"❌ Failed to fetch products: {response.text}")
-            break
+    # Rows skipped by the WHERE are not returned; xmax = 0 marks fresh inserts
+    written = [row.inserted for row in db.execute(stmt)]
+    inserted = sum(written)
+    return {
+        "inserted": inserted,
+        "updated": len(written) - inserted,
+        "unchanged": len(rows) - len(written),
+    }
 
-        products = response.json()
-        if not products:
-            print("✅ No more products to process.")
-            break
+def fetch_and_save_products(db: Session) -> dict:
+    """
+    Fetch products from WooCommerce and save to the database.
 
+    Returns the inserted/updated/unchanged row counts of the run.
+    """
+    print(f"[DB INFO] Connected to: {db.bind.url}")
+
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0}
+
+    def write_page(page: int, products: list[dict]) -> None:
+        safe_append_page("products", products)
         try:
-            for data in products:
-                existing = db.query(Product).filter_by(external_id=data["id"]).first()
-
-                date_created = data.get("date_created")
-                date_modified = data.get("date_modified")
-
-                if date_created:
-                    date_created = datetime.fromisoformat(date_created.replace("Z", "+00:00"))
-                if date_modified:
-                    date_modified = datetime.fromisoformat(date_modified.replace("Z", "+00:00"))
-
-                if existing:
-                    # Update existing product if needed
-                    existing.name = data["name"]
-                    existing.short_description = data.get("short_description")
-                    existing.regular_price = float(data.get("regular_price") or 0)
-                    existing.sales_price = float(data.get("sale_price") or 0)
-                    existing.total_sales = data.get("total_sales") or 0
-                    existing.categories = ", ".join([cat["name"] for cat in data.get("categories", [])])
-                    existing.stock_status = data.get("stock_status")
-                    existing.weight = float(data.get("weight") or 0)
-                    if date_created:
-                        existing.date_created = date_created
-                    if date_modified:
-                        existing.date_modified = date_modified 
-                else:
-                    product = Product(
-                        external_id=data["id"],
-                        name=data["name"],
-                        short_description=data.get("short_description"),
-                        regular_price=float(data.get("regular_price") or 0),
-                        sales_price=float(data.get("sale_price") or 0),
-                        total_sales=data.get("total_sales") or 0,
-                        categories=", ".join([cat["name"] for cat in data.get("categories", [])]),
-                        stock_status=data.get("stock_status"),
-                        weight=float(data.get("weight") or 0),
-                        date_created=date_created,
-                        date_modified=date_modified,
-                    )
-                    db.add(product)
+            counts = save_products_page(db, products)
+            # Only new products change what the product id cache can resolve
+            if counts["inserted"]:
+                bump_product_catalog_version(db)
             db.commit()
-            print(f"✅ Committed page {page}")
-        except Exception as e:
+        except Exception:
             db.rollback()
-            print(f"❌ Failed to save products from page {page}: {e}")
-        page += 1
\ No newline at end of file
+            raise
+        for key, value in counts.items():
+            totals[key] += value
+        print(f"✅ Committed page {page}: {counts['inserted']} inserted, {counts['updated']} updated, {counts['unchanged']} unchanged")
+
+    result = fetch_all_pages(WC_BASE_URL, write_page, params={"orderby": "id", "order": "asc"})
+
+    if result["failed"]:
+        print(f"❌ Failed to save products from pages: {result['failed']}")
+    else:
+        print(f"✅ Synced {result['written']} product pages")
+    print(f"📦 Products: {totals['inserted']} inserted, {totals['updated']} updated, {totals['unchanged']} unchanged")
+    return totals
@@ -0,0 +1,108 @@
+"""
+Ledger of scheduled outbound WhatsApp messages in whatsapp_messages.
+
+Every planned send gets an idempotency key (campaign, customer, template,
+day). The rows of a run are inserted in one statement *before* anything is
+sent, with ON CONFLICT on the unique key, and only the rows this run
+inserted are sent. A Celery retry or a second run of the same task on the
+same day therefore skips everyone who was already messaged. Failed sends
+can be claimed again; a row left "pending" by a crashed worker is not
+resent, so a customer gets a message at most once.
+"""
+from datetime import date, datetime
+from typing import Callable
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from crm_backend.models import WhatsAppMessage
+
+def idempotency_key(campaign: str, customer_id: int, template_name: str, day: date) -> str:
+    return f"{campaign}:{customer_id}:{template_name}:{day.isoformat()}"
+
+def not_yet_sent(campaign: str, customer_id, template_names: list[str], day: date):
+    """
+    SQL condition on a customer id column: not every one of ``template_names``
+    was claimed for the customer on ``day``. Keys are looked up through the
+    unique index, so it costs a couple of index probes per candidate.
+    """
+    keys = [
+        func.concat(f"{campaign}:", customer_id, f":{template_name}:{day.isoformat()}")  # same as idempotency_key()
+        for template_name in template_names
+    ]
+    claimed = (
+        select(func.count())
+        .where(WhatsAppMessage.idempotency_key.in_(keys), WhatsAppMessage.status != "failed")
+        .scalar_subquery()
+    )
+    return claimed < len(template_names)
+
+def claim_messages(db: Session, campaign: str, planned: list[dict], day: date) -> dict[str, int]:
+    """
+    Insert a pending outgoing row per planned message and return
+    ``{idempotency_key: message id}`` for the ones this call claimed.
+    Commits, so the claim holds even if the sends crash halfway.
+    """
+    rows = {}
+    now = datetime.utcnow()
+    for item in planned:
+        key = idempotency_key(campaign, item["customer_id"], item["template_name"], day)
+        rows.setdefault(key, {
+            "customer_id": item["customer_id"],
+            "direction": "outgoing",
+            "message": item["message"],
+            "timestamp": now,
+            "status": "pending",
+            "idempotency_key": key,
+        })
+    if not rows:
+        return {}
+
+    stmt = pg_insert(WhatsAppMessage).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[WhatsAppMessage.idempotency_key],
+        set_={"status": "pending", "timestamp": stmt.excluded.timestamp},
+        where=WhatsAppMessage.status == "failed",
+    ).returning(WhatsAppMessage.idempotency_key, WhatsAppMessage.id)
+    claimed = dict(db.execute(stmt).all())
+    db.commit()
+    return claimed
+
+def record_send_result(db: Session, message_id: int, status_code: int | None, body) -> bool:
+    """Store the outcome of a claimed send; returns whether it was accepted."""
+    ok = status_code in (200, 201)
+    whatsapp_message_id = None
+    if ok and isinstance(body, dict):
+        whatsapp_message_id = (body.get("messages") or [{}])[0].get("id")
+    db.query(WhatsAppMessage).filter(WhatsAppMessage.id == message_id).update(
+        {"status": "sent" if ok else "failed", "whatsapp_message_id": whatsapp_message_id},
+        synchronize_session=False,
+    )
+    db.commit()
+    return ok
+
+def send_once(db: Session, campaign: str, planned: list[dict], send: Callable[[dict], tuple], day: date | None = None) -> list[dict]:
+    """
+    Send each planned message at most once per ``day``.
+
+    ``planned`` items need ``customer_id``, ``template_name`` and ``message``
+    (the text kept in the ledger) plus whatever ``send`` uses;
+    ``send(item)`` returns ``(status_code, body)``. Returns the items with
+    ``result`` set to "sent", "failed" or "duplicate" (already claimed).
+    """
+    day = day or date.today()
+    claimed = claim_messages(db, campaign, planned, day)
+
+    results = []
+    for item in planned:
+        key = idempotency_key(campaign, item["customer_id"], item["template_name"], day)
+        message_id = claimed.pop(key, None)
+        if message_id is None:
+            results.append({**item, "result": "duplicate", "status_code": None, "response": None})
+            continue
+        try:
+            status_code, body = send(item)
+        except Exception as e:
+            status_code, body = None, str(e)
+        ok = record_send_result(db, message_id, status_code, body)
+        results.append({**item, "result": "sent" if ok else "failed", "status_code": status_code, "response": body})
+    return results
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from crm_backend.models import OrderStatusEvent
+from crm_backend.tasks.fetch_orders import WHATSAPP_TEMPLATES
+from crm_backend.tasks.send_whatsapp import send_whatsapp_template
+
+BATCH_SIZE = 50
+MAX_BATCHES_PER_RUN = 20
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = timedelta(seconds=30)
+
+# Meta throttles bursts to the same recipient (roughly one message every 6s)
+PER_NUMBER_INTERVAL = timedelta(seconds=6)
+
+def _last_sent_per_phone(db: Session, phones: set[str], now: datetime) -> dict:
+    rows = (
+        db.query(OrderStatusEvent.phone, func.max(OrderStatusEvent.sent_at))
+        .filter(OrderStatusEvent.phone.in_(phones))
+        .filter(OrderStatusEvent.sent_at >= now - PER_NUMBER_INTERVAL)
+        .group_by(OrderStatusEvent.phone)
+        .all()
+    )
+    return dict(rows)
+
+def _send_event(event: OrderStatusEvent) -> tuple[bool, str | None]:
+    try:
+        status_code, body = send_whatsapp_template(
+            phone_number=event.phone,
+            customer_name=event.customer_name or "",
+            order_number=str(event.external_order_id),
+            template_name=WHATSAPP_TEMPLATES[event.status],
+        )
+    except Exception as e:
+        return False, str(e)
+
+    if status_code == 200:
+        return True, None
+    return False, f"{status_code}: {body}"
+
+def send_pending_order_notifications(db: Session, batch_size: int = BATCH_SIZE, max_batches: int = MAX_BATCHES_PER_RUN) -> dict:
+    """
+    Drain the order_status_events outbox.
+
+    Due events are claimed in batches with ``FOR UPDATE SKIP LOCKED`` so several
+    workers can drain in parallel. A number that was messaged less than
+    PER_NUMBER_INTERVAL ago is deferred, failed sends are retried with
+    exponential backoff up to MAX_ATTEMPTS.
+    """
+    stats = {"sent": 0, "deferred": 0, "retried": 0, "failed": 0}
+
+    for _ in range(max_batches):
+        now = datetime.utcnow()
+        events = (
+            db.query(OrderStatusEvent)
+            .filter(OrderStatusEvent.state == "pending")
+            .filter(OrderStatusEvent.next_attempt_at <= now)
+            .order_by(OrderStatusEvent.id)
+            .with_for_update(skip_locked=True)
+            .limit(batch_size)
+            .all()
+        )
+        if not events:
+            break
+
+        last_sent = _last_sent_per_phone(db, {e.phone for e in events}, now)
+
+        for event in events:
+            previous = last_sent.get(event.phone)
+            if previous and now - previous < PER_NUMBER_INTERVAL:
+                event.next_attempt_at = previous + PER_NUMBER_INTERVAL
+                stats["deferred"] += 1
+                continue
+
+            ok, error = _send_event(event)
+            event.attempts += 1
+
+            if ok:
+                event.state = "sent"
+                event.sent_at = datetime.utcnow()
+                event.last_error = None
+                last_sent[event.phone] = event.sent_at
+                stats["sent"] += 1
+            elif event.attempts >= MAX_ATTEMPTS:
+                event.state = "failed"
+                event.last_error = error
+                stats["failed"] += 1
+                print(f"❌ Giving up on order #{event.external_order_id} notification: {error}")
+            else:
+                event.last_error = error
+                event.next_attempt_at = datetime.utcnow() + RETRY_BASE_DELAY * (2 ** (event.attempts - 1))
+                stats["retried"] += 1
+
+        db.commit()
+
+    print(f"📲 Order notifications: {stats}")
+    return stats
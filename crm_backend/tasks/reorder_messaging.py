@@ -1,9 +1,9 @@
-import requests
 from dotenv import load_dotenv
 from crm_backend.database import SessionLocal
 from crm_backend.models import Customer
 # from crm_backend.tasks.reorder_messaging import send_whatsapp_reorder_reminder
 from crm_backend.celery_app import celery
+from crm_backend.utils.whatsapp_client import get_whatsapp_client
 from sqlalchemy.orm import sessionmaker
 from prophet import Prophet
 from sqlalchemy import create_engine
@@ -16,10 +16,6 @@ import time
 
 load_dotenv()
 
-WHATSAPP_ACCESS_TOKEN = os.getenv("WHATSAPP_ACCESS_TOKEN")
-WHATSAPP_PHONE_NUMBER_ID = os.getenv("WHATSAPP_PHONE_NUMBER_ID")
-WHATSAPP_API_URL = f"https://graph.facebook.com/v18.0/{WHATSAPP_PHONE_NUMBER_ID}/messages"
-
 def format_kuwait_number(raw: str) -> str:
     """
     Formats a raw phone number to Kuwait format.
@@ -74,31 +70,10 @@ def send_whatsapp_reorder_reminder(phone_number: str, customer_name: str, langua
 
     config = template_config[language]
 
-    headers = {
-        "Authorization": f"Bearer {WHATSAPP_ACCESS_TOKEN}",
-        "Content-Type": "application/json"
-    }
-
-    data = {
-        "messaging_product": "whatsapp",
-        "to": phone_number,
-        "type": "template",
-        "template": {
-            "name": config["template_name"],
-            "language": {"code": config["language_code"]},
-            "components": [
-                {
-                    "type": "body",
-                    "parameters": [
-                        {"type": "text", "text": customer_name}
-                    ]
-                }
-            ]
-        }
-    }
-
-    response = requests.post(WHATSAPP_API_URL, headers=headers, json=data)
-    return response.json()
+    status_code, body = get_whatsapp_client().send_template(
+        phone_number, config["template_name"], [customer_name], config["language_code"]
+    )
+    return body
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 engine = create_engine(DATABASE_URL)
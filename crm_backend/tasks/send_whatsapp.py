@@ -1,46 +1,18 @@
-import requests, json, os, time
+import json, time
 from langchain.prompts import PromptTemplate
 from langchain_mistralai.chat_models import ChatMistralAI
 from langchain.chains import LLMChain
-from dotenv import load_dotenv
-
-load_dotenv()
-
-WHATSAPP_ACCESS_TOKEN = os.getenv("WHATSAPP_ACCESS_TOKEN")
-WHATSAPP_PHONE_NUMBER_ID = os.getenv("WHATSAPP_PHONE_NUMBER_ID")
-WHATSAPP_API_URL = f"https://graph.facebook.com/v18.0/{WHATSAPP_PHONE_NUMBER_ID}/messages"
+from crm_backend.utils.whatsapp_client import get_whatsapp_client, template_payload
 
 def send_whatsapp_template(phone_number: str, customer_name: str, order_number: str, template_name: str):
-    # url = WHATSAPP_API_URL
-    # headers = {
-    #     "Authorization": f"Bearer {WHATSAPP_ACCESS_TOKEN}",
-    #     "Content-Type": "application/json"
-    # }
-
-    payload = {
-        "messaging_product": "whatsapp",
-        "to": phone_number,
-        "type": "template",
-        "template": {
-            "name": template_name,
-            "language": { "code": "en" },  # or "ar"
-            "components": [
-                {
-                    "type": "body",
-                    "parameters": [
-                        { "type": "text", "text": customer_name },
-                        { "type": "text", "text": order_number }
-                    ]
-                }
-            ]
-        }
-    }
-
-    response = requests.post(url, headers=headers, json=payload)
-    if response.status_code == 200:
+    status_code, body = get_whatsapp_client().send_template(
+        phone_number, template_name, [customer_name, order_number], language="en"  # or "ar"
+    )
+    if status_code == 200:
         print(f"✅ WhatsApp message sent using template '{template_name}'")
     else:
-        print(f"❌ Failed to send message: {response.status_code} {response.text}")
+        print(f"❌ Failed to send message: {status_code} {body}")
+    return status_code, body
 
 def send_whatsapp_template_message(to: str, template_name: str, variables: list[str], language: str = "en_US") -> dict:
     """
@@ -50,46 +22,18 @@ def send_whatsapp_template_message(to: str, template_name: str, variables: list[
     :param variables: list of variables to fill in template placeholders ({{1}}, {{2}}, etc.).
     :param language: template language (default: en_US).
     """
-    url = WHATSAPP_API_URL
-    headers = {
-        "Authorization": f"Bearer {WHATSAPP_ACCESS_TOKEN}",
-        "Content-Type": "application/json"
-    }
-
-    # WhatsApp template parameters
-    parameters = [{"type": "text", "text": str(v)} for v in variables]
-
-    payload = {
-        "messaging_product": "whatsapp",
-        "to": to,
-        "type": "template",
-        "template": {
-            "name": template_name,
-            "language": {"code": language},
-            "components": [
-                {
-                    "type": "body",
-                    "parameters": parameters
-                }
-            ]
-        }
-    }
+    payload = template_payload(to, template_name, variables, language)
 
     print("[DEBUG] WhatsApp request payload:", json.dumps(payload, ensure_ascii=False))
     t0 = time.time()
 
-    response = requests.post(url, headers=headers, json=payload)
+    status_code, res_json = get_whatsapp_client().send(payload)
 
     elapsed = time.time() - t0
 
-    try:
-        res_json = response.json()
-    except Exception:
-        res_json = response.text
-
-    print(f"[DEBUG] WhatsApp response status_code={response.status_code} elapsed={elapsed:.2f}s body={json.dumps(res_json, ensure_ascii=False)}")
+    print(f"[DEBUG] WhatsApp response status_code={status_code} elapsed={elapsed:.2f}s body={json.dumps(res_json, ensure_ascii=False)}")
 
-    if response.status_code not in (200, 201):
+    if status_code not in (200, 201):
         print("[ERROR] WhatsApp API error:", res_json)
     else:
         print("[INFO] WhatsApp API response:", res_json)
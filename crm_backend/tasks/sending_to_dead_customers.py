@@ -1,19 +1,29 @@
 import os
 import datetime
 import pandas as pd
-import requests
 import re
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 from crm_backend.database import get_db
 from crm_backend.customers.operation_helper import function_get_dead_customers
 from datetime import datetime
+from crm_backend.utils.whatsapp_client import get_whatsapp_client
+from crm_backend.tasks.message_ledger import send_once
 
 load_dotenv()
 
-ACCESS_TOKEN = os.getenv("WHATSAPP_ACCESS_TOKEN")
-PHONE_NUMBER_ID = os.getenv("WHATSAPP_PHONE_NUMBER_ID")
-WHATSAPP_API_URL = f"https://graph.facebook.com/v18.0/{PHONE_NUMBER_ID}/messages"
+DEAD_CUSTOMERS_CAMPAIGN = "dead_customers"  # idempotency key prefix, see tasks/message_ledger.py
+
+DEAD_CUSTOMER_TEMPLATES = {
+    "en": {
+        "template_name": "dead_customers_message",
+        "language_code": "en",
+    },
+    "ar": {
+        "template_name": "dead_customer_message_ar",
+        "language_code": "ar",
+    },
+}
 
 def format_kuwait_number(raw: str) -> str:
     """
@@ -57,46 +67,13 @@ def send_whatsapp_dead_customer_message(phone_number: str, customer_name: str, l
         customer_name (str): Name of the customer.
         language (str): "en" or "ar".
     """
-    template_config = {
-        "en": {
-            "template_name": "dead_customers_message",
-            "language_code": "en",
-        },
-        "ar": {
-            "template_name": "dead_customer_message_ar",
-            "language_code": "ar",
-        },
-    }
-
-    config = template_config.get(language)
+    config = DEAD_CUSTOMER_TEMPLATES.get(language)
     if not config:
         raise ValueError("Unsupported language. Use 'en' or 'ar'.")
 
-    headers = {
-        "Authorization": f"Bearer {ACCESS_TOKEN}",
-        "Content-Type": "application/json",
-    }
-
-    payload = {
-        "messaging_product": "whatsapp",
-        "to": phone_number,
-        "type": "template",
-        "template": {
-            "name": config["template_name"],
-            "language": {"code": config["language_code"]},
-            "components": [
-                {
-                    "type": "body",
-                    "parameters": [
-                        {"type": "text", "text": customer_name}
-                    ],
-                }
-            ],
-        },
-    }
-
-    response = requests.post(WHATSAPP_API_URL, headers=headers, json=payload)
-    return response.status_code, response.json()
+    return get_whatsapp_client().send_template(
+        phone_number, config["template_name"], [customer_name], config["language_code"]
+    )
 
 def helper_function_to_sending_message_to_dead_customers(db: Session, language: str = "en"):
     """
@@ -104,8 +81,13 @@ def helper_function_to_sending_message_to_dead_customers(db: Session, language:
     Ensures phone numbers are formatted to Kuwait standard before sending.
     Skips customers with invalid or missing numbers.
     """
+    if language not in DEAD_CUSTOMER_TEMPLATES:
+        raise ValueError("Unsupported language. Use 'en' or 'ar'.")
+    template_name = DEAD_CUSTOMER_TEMPLATES[language]["template_name"]
+
     dead_customers = function_get_dead_customers(db)
     results = []
+    planned = []
 
     print(f"🚀 Starting dead customer messaging at {datetime.now()} | Found {len(dead_customers)} customers")
 
@@ -130,28 +112,28 @@ def helper_function_to_sending_message_to_dead_customers(db: Session, language:
             })
             continue
 
-        try:
-            status_code, resp = send_whatsapp_dead_customer_message(
-                phone_number=phone,
-                customer_name=customer["customer_name"],
-                language=language,
-            )
-
-            if status_code == 200:
-                status = "✅ Success"
-            else:
-                status = f"Failed - {resp}"
-            print(f"📩 Sent to {customer['customer_id']} ({customer['customer_name']}) | {phone} → {status}")   
-            results.append({
-                "customer_id": customer["customer_id"],
-                "status": "Success" if status_code == 200 else f"Failed - {resp}"
-            })
-        except Exception as e:
-            status = f"❌ Failed - {str(e)}"
-            print(f"⚠️ Error sending to {customer['customer_id']} ({customer.get('customer_name')}) → {status}")
-            results.append({
-                "customer_id": customer["customer_id"],
-                "status": f"Failed - {str(e)}"
-            })
+        planned.append({
+            "customer_id": customer["customer_id"],
+            "template_name": template_name,
+            "message": f"[{template_name}] {customer['customer_name']}",
+            "customer_name": customer["customer_name"],
+            "phone_number": phone,
+        })
+
+    # Customers already messaged today (retry or re-run) are skipped
+    for r in send_once(
+        db, DEAD_CUSTOMERS_CAMPAIGN, planned,
+        lambda m: send_whatsapp_dead_customer_message(
+            phone_number=m["phone_number"], customer_name=m["customer_name"], language=language
+        ),
+    ):
+        if r["result"] == "sent":
+            status = "Success"
+        elif r["result"] == "duplicate":
+            status = "Skipped - Already sent today"
+        else:
+            status = f"Failed - {r['response']}"
+        print(f"📩 {r['customer_id']} ({r['customer_name']}) | {r['phone_number']} → {status}")
+        results.append({"customer_id": r["customer_id"], "status": status})
     print(f"🏁 Finished messaging {len(dead_customers)} customers at {datetime.now()}")
     return results
\ No newline at end of file
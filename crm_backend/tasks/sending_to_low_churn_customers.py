@@ -1,19 +1,28 @@
 import os
 import datetime
 import pandas as pd
-import requests
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 from crm_backend.database import get_db
 from crm_backend.customers.operation_helper import function_get_customers_with_low_churnRisk
 from crm_backend.AI.db_helper import fetch_order_data
 from crm_backend.AI.operation_helper import forecast_customer_purchases
+from crm_backend.utils.whatsapp_client import get_whatsapp_client
 
 load_dotenv()
 
-ACCESS_TOKEN = os.getenv("WHATSAPP_ACCESS_TOKEN")
-PHONE_NUMBER_ID = os.getenv("WHATSAPP_PHONE_NUMBER_ID")
-WHATSAPP_API_URL = f"https://graph.facebook.com/v18.0/{PHONE_NUMBER_ID}/messages"
+LOW_CHURN_CAMPAIGN = "low_churn_forecast"  # idempotency key prefix, see tasks/message_ledger.py
+
+FORECAST_TEMPLATES = {
+    "en": {
+        "template_name": "example_for_quick_reply",
+        "language_code": "en_US",
+    },
+    "ar": {
+        "template_name": "order_management_1",
+        "language_code": "ar",
+    },
+}
 
 # TEMPLATE_NAME = "product_forecast_offer"
 # LANGUAGE_CODE = "en_US"
@@ -44,42 +53,11 @@ def helper_function_to_sending_message_to_low_churn_risk_customers(db: Session):
 
 def send_whatsapp_forecast_message(phone_number: str, customer_name: str, language: str = "en"):
     
-    template_config = {
-        "en": {
-            "template_name": "example_for_quick_reply",
-            "language_code": "en_US",
-        },
-        "ar": {
-            "template_name": "order_management_1",
-            "language_code": "ar",
-        },
-    }
-
-    config = template_config.get(language)
+    config = FORECAST_TEMPLATES.get(language)
     if not config:
         raise ValueError("Unsupported language. Use 'en' or 'ar'.")
 
-    headers = {
-        "Authorization": f"Bearer {ACCESS_TOKEN}",
-        "Content-Type": "application/json",
-    }
-
-    payload = {
-        "messaging_product": "whatsapp",
-        "to": phone_number,
-        "type": "template",
-        "template": {
-            "name": config["template_name"],
-            "language": {"code": config["language_code"]},
-            "components": [
-                {
-                    "type": "body",
-                    "parameters": [{"type": "text", "text": customer_name}],
-                }
-            ],
-        },
-    }
-
-    response = requests.post(WHATSAPP_API_URL, headers=headers, json=payload)
-    return response.status_code, response.json()
+    return get_whatsapp_client().send_template(
+        phone_number, config["template_name"], [customer_name], config["language_code"]
+    )
 
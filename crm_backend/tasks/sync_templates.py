@@ -0,0 +1,54 @@
+import os
+from datetime import datetime
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+from crm_backend.models import WhatsAppTemplate
+from crm_backend.utils.whatsapp_client import get_whatsapp_client
+
+load_dotenv()
+
+WABA_ID = os.getenv("WABA_ID")
+
+def sync_whatsapp_templates(db: Session) -> dict:
+    """Upsert the WhatsApp Business templates from the Graph API."""
+    url = f"https://graph.facebook.com/v20.0/{WABA_ID}/message_templates"
+    status_code, body = get_whatsapp_client().request("GET", url, "message_templates")
+
+    if status_code != 200:
+        return {"error": body}
+
+    templates = body.get("data", [])
+
+    existing_templates = {
+        t.template_name: t
+        for t in db.query(WhatsAppTemplate).filter(
+            WhatsAppTemplate.template_name.in_([t["name"] for t in templates])
+        )
+    }
+
+    for t in templates:
+        body_component = next((c for c in t.get("components", []) if c["type"] == "BODY"), {})
+
+        # UPSERT logic using SQLAlchemy ORM
+        existing = existing_templates.get(t["name"])
+        if existing:
+            existing.category = t["category"]
+            existing.language = t["language"]
+            existing.status = t["status"]
+            existing.body = body_component.get("text")
+            existing.updated_at = datetime.utcnow()
+        else:
+            new_template = WhatsAppTemplate(
+                template_name=t["name"],
+                category=t["category"],
+                language=t["language"],
+                status=t["status"],
+                body=body_component.get("text"),
+                updated_at=datetime.utcnow()
+            )
+            db.add(new_template)
+            existing_templates[t["name"]] = new_template
+
+    db.commit()
+
+    return {"message": f"✅ Synced {len(templates)} templates"}
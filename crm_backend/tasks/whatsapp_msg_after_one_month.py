@@ -1,101 +1,113 @@
 from crm_backend.database import get_db
-import requests
 import os
-from datetime import date
+from datetime import date, datetime, time, timedelta
 from dateutil.relativedelta import relativedelta
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
-from sqlalchemy import text
+from sqlalchemy import select
+from crm_backend.models import Customer, Order
+from crm_backend.utils.whatsapp_client import get_whatsapp_client
+from crm_backend.tasks.message_ledger import not_yet_sent, send_once
 
 load_dotenv()
 
-def get_customers_since(db: Session):
-    start_date = date(2025, 9, 1)
+ONE_MONTH_CAMPAIGN = "one_month_reminder"  # idempotency key prefix, see tasks/message_ledger.py
 
-    query = text("""
-        SELECT c.first_name, c.last_name, c.phone, o.created_at
-        FROM orders o
-        JOIN customers c ON o.customer_id = c.id
-        WHERE o.created_at >= :start_date
-    """)
+ONE_MONTH_TEMPLATES = {
+    "en": {
+        "template_name": "example_for_quick_reply",
+        "language_code": "en_US"
+    },
+    "ar": {
+        "template_name": "order_management_1",
+        "language_code": "ar"
+    }
+}
+
+def one_month_window(today: date) -> tuple[datetime, datetime] | None:
+    """
+    Order dates ``d`` with ``d + relativedelta(months=1) == today`` as a
+    half-open ``[start, end)`` range, or None when there are none.
+
+    relativedelta clamps to the end of the month, so on the last day of a
+    month the window covers every later day of the previous month too
+    (Feb 28 gets Jan 28-31), and days the previous month lacks get nothing
+    (Mar 30 and 31 have no Feb counterpart).
+    """
+    start = today - relativedelta(months=1)
+    if start + relativedelta(months=1) != today:
+        return None
+    end = start + timedelta(days=1)
+    if (today + timedelta(days=1)).day == 1:
+        end = today.replace(day=1)
+    return datetime.combine(start, time.min), datetime.combine(end, time.min)
+
+def get_one_month_reminder_candidates(db: Session, today: date) -> list[dict]:
+    """
+    Customers with an order exactly one calendar month before ``today``, once
+    each, leaving out opted-out customers and those already reminded today.
+    """
+    window = one_month_window(today)
+    if window is None:
+        return []
+    start, end = window
 
-    result = db.execute(query, {"start_date": start_date}).fetchall()
+    template_names = [config["template_name"] for config in ONE_MONTH_TEMPLATES.values()]
+    rows = db.execute(
+        select(Customer.id, Customer.first_name, Customer.last_name, Customer.phone, Order.created_at)
+        .join(Order, Order.customer_id == Customer.id)
+        .where(Order.created_at >= start, Order.created_at < end)  # ix_orders_created_at
+        .where(Customer.phone.isnot(None), Customer.whatsapp_opted_out.is_(False))
+        .where(not_yet_sent(ONE_MONTH_CAMPAIGN, Customer.id, template_names, today))
+        .distinct(Customer.id)
+        .order_by(Customer.id, Order.created_at.desc())
+    ).all()
 
     return [
         {
-            "customer_name": f"{row[0]} {row[1]}",
-            "phone_number": row[2],
-            "order_date": row[3]
+            "customer_name": f"{row.first_name} {row.last_name}",
+            "phone_number": row.phone,
+            "order_date": row.created_at,
+            "customer_id": row.id,
         }
-        for row in result
+        for row in rows
     ]
 
-WHATSAPP_ACCESS_TOKEN = os.getenv("WHATSAPP_ACCESS_TOKEN")
-WHATSAPP_PHONE_NUMBER_ID = os.getenv("WHATSAPP_PHONE_NUMBER_ID")
-WHATSAPP_API_URL = f"https://graph.facebook.com/v18.0/{WHATSAPP_PHONE_NUMBER_ID}/messages"
-
 def send_whatsapp_reorder_reminder_after_one_month(phone_number: str, customer_name: str, language: str = "en"):
-    template_config = {
-        "en": {
-            "template_name": "example_for_quick_reply",
-            "language_code": "en_US"
-        },
-        "ar": {
-            "template_name": "order_management_1",
-            "language_code": "ar"
-        }
-    }
-
-    config = template_config.get(language)
+    config = ONE_MONTH_TEMPLATES.get(language)
     if not config:
         raise ValueError("Unsupported language. Use 'en' or 'ar'.")
 
-    headers = {
-        "Authorization": f"Bearer {WHATSAPP_ACCESS_TOKEN}",
-        "Content-Type": "application/json"
-    }
-
-    data = {
-        "messaging_product": "whatsapp",
-        "to": phone_number,
-        "type": "template",
-        "template": {
-            "name": config["template_name"],
-            "language": {"code": config["language_code"]},
-            "components": [
-                {
-                    "type": "body",
-                    "parameters": [
-                        {"type": "text", "text": customer_name}
-                    ]
-                }
-            ]
-        }
-    }
-
-    response = requests.post(WHATSAPP_API_URL, headers=headers, json=data)
-    return response.status_code, response.json()
+    return get_whatsapp_client().send_template(
+        phone_number, config["template_name"], [customer_name], config["language_code"]
+    )
 
 def send_whatsapp_message_after_one_month(db: Session):
-    
+    """Remind customers one month after their order, in English and Arabic, at most once a day each."""
     today = date.today()
-    customers = get_customers_since(db)
+    customers = get_one_month_reminder_candidates(db, today)
 
+    planned = []
     for row in customers:
-        customer_name = row["customer_name"]
-        phone_number = row["phone_number"]
-        order_date = row["order_date"]
-
-        send_date = order_date + relativedelta(months=1)
-        if send_date == today:
-            # Send English
-            status_en, result_en = send_whatsapp_reorder_reminder_after_one_month(
-                phone_number, customer_name, "en"
-            )
-            print(f"[EN] Sent to {customer_name} ({phone_number}): {status_en} - {result_en}")
+        for language in ("en", "ar"):
+            template_name = ONE_MONTH_TEMPLATES[language]["template_name"]
+            planned.append({
+                "customer_id": row["customer_id"],
+                "template_name": template_name,
+                "message": f"[{template_name}] {row['customer_name']}",
+                "customer_name": row["customer_name"],
+                "phone_number": row["phone_number"],
+                "language": language,
+            })
 
-            # Send Arabic
-            status_ar, result_ar = send_whatsapp_reorder_reminder_after_one_month(
-                phone_number, customer_name, "ar"
-            )
-            print(f"[AR] Sent to {customer_name} ({phone_number}): {status_ar} - {result_ar}")
\ No newline at end of file
+    results = send_once(
+        db, ONE_MONTH_CAMPAIGN, planned,
+        lambda m: send_whatsapp_reorder_reminder_after_one_month(m["phone_number"], m["customer_name"], m["language"]),
+        day=today,
+    )
+    for r in results:
+        if r["result"] == "duplicate":
+            print(f"[{r['language'].upper()}] Already sent to {r['customer_name']} ({r['phone_number']}) today, skipping")
+        else:
+            print(f"[{r['language'].upper()}] Sent to {r['customer_name']} ({r['phone_number']}): {r['status_code']} - {r['response']}")
+    return results
@@ -0,0 +1,204 @@
+"""
+Consumer for WhatsApp webhook payloads queued by POST /webhook.
+
+The webhook handler only XADDs the raw payload to a Redis stream and
+returns; this worker reads the stream through a consumer group, matches
+senders to customers, stores incoming messages and applies status updates
+in batches, then broadcasts the stored payloads to WebSocket clients and
+acknowledges the entries. Entries of a crashed consumer
+are reclaimed after WEBHOOK_CLAIM_IDLE_MS.
+
+    python -m crm_backend.tasks.whatsapp_webhook_consumer
+"""
+import json
+import os
+import socket
+import time
+from datetime import datetime
+import redis
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from crm_backend.customers.phone_lookup import find_customer_id_by_phone
+from crm_backend.database import SessionLocal
+from crm_backend.models import WhatsAppMessage
+from crm_backend.utils.redis_client import get_redis
+from crm_backend.utils import ws_broadcast
+
+WEBHOOK_STREAM = "whatsapp:webhook"
+WEBHOOK_DEAD_LETTER_STREAM = "whatsapp:webhook:dead"
+WEBHOOK_GROUP = "whatsapp-webhook-consumers"
+WEBHOOK_STREAM_MAXLEN = 100_000  # approximate, acknowledged entries are trimmed away over time
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", 200))
+WEBHOOK_BLOCK_MS = 5000
+WEBHOOK_CLAIM_IDLE_MS = 60_000
+
+def _timestamp(value) -> datetime | None:
+    return datetime.fromtimestamp(int(value)) if value else None
+
+def extract_events(payload: dict) -> tuple[list[dict], list[dict]]:
+    """All messages and statuses of a payload, across every entry and change."""
+    messages, statuses = [], []
+    for entry in payload.get("entry") or []:
+        for change in entry.get("changes") or []:
+            value = change.get("value") or {}
+            messages.extend(value.get("messages") or [])
+            statuses.extend(value.get("statuses") or [])
+    return messages, statuses
+
+def process_webhook_payloads(db: Session, payloads: list[dict]) -> dict:
+    """
+    Store incoming messages and apply status updates of ``payloads`` with one
+    insert and one batched update. The caller commits.
+    """
+    messages, statuses = [], []
+    for payload in payloads:
+        payload_messages, payload_statuses = extract_events(payload)
+        messages.extend(payload_messages)
+        statuses.extend(payload_statuses)
+
+    rows = []
+    unmatched = 0
+    seen = set()
+    for msg in messages:
+        if msg.get("id") in seen:
+            continue
+        seen.add(msg.get("id"))
+        from_number = msg.get("from", "")
+        customer_id = find_customer_id_by_phone(db, from_number)
+        if not customer_id:
+            print(f"⚠️ [NO CUSTOMER MATCH] Could not match number: {from_number}")
+            unmatched += 1
+            continue
+        rows.append({
+            "customer_id": customer_id,
+            "direction": "incoming",
+            "message": msg.get("text", {}).get("body", ""),
+            "timestamp": _timestamp(msg.get("timestamp")) or datetime.utcnow(),
+            "whatsapp_message_id": msg.get("id"),
+            "status": None,
+        })
+
+    if rows:
+        # Meta redelivers webhooks; the unique message id makes inserts idempotent
+        db.execute(
+            pg_insert(WhatsAppMessage).values(rows)
+            .on_conflict_do_nothing(index_elements=["whatsapp_message_id"])
+        )
+
+    # Keep the newest status per message (sent -> delivered -> read can arrive together)
+    latest = {}
+    for event in statuses:
+        wa_msg_id = event.get("id")
+        if not wa_msg_id:
+            continue
+        ts = int(event.get("timestamp") or 0)
+        if wa_msg_id not in latest or ts >= latest[wa_msg_id][0]:
+            latest[wa_msg_id] = (ts, event.get("status"))
+
+    if latest:
+        stmt = (
+            update(WhatsAppMessage)
+            .where(WhatsAppMessage.whatsapp_message_id == bindparam("wa_msg_id"))
+            .values(
+                status=bindparam("new_status"),
+                timestamp=func.coalesce(bindparam("new_timestamp"), WhatsAppMessage.timestamp),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.connection().execute(stmt, [
+            {"wa_msg_id": wa_msg_id, "new_status": status, "new_timestamp": _timestamp(ts)}
+            for wa_msg_id, (ts, status) in latest.items()
+        ])
+
+    return {"messages": len(rows), "unmatched": unmatched, "statuses": len(latest)}
+
+def ensure_consumer_group(r: redis.Redis) -> None:
+    try:
+        r.xgroup_create(WEBHOOK_STREAM, WEBHOOK_GROUP, id="0", mkstream=True)
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+def _dead_letter(r: redis.Redis, entry_id: str, fields: dict, error: Exception) -> None:
+    print(f"❌ [WEBHOOK DEAD LETTER] {entry_id}: {error}")
+    r.xadd(WEBHOOK_DEAD_LETTER_STREAM, {**fields, "error": str(error), "source_id": entry_id}, maxlen=10_000, approximate=True)
+
+def _broadcast(payloads: list[dict]) -> None:
+    """Notify WebSocket clients of committed payloads, so a refetch sees the stored messages."""
+    for payload in payloads:
+        if not payload:
+            continue
+        try:
+            ws_broadcast.publish(payload)
+        except Exception as e:
+            print(f"⚠️ [WS BROADCAST FAILED] {e}")
+
+def handle_entries(r: redis.Redis, entries: list[tuple[str, dict]]) -> None:
+    """Process and acknowledge stream entries; a failing batch is retried entry by entry."""
+    if not entries:
+        return
+
+    payloads = []
+    for entry_id, fields in entries:
+        try:
+            payloads.append(json.loads(fields["payload"]))
+        except (KeyError, ValueError) as e:
+            _dead_letter(r, entry_id, fields, e)
+            payloads.append({})
+
+    db = SessionLocal()
+    try:
+        try:
+            result = process_webhook_payloads(db, payloads)
+            db.commit()
+            print(f"💾 [WEBHOOK BATCH] {len(entries)} payloads: {result}")
+            _broadcast(payloads)
+        except OperationalError:
+            # Database unavailable: leave the entries pending, they are reclaimed later
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ [WEBHOOK BATCH FAILED] {e}, retrying entries one by one")
+            for (entry_id, fields), payload in zip(entries, payloads):
+                try:
+                    process_webhook_payloads(db, [payload])
+                    db.commit()
+                    _broadcast([payload])
+                except Exception as entry_error:
+                    db.rollback()
+                    _dead_letter(r, entry_id, fields, entry_error)
+    finally:
+        db.close()
+
+    r.xack(WEBHOOK_STREAM, WEBHOOK_GROUP, *[entry_id for entry_id, _ in entries])
+
+def run_consumer(consumer_name: str | None = None) -> None:
+    consumer_name = consumer_name or f"{socket.gethostname()}-{os.getpid()}"
+    r = get_redis()
+    ensure_consumer_group(r)
+    print(f"🚀 WhatsApp webhook consumer '{consumer_name}' started")
+
+    while True:
+        try:
+            # Entries left unacknowledged by a consumer that died
+            _, claimed, _ = r.xautoclaim(
+                WEBHOOK_STREAM, WEBHOOK_GROUP, consumer_name,
+                min_idle_time=WEBHOOK_CLAIM_IDLE_MS, start_id="0-0", count=WEBHOOK_BATCH_SIZE,
+            )
+            handle_entries(r, [(entry_id, fields) for entry_id, fields in claimed if fields])
+
+            response = r.xreadgroup(
+                WEBHOOK_GROUP, consumer_name, {WEBHOOK_STREAM: ">"},
+                count=WEBHOOK_BATCH_SIZE, block=WEBHOOK_BLOCK_MS,
+            )
+            for _, entries in response or []:
+                handle_entries(r, entries)
+        except (redis.ConnectionError, OperationalError) as e:
+            print(f"⚠️ Redis or database unavailable ({e}), retrying in 5s")
+            time.sleep(5)
+
+if __name__ == "__main__":
+    run_consumer()
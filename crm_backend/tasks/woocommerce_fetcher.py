@@ -0,0 +1,108 @@
+import asyncio
+import os
+from typing import Callable
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+WC_CONSUMER_KEY = os.getenv("WC_CONSUMER_KEY")
+WC_CONSUMER_SECRET = os.getenv("WC_CONSUMER_SECRET")
+
+# Pages fetched in parallel; WooCommerce/WordPress gets slow well before this
+WC_FETCH_CONCURRENCY = int(os.getenv("WC_FETCH_CONCURRENCY", 6))
+MAX_ATTEMPTS = 3
+
+async def _get_page(client: httpx.AsyncClient, url: str, params: dict, page: int) -> httpx.Response:
+    """GET one page, retrying timeouts, 429 and 5xx with exponential backoff."""
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            response = await client.get(url, params={**params, "page": page})
+            if response.status_code == 200:
+                return response
+            if response.status_code != 429 and response.status_code < 500:
+                response.raise_for_status()
+            print(f"⚠️ Page {page} returned {response.status_code} (attempt {attempt}/{MAX_ATTEMPTS})")
+        except httpx.TransportError as e:
+            print(f"⚠️ Page {page} failed: {e} (attempt {attempt}/{MAX_ATTEMPTS})")
+
+        if attempt < MAX_ATTEMPTS:
+            await asyncio.sleep(2 ** attempt)
+
+    raise RuntimeError(f"Giving up on page {page} after {MAX_ATTEMPTS} attempts")
+
+async def _fetch_all_pages(
+    url: str,
+    write_page: Callable[[int, list[dict]], None],
+    params: dict,
+    concurrency: int,
+) -> dict:
+    auth = (WC_CONSUMER_KEY, WC_CONSUMER_SECRET)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(auth=auth, timeout=60, limits=limits) as client:
+        first = await _get_page(client, url, params, 1)
+        total_pages = int(first.headers.get("X-WP-TotalPages", 1))
+        print(f"📚 {total_pages} pages to fetch from {url} ({concurrency} at a time)")
+
+        # A fetcher waits on put() before taking its next page, so at most
+        # ``concurrency`` pages are in flight plus the ones queued here
+        queue = asyncio.Queue(maxsize=concurrency)
+        pages = iter(range(2, total_pages + 1))
+        written, failed = [], []
+
+        async def fetcher() -> None:
+            # All fetchers share one page iterator, so each page is fetched once
+            for page in pages:
+                try:
+                    response = await _get_page(client, url, params, page)
+                    items = response.json()
+                except Exception as e:
+                    print(f"❌ Could not fetch page {page}: {e}")
+                    failed.append(page)
+                    continue
+                await queue.put((page, items))
+
+        async def writer() -> None:
+            # Single consumer: the DB session is only ever used by one page at a time
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                page, items = item
+                try:
+                    await asyncio.to_thread(write_page, page, items)
+                    written.append(page)
+                except Exception as e:
+                    print(f"❌ Could not save page {page}: {e}")
+                    failed.append(page)
+
+        writer_task = asyncio.create_task(writer())
+        await queue.put((1, first.json()))
+        await asyncio.gather(*(fetcher() for _ in range(concurrency)))
+        await queue.put(None)
+        await writer_task
+
+    return {"total_pages": total_pages, "written": len(written), "failed": sorted(failed)}
+
+def fetch_all_pages(
+    url: str,
+    write_page: Callable[[int, list[dict]], None],
+    params: dict | None = None,
+    concurrency: int = WC_FETCH_CONCURRENCY,
+    per_page: int = 100,
+) -> dict:
+    """
+    Fetch every page of a WooCommerce collection concurrently.
+
+    The first page is fetched to read ``X-WP-TotalPages``; the remaining pages
+    are fetched over one shared ``httpx.AsyncClient`` by ``concurrency``
+    fetchers and handed, through a bounded queue, to a single writer that
+    calls ``write_page(page, items)`` in a worker thread. Fetchers stop
+    taking new pages while the writer falls behind.
+
+    Returns ``{"total_pages", "written", "failed"}`` where ``failed`` lists the
+    page numbers that could not be fetched or saved.
+    """
+    params = {"per_page": per_page, **(params or {})}
+    return asyncio.run(_fetch_all_pages(url, write_page, params, concurrency))
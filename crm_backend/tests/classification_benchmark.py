@@ -0,0 +1,65 @@
+# classification_benchmark.py
+#
+# Compares the row-wise classifiers (DataFrame.apply) with the vectorized
+# kernels in customers/operation_helper.py on synthetic customers and checks
+# that both produce identical labels.
+#
+#   python -m crm_backend.tests.classification_benchmark            # 10k, 100k, 1M
+#   python -m crm_backend.tests.classification_benchmark 50000
+
+import sys
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from crm_backend.customers.operation_helper import (
+    calculate_churn_risk, classify_behavior, classify_spending,
+    calculate_churn_risk_vectorized, classify_behavior_vectorized, classify_spending_vectorized,
+)
+
+TODAY = datetime(2026, 10, 18, 12, 0)
+
+def make_customers(n: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    last_order = pd.Series(TODAY - pd.to_timedelta(rng.integers(0, 900 * 24 * 60, n), unit="min"))
+    # ~5% of customers never ordered
+    no_orders = rng.random(n) < 0.05
+    last_order[no_orders] = pd.NaT
+    return pd.DataFrame({
+        "order_count": np.where(no_orders, 0, rng.integers(1, 30, n)),
+        "total_spent": np.where(no_orders, 0.0, rng.gamma(2.0, 150.0, n).round(3)),
+        "last_order_date": last_order,
+    })
+
+def row_wise(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        "classification": df.apply(lambda row: classify_behavior(row["order_count"], row["last_order_date"]), axis=1),
+        "churn_risk": df["last_order_date"].apply(lambda x: calculate_churn_risk(x, TODAY)),
+        "spending_classification": df["total_spent"].apply(classify_spending),
+    })
+
+def vectorized(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        "classification": classify_behavior_vectorized(df["order_count"], df["last_order_date"]),
+        "churn_risk": calculate_churn_risk_vectorized(df["last_order_date"], TODAY),
+        "spending_classification": classify_spending_vectorized(df["total_spent"]),
+    })
+
+def timed(func, df):
+    start = time.perf_counter()
+    result = func(df)
+    return result, time.perf_counter() - start
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+
+    print(f"{'customers':>10} {'row-wise (s)':>14} {'vectorized (s)':>15} {'speedup':>9}")
+    for n in sizes:
+        df = make_customers(n)
+        slow, slow_time = timed(row_wise, df)
+        fast, fast_time = timed(vectorized, df)
+
+        mismatches = (slow.reset_index(drop=True) != fast).sum()
+        assert mismatches.sum() == 0, f"Outputs differ at n={n}: {mismatches.to_dict()}"
+
+        print(f"{n:>10,} {slow_time:>14.3f} {fast_time:>15.4f} {slow_time / fast_time:>8.0f}x")
@@ -0,0 +1,84 @@
+# product_segmentation_benchmark.py
+#
+# Times /segment-products' processing on a synthetic catalog: the previous
+# implementation (row-wise recency + a fresh StandardScaler/KMeans fit per
+# request) against segment_products() serving from the stored model.
+# The model is fitted once up front, like the nightly refit does.
+#
+#   python -m crm_backend.tests.product_segmentation_benchmark             # 1k, 10k, 100k products
+#   python -m crm_backend.tests.product_segmentation_benchmark 50000
+#
+# The benchmark model lives in a temporary MODEL_REGISTRY_DIR, so the stored
+# product-segment model is never replaced by one fitted on synthetic data.
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+
+# Must be set before the registry is imported, it reads the directory at import time
+_registry_dir = tempfile.TemporaryDirectory(prefix="segmentation_benchmark_")
+os.environ["MODEL_REGISTRY_DIR"] = _registry_dir.name
+
+from crm_backend.products.operation_helper import segment_products
+
+def make_catalog(n: int, seed: int = 7) -> list[tuple]:
+    """Rows shaped like get_product_segmentation_data()."""
+    rng = np.random.default_rng(seed)
+    units = rng.negative_binomial(2, 0.05, n)
+    price = rng.gamma(2.0, 4.0, n).round(3)
+    sold = units > 0
+    last_sold = [
+        datetime.now() - timedelta(days=int(days)) if s else None
+        for s, days in zip(sold, rng.integers(0, 720, n))
+    ]
+    return list(zip(
+        range(1, n + 1), [f"Product {i}" for i in range(1, n + 1)], price, np.where(rng.random(n) < 0.3, price * 0.8, price),
+        rng.choice(["instock", "outofstock"], n, p=[0.9, 0.1]), units, units * price, last_sold,
+    ))
+
+def legacy_segment_products(data):
+    """The pre-registry implementation, kept here as the baseline."""
+    df = pd.DataFrame(data, columns=[
+        "product_id", "product_name", "regular_price", "sales_price", "stock_status",
+        "total_units_sold", "total_revenue", "last_sold_date"
+    ])
+    df["regular_price"] = df["regular_price"].fillna(0)
+    df["sales_price"] = df["sales_price"].fillna(df["regular_price"])
+    df["last_sold_date"] = pd.to_datetime(df["last_sold_date"], errors='coerce')
+
+    today = datetime.now()
+    df["recency_days"] = df["last_sold_date"].apply(lambda d: (today - d).days if pd.notnull(d) else 999)
+    df["avg_price"] = df["total_revenue"] / df["total_units_sold"].replace(0, 1)
+
+    features = df[["total_units_sold", "total_revenue", "avg_price", "recency_days"]]
+    X_scaled = StandardScaler().fit_transform(features)
+    df["segment"] = KMeans(n_clusters=4, random_state=42, n_init="auto").fit_predict(X_scaled)
+    segment_map = {0: "Low Performer", 1: "Best Seller", 2: "Hidden Gem", 3: "Recent Spike"}
+    df["segment"] = df["segment"].apply(lambda x: segment_map.get(x, f"Segment {x}"))
+    return df
+
+def timed(func, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+
+    print(f"{'products':>10} {'legacy fit (s)':>15} {'predict-only (s)':>17} {'speedup':>9}")
+    for n in sizes:
+        catalog = make_catalog(n)
+        segment_products(catalog, refit=True)  # what the nightly task does
+
+        legacy = timed(legacy_segment_products, catalog)
+        serving = timed(segment_products, catalog)
+        print(f"{n:>10,} {legacy:>15.3f} {serving:>17.4f} {legacy / serving:>8.1f}x")
@@ -1,12 +1,12 @@
 from crm_backend.database import SessionLocal
-from crm_backend.tasks.whatsapp_msg_after_one_month import get_customers_since
+from crm_backend.tasks.whatsapp_msg_after_one_month import get_one_month_reminder_candidates
 
 # db = SessionLocal()
-# customers = get_customers_since(db)
+# customers = get_one_month_reminder_candidates(db, date.today())
 # print(customers)
 
 # def send_whatsapp_message_after_one_month(db):
-#     # customers = get_customers_since(db)
+#     # customers = get_one_month_reminder_candidates(db, date.today())
 #     customers = [{'customer_name': 'Muhammed Harif', 'phone_number': '919745674674'}]
 #     for row in customers:
 #         customer_name = row["customer_name"]
@@ -19,13 +19,14 @@ from crm_backend.tasks.whatsapp_msg_after_one_month import get_customers_since
 #         print(f"Sent to {customer_name} ({phone_number}): {status} - {result}")
 
 from crm_backend.database import SessionLocal
-from crm_backend.tasks.whatsapp_msg_after_one_month import get_customers_since, send_whatsapp_reorder_reminder_after_one_month
+from datetime import date
+from crm_backend.tasks.whatsapp_msg_after_one_month import get_one_month_reminder_candidates, send_whatsapp_reorder_reminder_after_one_month
 
 def send_whatsapp_message_after_one_month(db, test_mode=True):
     if test_mode:
         customers = [{'customer_name': 'Muhammed Harif', 'phone_number': '919745674674'}]
     else:
-        customers = get_customers_since(db)
+        customers = get_one_month_reminder_candidates(db, date.today())
 
     for row in customers:
         customer_name = row["customer_name"]
@@ -0,0 +1,104 @@
+import functools
+import hashlib
+import json
+import os
+from fastapi.encoders import jsonable_encoder
+from crm_backend.utils.redis_client import get_redis
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 300))
+
+CACHE_PREFIX = "cache:"
+VERSION_PREFIX = "cache_version:"
+STATS_PREFIX = "cache_stats:"
+
+# Data domains a cached route can depend on
+DOMAINS = ("orders", "products", "customers")
+
+def _domain_versions(r, domains: tuple[str, ...]) -> str:
+    return ".".join(v or "0" for v in r.mget([f"{VERSION_PREFIX}{d}" for d in domains]))
+
+def _record_stat(r, name: str, field: str) -> None:
+    try:
+        r.hincrby(f"{STATS_PREFIX}{name}", field, 1)
+    except Exception as e:
+        print(f"⚠️ Could not record cache stats for {name}: {e}")
+
+def cached(*domains: str, ttl: int = RESPONSE_CACHE_TTL):
+    """
+    Cache a read-only route's JSON-encoded result in Redis.
+
+    Keys combine the route, its query/path params and the current version
+    of every domain the route reads, so bump_cache_domains() makes all
+    dependent entries unreachable at once; they then expire via ``ttl``.
+    Redis errors fall through to the route itself.
+
+        @router.get("/total-sales")
+        @cached("orders")
+        def get_total_sales(db: Session = Depends(get_db)): ...
+    """
+    unknown = set(domains) - set(DOMAINS)
+    if unknown:
+        raise ValueError(f"Unknown cache domains: {unknown}")
+
+    def decorator(func):
+        name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not RESPONSE_CACHE_ENABLED:
+                return func(*args, **kwargs)
+
+            params = json.dumps(
+                {k: v for k, v in kwargs.items() if k != "db"}, sort_keys=True, default=str
+            )
+            try:
+                r = get_redis()
+                key = (
+                    f"{CACHE_PREFIX}{name}:{_domain_versions(r, domains)}:"
+                    f"{hashlib.sha1(params.encode()).hexdigest()}"
+                )
+                hit = r.get(key)
+            except Exception as e:
+                print(f"⚠️ Response cache unavailable: {e}")
+                return func(*args, **kwargs)
+
+            _record_stat(r, name, "hits" if hit is not None else "misses")
+            if hit is not None:
+                return json.loads(hit)
+
+            result = func(*args, **kwargs)
+            try:
+                r.set(key, json.dumps(jsonable_encoder(result)), ex=ttl)
+            except Exception as e:
+                print(f"⚠️ Could not cache {name}: {e}")
+            return result
+
+        return wrapper
+
+    return decorator
+
+def bump_cache_domains(*domains: str) -> None:
+    """Invalidate cached responses of the given domains. Call after the data is committed."""
+    try:
+        r = get_redis()
+        pipe = r.pipeline()
+        for domain in domains:
+            pipe.incr(f"{VERSION_PREFIX}{domain}")
+        pipe.execute()
+    except Exception as e:
+        print(f"⚠️ Could not invalidate cache domains {domains}: {e}")
+
+def get_cache_stats() -> dict:
+    """Hit/miss counters per cached route plus the current domain versions."""
+    r = get_redis()
+    routes = {}
+    for key in r.scan_iter(f"{STATS_PREFIX}*"):
+        stats = {k: int(v) for k, v in r.hgetall(key).items()}
+        lookups = stats.get("hits", 0) + stats.get("misses", 0)
+        stats["hit_rate"] = round(stats.get("hits", 0) / lookups, 3) if lookups else 0.0
+        routes[key[len(STATS_PREFIX):]] = stats
+    return {
+        "versions": {d: int(v or 0) for d, v in zip(DOMAINS, r.mget([f"{VERSION_PREFIX}{d}" for d in DOMAINS]))},
+        "routes": dict(sorted(routes.items())),
+    }
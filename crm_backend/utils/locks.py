@@ -0,0 +1,137 @@
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from crm_backend.utils.redis_client import get_redis
+
+LOCK_PREFIX = "lock:"
+METRICS_PREFIX = "lock_metrics:"
+
+# Only the holder's token may extend or delete the key
+_EXTEND_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+class LeaseLock:
+    """
+    Redis lease lock (SET NX PX) renewed by a heartbeat thread.
+
+    The lease expires on its own if the holder dies, so a crashed worker
+    never blocks the next run for longer than ``ttl`` seconds.
+    """
+
+    def __init__(self, name: str, ttl: int = 60):
+        self.name = name
+        self.key = f"{LOCK_PREFIX}{name}"
+        self.ttl_ms = ttl * 1000
+        self.token = uuid.uuid4().hex
+        self.lost = False
+        self._redis = get_redis()
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def acquire(self) -> bool:
+        if not self._redis.set(self.key, self.token, nx=True, px=self.ttl_ms):
+            return False
+        self._heartbeat = threading.Thread(target=self._renew, name=f"lease-{self.name}", daemon=True)
+        self._heartbeat.start()
+        return True
+
+    def _renew(self) -> None:
+        interval = self.ttl_ms / 3000
+        while not self._stop.wait(interval):
+            try:
+                if not self._redis.eval(_EXTEND_SCRIPT, 1, self.key, self.token, self.ttl_ms):
+                    self.lost = True
+                    print(f"⚠️ Lost lease on {self.key}")
+                    return
+            except Exception as e:
+                print(f"⚠️ Could not renew lease on {self.key}: {e}")
+
+    def release(self) -> None:
+        self._stop.set()
+        if self._heartbeat:
+            self._heartbeat.join(timeout=5)
+        try:
+            self._redis.eval(_RELEASE_SCRIPT, 1, self.key, self.token)
+        except Exception as e:
+            print(f"⚠️ Could not release {self.key}: {e}")
+
+def _record(name: str, **counters) -> None:
+    try:
+        r = get_redis()
+        key = f"{METRICS_PREFIX}{name}"
+        pipe = r.pipeline()
+        for field, amount in counters.items():
+            pipe.hincrby(key, field, amount)
+        pipe.execute()
+    except Exception as e:
+        print(f"⚠️ Could not record lock metrics for {name}: {e}")
+
+def _record_duration(name: str, duration_ms: int) -> None:
+    try:
+        r = get_redis()
+        key = f"{METRICS_PREFIX}{name}"
+        previous_max = int(r.hget(key, "max_duration_ms") or 0)
+        pipe = r.pipeline()
+        pipe.hincrby(key, "total_duration_ms", duration_ms)
+        pipe.hset(key, mapping={
+            "last_duration_ms": duration_ms,
+            "last_finished_at": datetime.utcnow().isoformat() + "Z",
+            "max_duration_ms": max(previous_max, duration_ms),
+        })
+        pipe.execute()
+    except Exception as e:
+        print(f"⚠️ Could not record lock metrics for {name}: {e}")
+
+@contextmanager
+def single_flight(name: str, ttl: int = 60):
+    """
+    Run a block at most once at a time across all workers.
+
+    Yields ``True`` when the lease was acquired and ``False`` when another
+    run holds it, in which case the caller should skip its work::
+
+        with single_flight("sync:orders") as acquired:
+            if not acquired:
+                return
+            ...
+    """
+    lock = LeaseLock(name, ttl=ttl)
+    if not lock.acquire():
+        _record(name, skipped=1)
+        print(f"⏭️ {name} is already running, skipping this run")
+        yield False
+        return
+
+    _record(name, acquired=1)
+    started = time.monotonic()
+    try:
+        yield True
+    finally:
+        lock.release()
+        if lock.lost:
+            _record(name, lost=1)
+        _record_duration(name, int((time.monotonic() - started) * 1000))
+
+def get_lock_metrics(names: list[str]) -> dict:
+    """Counters and current holder state for each lock name."""
+    r = get_redis()
+    metrics = {}
+    for name in names:
+        stats = {k: int(v) if v.isdigit() else v for k, v in r.hgetall(f"{METRICS_PREFIX}{name}").items()}
+        ttl_ms = r.pttl(f"{LOCK_PREFIX}{name}")
+        stats["held"] = ttl_ms > 0
+        stats["lease_ttl_ms"] = max(ttl_ms, 0)
+        metrics[name] = stats
+    return metrics
@@ -0,0 +1,111 @@
+"""
+File-backed registry of fitted segmentation models.
+
+Models are fitted by the nightly task and stored with joblib under
+MODEL_REGISTRY_DIR (shared by the API and the Celery containers). Request
+handlers only load them and call transform/predict. Every model keeps a
+mapping from cluster id to a business label that is derived from the
+centroids, so labels mean the same thing after each refit even though
+KMeans numbers its clusters arbitrarily.
+"""
+import os
+import threading
+from datetime import datetime
+from typing import Callable
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+
+MODEL_REGISTRY_DIR = os.getenv(
+    "MODEL_REGISTRY_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "model_store")),
+)
+
+# name -> (file mtime, model)
+_loaded: dict[str, tuple[float, "SegmentationModel"]] = {}
+_lock = threading.Lock()
+
+class SegmentationModel:
+    """Fitted StandardScaler + KMeans with a stable cluster -> label mapping."""
+
+    def __init__(self, features: list[str], scaler: StandardScaler, kmeans: KMeans, labels: dict[int, str]):
+        self.features = features
+        self.scaler = scaler
+        self.kmeans = kmeans
+        self.labels = labels
+        self.fitted_at = datetime.utcnow()
+        self.n_samples = int(scaler.n_samples_seen_)
+
+    def centroids(self) -> pd.DataFrame:
+        """Cluster centres in the original feature units."""
+        return pd.DataFrame(
+            self.scaler.inverse_transform(self.kmeans.cluster_centers_), columns=self.features
+        )
+
+    def predict(self, df: pd.DataFrame) -> np.ndarray:
+        """Labels for the rows of ``df`` (must contain ``features``)."""
+        if df.empty:
+            return np.array([], dtype=object)
+        clusters = self.kmeans.predict(self.scaler.transform(df[self.features]))
+        return np.array([self.labels[c] for c in clusters], dtype=object)
+
+def _path(name: str) -> str:
+    return os.path.join(MODEL_REGISTRY_DIR, f"{name}.joblib")
+
+def fit_segmentation_model(
+    name: str,
+    df: pd.DataFrame,
+    features: list[str],
+    label_clusters: Callable[[pd.DataFrame], dict[int, str]],
+    n_clusters: int = 4,
+) -> SegmentationModel:
+    """
+    Fit and store a model. ``label_clusters`` receives the centroids (original
+    units, one row per cluster id) and returns {cluster id: label}.
+    """
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(df[features])
+    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init="auto").fit(X_scaled)
+
+    centroids = pd.DataFrame(scaler.inverse_transform(kmeans.cluster_centers_), columns=features)
+    model = SegmentationModel(features, scaler, kmeans, label_clusters(centroids))
+
+    os.makedirs(MODEL_REGISTRY_DIR, exist_ok=True)
+    tmp_path = f"{_path(name)}.{os.getpid()}.tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, _path(name))  # readers never see a half-written file
+
+    print(f"✅ Fitted segmentation model '{name}' on {model.n_samples} rows")
+    return model
+
+def load_segmentation_model(name: str) -> SegmentationModel | None:
+    """Latest stored model, re-read only when the file changed. None if never fitted."""
+    try:
+        mtime = os.path.getmtime(_path(name))
+    except FileNotFoundError:
+        return None
+
+    with _lock:
+        cached = _loaded.get(name)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        model = joblib.load(_path(name))
+        _loaded[name] = (mtime, model)
+        return model
+
+def rank_labels(centroids: pd.DataFrame, picks: list[tuple[str, str, bool]]) -> dict[int, str]:
+    """
+    Assign labels greedily: for each (label, feature, highest) pick, the
+    remaining cluster with the highest (or lowest) centroid value of
+    ``feature`` gets ``label``. The pick list must cover every cluster.
+    """
+    remaining = list(centroids.index)
+    labels = {}
+    for label, feature, highest in picks:
+        values = centroids.loc[remaining, feature]
+        cluster = values.idxmax() if highest else values.idxmin()
+        labels[int(cluster)] = label
+        remaining.remove(cluster)
+    return labels
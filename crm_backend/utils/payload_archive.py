@@ -0,0 +1,195 @@
+"""
+Append-only local archive of raw WooCommerce payloads.
+
+Every fetched page is written as one zstd frame (JSON lines) to the current
+segment of its kind, e.g. ``<WC_ARCHIVE_DIR>/orders/segment-000003.jsonl.zst``.
+Segments roll over at WC_ARCHIVE_SEGMENT_MB. ``<kind>/index.sqlite`` maps
+every external id to the frame holding its latest payload, with its
+modified date, so a single record or a recently modified range is found
+with an indexed lookup and read back without decompressing whole segments.
+The index keeps one row per id, so it grows with the catalog, not with
+every sync.
+"""
+import fcntl
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator
+import zstandard
+from dotenv import load_dotenv
+
+load_dotenv()
+
+WC_ARCHIVE_ENABLED = os.getenv("WC_ARCHIVE_ENABLED", "true").lower() == "true"
+WC_ARCHIVE_DIR = os.getenv(
+    "WC_ARCHIVE_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "wc_archive")),
+)
+SEGMENT_MAX_BYTES = int(os.getenv("WC_ARCHIVE_SEGMENT_MB", 64)) * 1024 * 1024
+KINDS = ("orders", "products")
+
+_SEGMENT_PREFIX = "segment-"
+_SEGMENT_SUFFIX = ".jsonl.zst"
+
+def _kind_dir(kind: str) -> str:
+    if kind not in KINDS:
+        raise ValueError(f"Unknown archive kind: {kind}")
+    path = os.path.join(WC_ARCHIVE_DIR, kind)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def _segments(kind: str) -> list[str]:
+    return sorted(
+        name for name in os.listdir(_kind_dir(kind))
+        if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX)
+    )
+
+def _current_segment(kind: str) -> str:
+    segments = _segments(kind)
+    if segments:
+        last = segments[-1]
+        if os.path.getsize(os.path.join(_kind_dir(kind), last)) < SEGMENT_MAX_BYTES:
+            return last
+        number = int(last[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)]) + 1
+    else:
+        number = 1
+    return f"{_SEGMENT_PREFIX}{number:06d}{_SEGMENT_SUFFIX}"
+
+@contextmanager
+def _locked(kind: str):
+    """Serialize writers of one kind across processes."""
+    with open(os.path.join(_kind_dir(kind), ".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS latest (
+    id INTEGER PRIMARY KEY,
+    modified TEXT,
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    fetched_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS latest_modified ON latest (modified);
+CREATE INDEX IF NOT EXISTS latest_frame ON latest (segment, offset);
+"""
+
+def _index(kind: str) -> sqlite3.Connection:
+    directory = _kind_dir(kind)
+    path = os.path.join(directory, "index.sqlite")
+    created = not os.path.exists(path)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_INDEX_SCHEMA)
+
+    # Archives written before the SQLite index kept an append-only index.jsonl
+    legacy = os.path.join(directory, "index.jsonl")
+    if created and os.path.exists(legacy):
+        with conn, open(legacy) as index:
+            _upsert_entries(conn, (json.loads(line) for line in index))
+        os.rename(legacy, legacy + ".imported")
+    return conn
+
+def _upsert_entries(conn: sqlite3.Connection, entries) -> None:
+    conn.executemany(
+        "INSERT OR REPLACE INTO latest (id, modified, segment, offset, length, fetched_at) "
+        "VALUES (:id, :modified, :segment, :offset, :length, :fetched_at)",
+        (entry for entry in entries if entry.get("id") is not None),
+    )
+
+def _modified(record: dict) -> str | None:
+    return record.get("date_modified_gmt") or record.get("date_modified") or record.get("date_created_gmt")
+
+def append_page(kind: str, records: list[dict]) -> None:
+    """Archive one fetched page of ``kind`` ("orders" or "products")."""
+    if not WC_ARCHIVE_ENABLED or not records:
+        return
+
+    payload = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+    frame = zstandard.ZstdCompressor(level=3).compress(payload.encode("utf-8"))
+    fetched_at = datetime.utcnow().isoformat() + "Z"
+    directory = _kind_dir(kind)
+
+    with _locked(kind):
+        segment = _current_segment(kind)
+        with open(os.path.join(directory, segment), "ab") as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(frame)
+
+        conn = _index(kind)
+        try:
+            with conn:
+                _upsert_entries(conn, (
+                    {
+                        "id": record.get("id"),
+                        "modified": _modified(record),
+                        "segment": segment,
+                        "offset": offset,
+                        "length": len(frame),
+                        "fetched_at": fetched_at,
+                    }
+                    for record in records
+                ))
+        finally:
+            conn.close()
+
+def safe_append_page(kind: str, records: list[dict]) -> None:
+    """append_page that never breaks the sync calling it."""
+    try:
+        append_page(kind, records)
+    except Exception as e:
+        print(f"⚠️ Could not archive {len(records)} {kind}: {e}")
+
+def iter_index(kind: str, external_id: int | None = None, modified_since: str | None = None) -> Iterator[dict]:
+    """
+    Index entries (the latest payload of each id) in archive order, optionally
+    filtered by external id and/or modified date (ISO string).
+    """
+    conditions, params = [], []
+    if external_id is not None:
+        conditions.append("id = ?")
+        params.append(external_id)
+    if modified_since:
+        conditions.append("modified >= ?")
+        params.append(modified_since)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    conn = _index(kind)
+    try:
+        for row in conn.execute(f"SELECT * FROM latest{where} ORDER BY segment, offset", params):
+            yield dict(row)
+    finally:
+        conn.close()
+
+def _read_frame(kind: str, segment: str, offset: int, length: int) -> list[dict]:
+    with open(os.path.join(_kind_dir(kind), segment), "rb") as f:
+        f.seek(offset)
+        data = zstandard.ZstdDecompressor().decompress(f.read(length))
+    return [json.loads(line) for line in data.decode("utf-8").splitlines() if line]
+
+def load_latest(kind: str, external_id: int) -> dict | None:
+    """Most recently archived payload for one external id."""
+    entry = next(iter_index(kind, external_id=external_id), None)
+    if entry is None:
+        return None
+    records = _read_frame(kind, entry["segment"], entry["offset"], entry["length"])
+    return next((r for r in reversed(records) if r.get("id") == external_id), None)
+
+def iter_pages(kind: str, modified_since: str | None = None) -> Iterator[list[dict]]:
+    """
+    The latest archived payload of every record, grouped by the page it was
+    fetched in and in fetch order. Frames are located through the index, so
+    only those holding a matching record are decompressed.
+    """
+    frames = {}
+    for entry in iter_index(kind, modified_since=modified_since):
+        frames.setdefault((entry["segment"], entry["offset"], entry["length"]), set()).add(entry["id"])
+    for (segment, offset, length), ids in frames.items():
+        # Older payloads in the frame were superseded by a later page
+        yield [r for r in _read_frame(kind, segment, offset, length) if r.get("id") in ids]
@@ -0,0 +1,51 @@
+import asyncio
+from crm_backend.utils.redis_client import get_async_redis
+
+RATE_LIMIT_PREFIX = "ratelimit:"
+
+# Refill from the Redis clock so every worker sees the same bucket, then take
+# one token or return how many milliseconds until one is available
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local clock = redis.call("TIME")
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", now)
+redis.call("PEXPIRE", KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return wait
+"""
+
+class AsyncTokenBucket:
+    """
+    Token bucket shared by every worker through Redis.
+
+    ``rate`` tokens per second are added up to ``capacity`` (the allowed
+    burst); ``acquire()`` waits until a token could be taken, so all
+    senders together never exceed the rate. Code that runs its own event
+    loop (Celery tasks use ``asyncio.run``) passes a client created in that
+    loop as ``redis``.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float | None = None, redis=None):
+        self.key = f"{RATE_LIMIT_PREFIX}{name}"
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._redis = redis
+
+    async def acquire(self) -> None:
+        redis = self._redis or get_async_redis()
+        while True:
+            wait_ms = await redis.eval(_TAKE_SCRIPT, 1, self.key, self.rate, self.capacity)
+            if not wait_ms:
+                return
+            await asyncio.sleep(int(wait_ms) / 1000)
@@ -0,0 +1,20 @@
+import redis
+import redis.asyncio
+from crm_backend.celery_app import REDIS_BROKER_URL
+
+_client = None
+_async_client = None
+
+def get_redis() -> redis.Redis:
+    """Shared Redis client (same server as the Celery broker)."""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(REDIS_BROKER_URL, decode_responses=True)
+    return _client
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """asyncio Redis client for request handlers, created on first use in the worker's event loop."""
+    global _async_client
+    if _async_client is None:
+        _async_client = redis.asyncio.Redis.from_url(REDIS_BROKER_URL, decode_responses=True)
+    return _async_client
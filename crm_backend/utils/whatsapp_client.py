@@ -0,0 +1,277 @@
+"""
+Client for the WhatsApp Cloud (Graph) API.
+
+Every sender goes through one pooled ``httpx`` client per process, so calls
+reuse open TLS connections instead of handshaking each time. Throttled
+(429) and 5xx responses are retried with exponential backoff, waiting for
+as long as Meta asks through ``Retry-After`` or the business use case
+usage headers. Message sends are not idempotent, so they are only retried
+when Meta cannot have accepted them: 429, 503 and connection errors.
+
+Call counts and latencies are kept in Redis per operation and exposed by
+GET /whatsapp/metrics.
+
+    status_code, body = get_whatsapp_client().send_template(to, "order_delivered", [name, order_id])
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import httpx
+from dotenv import load_dotenv
+from crm_backend.utils.redis_client import get_redis
+
+load_dotenv()
+
+WHATSAPP_ACCESS_TOKEN = os.getenv("WHATSAPP_ACCESS_TOKEN")
+WHATSAPP_PHONE_NUMBER_ID = os.getenv("WHATSAPP_PHONE_NUMBER_ID")
+WHATSAPP_API_VERSION = os.getenv("WHATSAPP_API_VERSION", "v18.0")
+GRAPH_API_URL = "https://graph.facebook.com"
+
+WHATSAPP_TIMEOUT = float(os.getenv("WHATSAPP_TIMEOUT", 30))  # seconds
+WHATSAPP_CONNECT_TIMEOUT = float(os.getenv("WHATSAPP_CONNECT_TIMEOUT", 5))
+WHATSAPP_MAX_RETRIES = int(os.getenv("WHATSAPP_MAX_RETRIES", 3))
+WHATSAPP_POOL_SIZE = int(os.getenv("WHATSAPP_POOL_SIZE", 20))
+BACKOFF_BASE = 1.0  # seconds, doubled on every attempt
+BACKOFF_MAX = 60.0
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# A 500/502/504 on POST /messages may come after the message went out, retrying could send it twice
+SEND_RETRYABLE_STATUS_CODES = {429, 503}
+# The request never reached Meta, so a message send can be retried without duplicating it
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+USAGE_HEADERS = ("x-business-use-case-usage", "x-app-usage")
+
+METRICS_PREFIX = "whatsapp_metrics:"
+
+def template_payload(to: str, template_name: str, variables: list[str], language: str = "en_US") -> dict:
+    """Request body of a template message with ``variables`` filling its {{1}}, {{2}}, ... placeholders."""
+    # WhatsApp template parameters
+    parameters = [{"type": "text", "text": str(v)} for v in variables]
+
+    return {
+        "messaging_product": "whatsapp",
+        "to": to,
+        "type": "template",
+        "template": {
+            "name": template_name,
+            "language": {"code": language},
+            "components": [
+                {
+                    "type": "body",
+                    "parameters": parameters
+                }
+            ]
+        }
+    }
+
+def text_payload(to: str, message: str) -> dict:
+    return {
+        "messaging_product": "whatsapp",
+        "to": to,
+        "type": "text",
+        "text": {
+            "body": message
+        }
+    }
+
+def _regain_access_seconds(headers: httpx.Headers) -> float | None:
+    """Longest ``estimated_time_to_regain_access`` (minutes) announced in Meta's usage headers."""
+    minutes = None
+    for name in USAGE_HEADERS:
+        raw = headers.get(name)
+        if not raw:
+            continue
+        try:
+            usage = json.loads(raw)
+        except ValueError:
+            continue
+        entries = [usage] if isinstance(usage, dict) and "estimated_time_to_regain_access" in usage else []
+        if isinstance(usage, dict):
+            for value in usage.values():
+                if isinstance(value, list):
+                    entries.extend(e for e in value if isinstance(e, dict))
+        for entry in entries:
+            value = entry.get("estimated_time_to_regain_access")
+            if isinstance(value, (int, float)) and value > 0:
+                minutes = max(minutes or 0, value)
+    return minutes * 60 if minutes else None
+
+def retry_delay(response: httpx.Response | None, attempt: int) -> float:
+    """
+    Seconds to wait before retry number ``attempt`` (0-based): ``Retry-After``
+    when present, then the usage headers, else exponential backoff with jitter.
+    """
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX)
+            except ValueError:
+                pass
+        regain = _regain_access_seconds(response.headers)
+        if regain:
+            return min(regain, BACKOFF_MAX)
+    delay = BACKOFF_BASE * 2 ** attempt
+    return min(delay + random.uniform(0, delay / 2), BACKOFF_MAX)
+
+def _response_body(response: httpx.Response):
+    try:
+        return response.json()
+    except ValueError:
+        return response.text
+
+def record_call(operation: str, elapsed_ms: int, status_code: int | None, retries: int) -> None:
+    try:
+        r = get_redis()
+        key = f"{METRICS_PREFIX}{operation}"
+        previous_max = int(r.hget(key, "max_latency_ms") or 0)
+        pipe = r.pipeline()
+        pipe.hincrby(key, "calls", 1)
+        pipe.hincrby(key, "retries", retries)
+        pipe.hincrby(key, "total_latency_ms", elapsed_ms)
+        if status_code is None or status_code >= 400:
+            pipe.hincrby(key, "errors", 1)
+        pipe.hincrby(key, f"status_{status_code or 'error'}", 1)
+        pipe.hset(key, mapping={"last_latency_ms": elapsed_ms, "max_latency_ms": max(previous_max, elapsed_ms)})
+        pipe.execute()
+    except Exception as e:
+        print(f"⚠️ Could not record WhatsApp metrics for {operation}: {e}")
+
+def get_whatsapp_metrics() -> dict:
+    """Counters per operation, with the average latency of a call (retries included)."""
+    r = get_redis()
+    metrics = {}
+    for key in r.scan_iter(f"{METRICS_PREFIX}*"):
+        stats = {k: int(v) for k, v in r.hgetall(key).items()}
+        stats["avg_latency_ms"] = round(stats.get("total_latency_ms", 0) / stats["calls"], 1) if stats.get("calls") else 0
+        metrics[key[len(METRICS_PREFIX):]] = stats
+    return metrics
+
+class _BaseWhatsAppClient:
+    def __init__(self, access_token: str | None = None, phone_number_id: str | None = None,
+                 timeout: float | None = None, max_retries: int | None = None, pool_size: int | None = None):
+        self.phone_number_id = phone_number_id or WHATSAPP_PHONE_NUMBER_ID
+        self.max_retries = WHATSAPP_MAX_RETRIES if max_retries is None else max_retries
+        self.messages_url = f"{GRAPH_API_URL}/{WHATSAPP_API_VERSION}/{self.phone_number_id}/messages"
+        pool_size = pool_size or WHATSAPP_POOL_SIZE
+        self._client_options = {
+            "headers": {"Authorization": f"Bearer {access_token or WHATSAPP_ACCESS_TOKEN}"},
+            "timeout": httpx.Timeout(timeout or WHATSAPP_TIMEOUT, connect=WHATSAPP_CONNECT_TIMEOUT),
+            "limits": httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        }
+
+    def _should_retry(self, method: str, response: httpx.Response | None, attempt: int) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        if response is None:
+            return True
+        retryable = RETRYABLE_STATUS_CODES if method.upper() == "GET" else SEND_RETRYABLE_STATUS_CODES
+        return response.status_code in retryable
+
+class WhatsAppClient(_BaseWhatsAppClient):
+    """Blocking client; share one per process through get_whatsapp_client()."""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self._http = httpx.Client(**self._client_options)
+
+    def request(self, method: str, url: str, operation: str, **kwargs) -> tuple[int, dict | str]:
+        """Send a Graph API request with retries, returning ``(status_code, body)``."""
+        started = time.monotonic()
+        attempt = 0
+        status_code = None
+        try:
+            while True:
+                response = None
+                try:
+                    response = self._http.request(method, url, **kwargs)
+                except RETRYABLE_ERRORS as e:
+                    if not self._should_retry(method, None, attempt):
+                        raise
+                    print(f"⚠️ WhatsApp {operation} connection failed ({e}), retrying")
+                else:
+                    status_code = response.status_code
+                    if not self._should_retry(method, response, attempt):
+                        return status_code, _response_body(response)
+                    print(f"⚠️ WhatsApp {operation} returned {status_code}, retrying")
+                time.sleep(retry_delay(response, attempt))
+                attempt += 1
+        finally:
+            record_call(operation, int((time.monotonic() - started) * 1000), status_code, attempt)
+
+    def send(self, payload: dict) -> tuple[int, dict | str]:
+        return self.request("POST", self.messages_url, "messages", json=payload)
+
+    def send_template(self, to: str, template_name: str, variables: list[str], language: str = "en_US") -> tuple[int, dict | str]:
+        return self.send(template_payload(to, template_name, variables, language))
+
+    def send_text(self, to: str, message: str) -> tuple[int, dict | str]:
+        return self.send(text_payload(to, message))
+
+    def close(self) -> None:
+        self._http.close()
+
+class AsyncWhatsAppClient(_BaseWhatsAppClient):
+    """
+    asyncio client, bound to the event loop it is used in::
+
+        async with AsyncWhatsAppClient() as client:
+            status_code, body = await client.send_template(...)
+    """
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self._http = httpx.AsyncClient(**self._client_options)
+
+    async def request(self, method: str, url: str, operation: str, **kwargs) -> tuple[int, dict | str]:
+        """Send a Graph API request with retries, returning ``(status_code, body)``."""
+        started = time.monotonic()
+        attempt = 0
+        status_code = None
+        try:
+            while True:
+                response = None
+                try:
+                    response = await self._http.request(method, url, **kwargs)
+                except RETRYABLE_ERRORS as e:
+                    if not self._should_retry(method, None, attempt):
+                        raise
+                    print(f"⚠️ WhatsApp {operation} connection failed ({e}), retrying")
+                else:
+                    status_code = response.status_code
+                    if not self._should_retry(method, response, attempt):
+                        return status_code, _response_body(response)
+                    print(f"⚠️ WhatsApp {operation} returned {status_code}, retrying")
+                await asyncio.sleep(retry_delay(response, attempt))
+                attempt += 1
+        finally:
+            await asyncio.to_thread(record_call, operation, int((time.monotonic() - started) * 1000), status_code, attempt)
+
+    async def send(self, payload: dict) -> tuple[int, dict | str]:
+        return await self.request("POST", self.messages_url, "messages", json=payload)
+
+    async def send_template(self, to: str, template_name: str, variables: list[str], language: str = "en_US") -> tuple[int, dict | str]:
+        return await self.send(template_payload(to, template_name, variables, language))
+
+    async def send_text(self, to: str, message: str) -> tuple[int, dict | str]:
+        return await self.send(text_payload(to, message))
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+_client = None
+
+def get_whatsapp_client() -> WhatsAppClient:
+    """Process-wide blocking client, so every sender shares the same connection pool."""
+    global _client
+    if _client is None:
+        _client = WhatsAppClient()
+    return _client
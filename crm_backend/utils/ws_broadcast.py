@@ -0,0 +1,96 @@
+"""
+WebSocket fan-out across gunicorn workers.
+
+Publishers (the webhook consumer, once a batch is committed) send JSON to
+a Redis pub/sub channel; every worker process runs
+one subscriber task that hands each message to all of its local sockets.
+Each socket has its own bounded queue drained by its own sender task, so
+one slow browser cannot stall the others: when its queue is full it is
+disconnected and has to reconnect.
+"""
+import asyncio
+import json
+from fastapi import WebSocket
+from crm_backend.utils.redis_client import get_async_redis, get_redis
+
+WS_CHANNEL = "whatsapp:ws"
+WS_SEND_QUEUE_SIZE = 100
+RESUBSCRIBE_DELAY = 2  # seconds
+
+def publish(data: dict) -> None:
+    """Deliver ``data`` to every connected socket on every worker."""
+    get_redis().publish(WS_CHANNEL, json.dumps(data))
+
+class WebSocketHub:
+    """Sockets connected to this worker process."""
+
+    def __init__(self):
+        self._queues: dict[WebSocket, asyncio.Queue] = {}
+        self._senders: dict[WebSocket, asyncio.Task] = {}
+        self._subscriber: asyncio.Task | None = None
+        self._closing: set[asyncio.Task] = set()
+
+    def __len__(self):
+        return len(self._queues)
+
+    def register(self, websocket: WebSocket) -> None:
+        self._ensure_subscriber()
+        queue = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self._queues[websocket] = queue
+        self._senders[websocket] = asyncio.create_task(self._send_loop(websocket, queue))
+
+    def unregister(self, websocket: WebSocket) -> None:
+        self._queues.pop(websocket, None)
+        sender = self._senders.pop(websocket, None)
+        if sender and sender is not asyncio.current_task():
+            sender.cancel()
+
+    def fan_out(self, message: str) -> None:
+        for websocket, queue in list(self._queues.items()):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                print("⚠️ [WS SLOW CLIENT] Send queue full, dropping client")
+                self.unregister(websocket)
+                task = asyncio.create_task(self._close(websocket))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+
+    async def _send_loop(self, websocket: WebSocket, queue: asyncio.Queue) -> None:
+        try:
+            while True:
+                await websocket.send_text(await queue.get())
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print("❌ [WS ERROR] Failed to send:", e)
+            self.unregister(websocket)
+
+    @staticmethod
+    async def _close(websocket: WebSocket) -> None:
+        try:
+            await websocket.close(code=1013)  # try again later
+        except Exception:
+            pass
+
+    def _ensure_subscriber(self) -> None:
+        if self._subscriber is None or self._subscriber.done():
+            self._subscriber = asyncio.create_task(self._subscribe())
+
+    async def _subscribe(self) -> None:
+        while True:
+            pubsub = get_async_redis().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(WS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.fan_out(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ [WS SUBSCRIBER] {e}, resubscribing in {RESUBSCRIBE_DELAY}s")
+                await asyncio.sleep(RESUBSCRIBE_DELAY)
+            finally:
+                await pubsub.aclose()
+
+hub = WebSocketHub()